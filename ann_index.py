@@ -0,0 +1,230 @@
+"""
+Nearest-neighbour indexes over the normalised NCO embedding matrix.
+
+All indexes score by inner product (= cosine similarity on normalised vectors)
+and share one interface:
+
+    index.search(query_vector, n) -> (row_indices, scores), best first
+    index.save(path) / load_index(path, vectors)
+
+- ExactIndex: brute-force matrix-vector product; used for small catalogs.
+- IVFIndex:   NumPy inverted-file index (spherical k-means coarse quantiser);
+              `nprobe` trades recall for latency.
+- HNSWIndex:  faiss-cpu HNSW graph, only when faiss is installed;
+              `ef_search` trades recall for latency.
+"""
+import importlib
+import importlib.util
+import json
+import os
+
+import numpy as np
+
+EXACT_SEARCH_MAX = int(os.environ.get("SURVEYX_EXACT_SEARCH_MAX", "50000"))
+IVF_NPROBE = int(os.environ.get("SURVEYX_IVF_NPROBE", "16"))
+HNSW_M = int(os.environ.get("SURVEYX_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("SURVEYX_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.environ.get("SURVEYX_HNSW_EF_SEARCH", "64"))
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_CHUNK = 65536
+
+
+def faiss_available():
+    """Whether faiss-cpu is installed, without paying for its (slow) import."""
+    return importlib.util.find_spec("faiss") is not None
+
+
+def _faiss():
+    if not faiss_available():
+        raise ImportError("faiss-cpu is required for the HNSW index")
+    return importlib.import_module("faiss")
+
+
+def top_n(scores, n):
+    """Indices of the n highest scores, best first, without a full sort
+    (argpartition, then a stable sort of just those n)."""
+    n = min(int(n), len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _normalise(x):
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return x / norms
+
+
+class ExactIndex:
+    kind = "exact"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query, n):
+        scores = self.vectors @ query
+        idx = top_n(scores, n)
+        return idx, scores[idx]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": self.kind}, f)
+
+
+class IVFIndex:
+    """Inverted lists stored CSR-style: `order` groups row ids by list and
+    `offsets[c]:offsets[c + 1]` is list c, so each probe scans a contiguous block."""
+
+    kind = "ivf"
+
+    def __init__(self, vectors, centroids, order, offsets, nprobe=IVF_NPROBE, grouped=None):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+        # Vectors regrouped by list; saved with the index so loads can memory-map it
+        self._grouped = np.ascontiguousarray(vectors[order]) if grouped is None else grouped
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, vectors, nlist=None, nprobe=IVF_NPROBE, seed=0):
+        n = len(vectors)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = vectors[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].astype(np.float32)
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalise(sums).astype(np.float32)
+
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, ASSIGN_CHUNK):
+            block = vectors[start:start + ASSIGN_CHUNK]
+            assign[start:start + ASSIGN_CHUNK] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+        return cls(vectors, centroids, order, offsets, nprobe)
+
+    def search(self, query, n):
+        probes = top_n(self.centroids @ query, self.nprobe)
+        probes = [c for c in probes if self.offsets[c + 1] > self.offsets[c]]
+        if not probes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        positions = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes])
+        scores = np.concatenate([self._grouped[self.offsets[c]:self.offsets[c + 1]] @ query for c in probes])
+        best = top_n(scores, n)
+        return self.order[positions[best]], scores[best]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "order.npy"), self.order)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        np.save(os.path.join(path, "grouped.npy"), self._grouped)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": self.kind, "nprobe": self.nprobe}, f)
+
+
+class HNSWIndex:
+    kind = "hnsw"
+
+    def __init__(self, index, ef_search=HNSW_EF_SEARCH):
+        self.index = index
+        self.ef_search = ef_search
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @property
+    def ef_search(self):
+        return self.index.hnsw.efSearch
+
+    @ef_search.setter
+    def ef_search(self, value):
+        self.index.hnsw.efSearch = value
+
+    @classmethod
+    def build(cls, vectors, m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
+        faiss = _faiss()
+        index = faiss.IndexHNSWFlat(vectors.shape[1], m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        return cls(index, ef_search)
+
+    def search(self, query, n):
+        n = min(int(n), len(self))
+        scores, idx = self.index.search(query.reshape(1, -1).astype(np.float32), n)
+        keep = idx[0] >= 0
+        return idx[0][keep].astype(np.int64), scores[0][keep]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        _faiss().write_index(self.index, os.path.join(path, "hnsw.faiss"))
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": self.kind, "ef_search": self.ef_search}, f)
+
+
+def resolve_kind(n, kind="auto"):
+    """"auto" keeps exact search for catalogs up to EXACT_SEARCH_MAX rows, then
+    prefers HNSW when faiss is installed and IVF otherwise."""
+    if kind != "auto":
+        return kind
+    if n <= EXACT_SEARCH_MAX:
+        return "exact"
+    return "hnsw" if faiss_available() else "ivf"
+
+
+def build_index(vectors, kind="auto", **params):
+    """kind: "auto", "exact", "ivf" or "hnsw"."""
+    kind = resolve_kind(len(vectors), kind)
+    if kind == "exact":
+        return ExactIndex(vectors)
+    if kind == "ivf":
+        return IVFIndex.build(vectors, **params)
+    if kind == "hnsw":
+        return HNSWIndex.build(vectors, **params)
+    raise ValueError(f"Unknown index kind: {kind}")
+
+
+def _search_setting(env, configured, saved):
+    """A search-time knob of a loaded index: the environment variable when it is
+    set, so tuning it needs no rebuild, else the value saved with the index."""
+    return configured if env in os.environ or saved is None else saved
+
+
+def load_index(path, vectors):
+    """Load an index saved with .save(path); `vectors` is the embedding matrix it was built on."""
+    with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+        info = json.load(f)
+    kind = info["kind"]
+    if kind == "exact":
+        return ExactIndex(vectors)
+    if kind == "ivf":
+        grouped_path = os.path.join(path, "grouped.npy")
+        return IVFIndex(
+            vectors,
+            np.load(os.path.join(path, "centroids.npy")),
+            np.load(os.path.join(path, "order.npy")),
+            np.load(os.path.join(path, "offsets.npy")),
+            _search_setting("SURVEYX_IVF_NPROBE", IVF_NPROBE, info.get("nprobe")),
+            np.load(grouped_path, mmap_mode="r") if os.path.exists(grouped_path) else None,
+        )
+    if kind == "hnsw":
+        return HNSWIndex(_faiss().read_index(os.path.join(path, "hnsw.faiss")),
+                         _search_setting("SURVEYX_HNSW_EF_SEARCH", HNSW_EF_SEARCH, info.get("ef_search")))
+    raise ValueError(f"Unknown index kind: {kind}")
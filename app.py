@@ -1,98 +1,50 @@
-import pandas as pd
-import re, os
 import gradio as gr
 
-try:
-    from sentence_transformers import SentenceTransformer, util
-    from rapidfuzz import fuzz
-    ML_AVAILABLE = True
-except ImportError as e:
-    print(f"ML libraries not available: {e}")
-    ML_AVAILABLE = False
+import nco_search
+import snapshot
+import survey_index
+from warmup import Warmup
 
 # ----------------------------
 # Load datasets
 # ----------------------------
-def load_nco_data():
-    return pd.read_csv(r"data\MOCK_DATA_with_NCO.csv")
-
 def load_survey_data():
-    ctl_file_path = r"data\survey_data.ctl"
-    with open(ctl_file_path, "r", encoding="utf-8") as f:
-        ctl_content = f.read()
-
-    infile_match = re.search(r"INFILE\s+'([^']+)'", ctl_content, re.IGNORECASE)
-    if not infile_match:
-        return pd.DataFrame()
-
-    raw_path = infile_match.group(1).strip()
-    if not os.path.isabs(raw_path):
-        data_file_path = os.path.join(os.path.dirname(ctl_file_path), raw_path)
-    else:
-        data_file_path = raw_path
-
-    if not os.path.exists(data_file_path):
-        return pd.DataFrame()
-
-    delimiter_match = re.search(r"FIELDS TERMINATED BY\s+'([^']+)'", ctl_content, re.IGNORECASE)
-    delimiter = delimiter_match.group(1) if delimiter_match else ","
-
-    try:
-        df = pd.read_csv(data_file_path, delimiter=delimiter, encoding="utf-8", quotechar='"')
-        return df
-    except UnicodeDecodeError:
-        return pd.read_csv(data_file_path, delimiter=delimiter, encoding="latin-1", quotechar='"')
+    # Memory-mapped columnar snapshot, rebuilt from the CSV only when it changes
+    return snapshot.load_survey_data()
 
 # ----------------------------
-# Load model + embeddings
+# Background warm-up: the UI serves immediately with substring search and an
+# unindexed survey scan; the model, semantic catalog and survey index replace
+# them as each one becomes ready.
 # ----------------------------
-nco_df = load_nco_data()
+fallback_source = nco_search.CatalogSource()
+survey_df = load_survey_data()
 
-if ML_AVAILABLE:
-    try:
-        print("Loading SentenceTransformer model...")
-        model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-        nco_df['embeddings'] = nco_df['occupation_title'].apply(lambda x: model.encode(str(x), convert_to_tensor=True))
-        print("Model loaded successfully!")
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        ML_AVAILABLE = False
-else:
-    model = None
+def load_semantic_source():
+    model = nco_search.load_model()
+    if model is None:
+        raise RuntimeError("ML libraries or model not available")
+    return nco_search.CatalogSource(model)
+
+warmup = Warmup([
+    ("semantic search", load_semantic_source),
+    ("survey index", lambda: survey_index.SurveyIndex(survey_df)),
+]).start()
+
+def warmup_status():
+    return warmup.describe()
 
 def search_occupation(query, top_k):
-    if not ML_AVAILABLE or model is None:
-        # Fallback to simple text matching
-        temp_df = nco_df.copy()
-        temp_df['simple_score'] = temp_df['occupation_title'].apply(
-            lambda title: 1.0 if query.lower() in title.lower() else 0.0
-        )
-        results = temp_df[temp_df['simple_score'] > 0].sort_values(by='simple_score', ascending=False).head(top_k)
-        if results.empty:
-            return pd.DataFrame({'occupation_title': ['No matches found'], 'nco_code': ['N/A'], 'final_score': [0.0]})
-        return results[['occupation_title', 'nco_code', 'simple_score']].rename(columns={'simple_score': 'final_score'})
-    
     try:
-        query_emb = model.encode(query, convert_to_tensor=True)
-        temp_df = nco_df.copy()
-        temp_df['semantic_score'] = temp_df['embeddings'].apply(
-            lambda emb: float(util.cos_sim(query_emb, emb))
-        )
-        temp_df['fuzzy_score'] = temp_df['occupation_title'].apply(
-            lambda title: fuzz.token_sort_ratio(query.lower(), title.lower()) / 100
-        )
-        temp_df['final_score'] = 0.7 * temp_df['semantic_score'] + 0.3 * temp_df['fuzzy_score']
-        results = temp_df.sort_values(by='final_score', ascending=False).head(top_k)
-        return results[['occupation_title', 'nco_code', 'final_score']]
+        source = warmup.get("semantic search") or fallback_source
+        return source.get().search(query, top_k)
     except Exception as e:
         print(f"Error in search_occupation: {e}")
-        return pd.DataFrame({'occupation_title': ['Search error'], 'nco_code': ['N/A'], 'final_score': [0.0]})
+        return nco_search.message_frame('Search error')
 
 # ----------------------------
 # Gradio Tab 1 - Survey Data
 # ----------------------------
-survey_df = load_survey_data()
-
 def preview_survey():
     if survey_df.empty:
         return "⚠ Survey data not loaded.", None
@@ -103,7 +55,11 @@ def search_survey(column, value):
         return "⚠ Survey data not loaded.", None
     if value.strip() == "":
         return "⚠ Please enter a search value", None
-    results = survey_df[survey_df[column].astype(str).str.contains(value, case=False, na=False)]
+    index = warmup.get("survey index")
+    if index is not None:
+        results = index.search(column, value.strip())
+    else:
+        results = survey_index.scan(survey_df, column, value.strip())
     return f"Found {len(results)} records", results
 
 # ----------------------------
@@ -111,6 +67,7 @@ def search_survey(column, value):
 # ----------------------------
 with gr.Blocks() as demo:
     gr.Markdown("# 🚀 SurveyX (Gradio Version)")
+    gr.Markdown(warmup_status, every=2)
     with gr.Tab("📊 Survey Data Explorer"):
         gr.Markdown("### Browse & Search Survey Data")
         show_btn = gr.Button("Preview Survey Data")
@@ -134,4 +91,5 @@ with gr.Blocks() as demo:
         occu_results = gr.Dataframe(interactive=False)
         search_occu_btn.click(search_occupation, inputs=[job_input, topk_slider], outputs=occu_results)
 
-demo.launch(debug=True, share=True)
+if __name__ == "__main__":
+    demo.launch(debug=True, share=True)
@@ -0,0 +1,372 @@
+"""
+Batch NCO code assignment for survey_data.
+
+The table (or the rows matching IN-list filters, optionally only those with
+no nco_code yet) is read in chunks of `chunk_size` rows by keyset on
+(id, ROWID), so every chunk is an index range scan and the scan can resume
+from any key. For each chunk the distinct occupations not scored before are
+ranked against the NCO catalog in one vectorized call, in a pool of
+`workers` processes that each load the model once (workers=0 scores in this
+process). Predicted codes are written back with one array-bound executemany
+(batch errors enabled) per chunk, by ROWID, and only where they change.
+
+Chunks are committed in scan order; after each commit the last key is saved
+to the checkpoint file, so a rerun after a crash carries on from there.
+
+    python batch_predict.py --workers 4 --chunk-size 20000 --only-missing --state Kerala
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import db
+import nco_search
+import shared_store
+import survey_queries
+
+PREDICT_CHUNK_SIZE = int(os.environ.get("SURVEYX_PREDICT_CHUNK_SIZE", "20000"))
+PREDICT_WORKERS = int(os.environ.get("SURVEYX_PREDICT_WORKERS", "2"))
+PREDICT_MIN_SCORE = float(os.environ.get("SURVEYX_PREDICT_MIN_SCORE", "0"))
+PREDICT_CHECKPOINT = os.environ.get("SURVEYX_PREDICT_CHECKPOINT", os.path.join("data", "batch_predict.ckpt"))
+# Occupations already scored in this run, kept so repeated titles are scored once
+PREDICT_CACHE_SIZE = int(os.environ.get("SURVEYX_PREDICT_CACHE_SIZE", "200000"))
+
+UPDATE_SQL = "UPDATE survey_data SET nco_code = :1 WHERE ROWID = :2"
+FILTER_COLUMNS = ("state", "district", "gender", "year")
+
+
+class ModelUnavailable(RuntimeError):
+    """No semantic model loaded; substring matches are not good enough to write back."""
+
+
+class PredictionCancelled(Exception):
+    """The run was stopped between chunks; the checkpoint holds the last committed key."""
+
+
+def default_catalog():
+    """The catalog the API serves: from the shared store when configured, else the model."""
+    if shared_store.STORE_DIR:
+        return shared_store.SharedCatalogSource().get()
+    return nco_search.CatalogSource(nco_search.load_model()).get()
+
+
+def predict_titles(catalog, titles, min_score=0.0):
+    """Best NCO code for each title in one batch: [(nco_code or None, score)].
+    Codes scoring below min_score come back as None."""
+    if not catalog.semantic_ready:
+        raise ModelUnavailable("The occupation model is not loaded")
+    predictions = []
+    for matches in catalog.classify(titles, 1):
+        best = matches[0] if matches else None
+        if best is None or best["score"] < min_score:
+            predictions.append((None, best["score"] if best else 0.0))
+        else:
+            predictions.append((best["nco_code"], best["score"]))
+    return predictions
+
+
+_worker = {}
+
+
+def _init_worker(load_catalog):
+    _worker["catalog"] = load_catalog()
+
+
+def _predict_in_worker(titles, min_score):
+    return predict_titles(_worker["catalog"], titles, min_score)
+
+
+class Checkpoint:
+    """Last committed (id, rowid) key and running totals, saved atomically after
+    every chunk; tied to the filters so a different run does not pick it up."""
+
+    def __init__(self, path, scope):
+        self.path = path
+        self.scope = scope
+        self.after = None
+        self.processed = 0
+        self.updated = 0
+
+    @classmethod
+    def load(cls, path, scope):
+        checkpoint = cls(path, scope)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if state.get("scope") != scope:
+            print(f"{path} belongs to a run with different filters; starting over")
+            return checkpoint
+        checkpoint.after = tuple(state["after"]) if state.get("after") else None
+        checkpoint.processed = state.get("processed", 0)
+        checkpoint.updated = state.get("updated", 0)
+        return checkpoint
+
+    @property
+    def resumed(self):
+        return self.after is not None
+
+    def mark(self, after, processed, updated):
+        self.after = after
+        self.processed += processed
+        self.updated += updated
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"scope": self.scope, "after": self.after,
+                       "processed": self.processed, "updated": self.updated}, f)
+        os.replace(tmp, self.path)
+
+
+def count_rows(conn, filters=None, only_missing=False):
+    where, params = survey_queries.filter_clause(filters)
+    if only_missing:
+        where += " AND s.nco_code IS NULL"
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT COUNT(*) FROM survey_data s WHERE 1=1{where}", params)
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+
+def read_chunk(conn, filters=None, after=None, limit=PREDICT_CHUNK_SIZE, only_missing=False):
+    """[(id, rowid, occupation, nco_code)] for the next `limit` rows after `after`."""
+    sql, params = survey_queries.scan_query(["occupation", "nco_code"], filters, after, limit,
+                                            missing="nco_code" if only_missing else None)
+    cur = conn.cursor()
+    try:
+        cur.arraysize = limit
+        cur.execute(sql, params)
+        return [tuple(row) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def write_chunk(conn, updates):
+    """executemany + commit of [(nco_code, rowid)]; returns the rows the database rejected."""
+    cur = conn.cursor()
+    try:
+        if updates:
+            cur.executemany(UPDATE_SQL, updates, batcherrors=True)
+        errors = [(e.offset, e.message) for e in cur.getbatcherrors()] if updates else []
+        conn.commit()
+    finally:
+        cur.close()
+    return errors
+
+
+def print_progress(stats):
+    total = stats["total"]
+    done = stats["processed"]
+    share = f" ({100 * done / total:.1f}%)" if total else ""
+    eta = f", ETA {stats['eta_seconds']:.0f} s" if stats.get("eta_seconds") is not None else ""
+    print(f"{done}/{total} rows{share}, {stats['updated']} updated, {stats['rows_per_sec']} rows/s{eta}")
+
+
+def run(filters=None, only_missing=False, chunk_size=None, workers=PREDICT_WORKERS, min_score=None,
+        checkpoint_path=None, connect=db.connect, load_catalog=default_catalog, progress=print_progress,
+        stop_event=None):
+    """Predict and write back nco_code for the selected rows; returns a report dict.
+
+    filters is {column: [values]} on FILTER_COLUMNS. load_catalog must be a
+    module-level function when workers > 0 (it runs in each worker process).
+    checkpoint_path defaults to PREDICT_CHECKPOINT; "" disables checkpoints.
+    Setting stop_event stops the run after the chunk being written.
+    """
+    chunk_size = chunk_size or PREDICT_CHUNK_SIZE
+    min_score = PREDICT_MIN_SCORE if min_score is None else min_score
+    filters = {column: list(values) for column, values in (filters or {}).items() if values}
+    unknown = [column for column in filters if column not in FILTER_COLUMNS]
+    if unknown:
+        raise survey_queries.InvalidQuery(f"Cannot filter batch predictions on: {', '.join(unknown)}")
+    if checkpoint_path is None:
+        checkpoint_path = PREDICT_CHECKPOINT
+    scope = {"filters": filters, "only_missing": only_missing, "min_score": min_score}
+    checkpoint = Checkpoint.load(checkpoint_path, scope) if checkpoint_path else Checkpoint("", scope)
+    if checkpoint.resumed:
+        print(f"Resuming after id {checkpoint.after[0]} ({checkpoint.processed} rows already done)")
+
+    conn = connect()
+    known = {}  # occupation -> (nco_code, score)
+    stats = {"total": 0, "processed": checkpoint.processed, "updated": checkpoint.updated,
+             "rejected": 0, "scored_titles": 0, "chunks": 0}
+    start_time = time.perf_counter()
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(load_catalog,))
+        score = lambda titles: executor.submit(_predict_in_worker, titles, min_score)
+    else:
+        catalog = load_catalog()
+        score = lambda titles: predict_titles(catalog, titles, min_score)
+
+    def resolve(scored):
+        return scored.result() if executor is not None else scored
+
+    def finish(rows, titles, scored, last_key):
+        """Write one chunk back and move the checkpoint past it."""
+        if len(known) + len(titles) > PREDICT_CACHE_SIZE:
+            known.clear()
+        if titles:
+            known.update(zip(titles, resolve(scored)))
+        in_flight.difference_update(titles)
+        stats["scored_titles"] += len(titles)
+        # Titles scored for an earlier chunk but dropped with the cache since
+        lost = [t for t in dict.fromkeys(row[2] for row in rows) if t is not None and t not in known]
+        if lost:
+            known.update(zip(lost, resolve(score(lost))))
+            stats["scored_titles"] += len(lost)
+        updates = []
+        for _row_id, rid, occupation, current in rows:
+            if occupation is None:
+                continue
+            code = known[occupation][0]
+            if code is not None and code != current:
+                updates.append((code, rid))
+        errors = write_chunk(conn, updates)
+        stats["rejected"] += len(errors)
+        stats["processed"] += len(rows)
+        stats["updated"] += len(updates) - len(errors)
+        stats["chunks"] += 1
+        checkpoint.mark(last_key, len(rows), len(updates) - len(errors))
+        if progress:
+            elapsed = time.perf_counter() - start_time
+            rate = (stats["processed"] - done_before) / elapsed if elapsed > 0 else 0.0
+            remaining = max(stats["total"] - stats["processed"], 0)
+            progress({**stats, "rows_per_sec": round(rate, 1),
+                      "eta_seconds": remaining / rate if rate > 0 else None})
+
+    cancelled = False
+    pending = deque()
+    in_flight = set()  # titles submitted for chunks not written yet
+    done_before = checkpoint.processed
+    try:
+        stats["total"] = count_rows(conn, filters, only_missing)
+        if only_missing:
+            # Rows filled by the interrupted run no longer match the count; rows it
+            # processed but left NULL still do, so only the updated ones are added
+            stats["total"] += checkpoint.updated
+        after = checkpoint.after
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                cancelled = True
+                break
+            rows = read_chunk(conn, filters, after, chunk_size, only_missing)
+            if not rows:
+                break
+            after = (rows[-1][0], rows[-1][1])
+            titles = [t for t in dict.fromkeys(row[2] for row in rows)
+                      if t is not None and t not in known and t not in in_flight]
+            in_flight.update(titles)
+            pending.append((rows, titles, score(titles) if titles else None, after))
+            # Keep every worker busy while bounding the chunks held in memory;
+            # chunks are written in scan order so the checkpoint key only moves forward
+            while len(pending) > max(1, 2 * workers):
+                finish(*pending.popleft())
+            if len(rows) < chunk_size:
+                break
+        while pending:
+            finish(*pending.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        conn.close()
+
+    elapsed = time.perf_counter() - start_time
+    report = {
+        **stats,
+        "workers": workers,
+        "chunk_size": chunk_size,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round((stats["processed"] - done_before) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    if cancelled:
+        raise PredictionCancelled(f"Stopped after {stats['processed']} rows; rerun to resume. {report}")
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return report
+
+
+class BatchJob:
+    """One batch run at a time in a background thread, for the API: start()
+    returns False while a run is going; status() has the latest progress."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._state = {"state": "idle"}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, **kwargs):
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._state = {"state": "running", "started": time.time(), "progress": None,
+                           "options": {k: v for k, v in kwargs.items() if not callable(v)}}
+            self._thread = threading.Thread(target=self._run, kwargs=kwargs, name="batch-predict", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, **kwargs):
+        def progress(stats):
+            self._state["progress"] = stats
+
+        try:
+            report = run(progress=progress, stop_event=self._stop, **kwargs)
+            self._state.update(state="finished", report=report)
+        except PredictionCancelled as e:
+            self._state.update(state="cancelled", message=str(e))
+        except Exception as e:
+            print(f"Batch prediction failed: {e}")
+            self._state.update(state="failed", message=str(e))
+        self._state["stopped"] = time.time()
+
+    def cancel(self):
+        """Ask the run to stop after the chunk it is writing."""
+        self._stop.set()
+        return self.status()
+
+    def status(self):
+        return dict(self._state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign nco_code to survey_data rows from their occupation")
+    parser.add_argument("--state", action="append", help="only these states (repeat for several)")
+    parser.add_argument("--district", action="append")
+    parser.add_argument("--gender", action="append")
+    parser.add_argument("--year", action="append", type=int)
+    parser.add_argument("--only-missing", action="store_true", help="skip rows that already have an nco_code")
+    parser.add_argument("--chunk-size", type=int, default=PREDICT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=PREDICT_WORKERS,
+                        help="model processes (0 scores in this process)")
+    parser.add_argument("--min-score", type=float, default=PREDICT_MIN_SCORE,
+                        help="leave rows whose best match scores lower untouched")
+    parser.add_argument("--checkpoint", default=PREDICT_CHECKPOINT, help='checkpoint file ("" disables)')
+    args = parser.parse_args()
+
+    filters = {"state": args.state, "district": args.district, "gender": args.gender, "year": args.year}
+    report = run(filters, args.only_missing, args.chunk_size, args.workers, args.min_score, args.checkpoint)
+    print(f"Scored {report['processed']} rows ({report['scored_titles']} distinct occupations), "
+          f"updated {report['updated']} ({report['rejected']} rejected) in {report['seconds']} s: "
+          f"{report['rows_per_sec']} rows/s")
+
+
+if __name__ == "__main__":
+    main()
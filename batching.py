@@ -0,0 +1,85 @@
+"""
+Async micro-batching for the single-title classification endpoint.
+
+Concurrent requests are queued and handed to `process_batch` together, so the
+model sees one encode batch instead of one call per request. A batch is closed
+when it reaches `max_batch_size` or `max_wait_ms` after its first item,
+whichever comes first; while a batch runs in a worker thread the next one fills.
+"""
+import asyncio
+
+
+class MicroBatcher:
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=10):
+        """`process_batch(items) -> results` is a blocking function returning one
+        result per item, in order."""
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        if self._task is None:
+            raise RuntimeError("MicroBatcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Requests whose client went away are dropped before doing any work
+        return [(item, fut) for item, fut in batch if not fut.done()]
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            try:
+                results = await asyncio.to_thread(self.process_batch, [item for item, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,84 @@
+"""
+Recall@k vs. latency of the ANN indexes against brute-force search.
+
+Uses synthetic clustered unit vectors shaped like the MiniLM embeddings
+(384-d), so it runs without the model:
+
+    python benchmarks/bench_ann.py --rows 100000 --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ann_index
+
+
+def synthetic_vectors(rows, dim, clusters, rng):
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return ann_index._normalise(vectors).astype(np.float32)
+
+
+def evaluate(index, queries, truth, k):
+    latencies = []
+    hits = 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        idx, _ = index.search(q, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(idx.tolist()) & set(expected.tolist()))
+    lat = np.array(latencies) * 1000
+    return hits / (len(queries) * k), np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic_vectors(args.rows, args.dim, args.clusters, rng)
+    queries = ann_index._normalise(
+        vectors[rng.integers(0, args.rows, args.queries)]
+        + (0.5 / np.sqrt(args.dim)) * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    ).astype(np.float32)
+
+    exact = ann_index.ExactIndex(vectors)
+    truth = [exact.search(q, args.k)[0] for q in queries]
+    print(f"{args.rows} rows x {args.dim} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'index':24s} {'build s':>8s} {'recall':>7s} {'p50 ms':>8s} {'p99 ms':>8s}")
+    recall, p50, p99 = evaluate(exact, queries, truth, args.k)
+    print(f"{'exact':24s} {0:8.1f} {recall:7.3f} {p50:8.2f} {p99:8.2f}")
+
+    start = time.perf_counter()
+    ivf = ann_index.build_index(vectors, "ivf")
+    build = time.perf_counter() - start
+    for nprobe in (1, 4, 8, 16, 32, 64):
+        ivf.nprobe = nprobe
+        recall, p50, p99 = evaluate(ivf, queries, truth, args.k)
+        print(f"{'ivf nprobe=' + str(nprobe):24s} {build:8.1f} {recall:7.3f} {p50:8.2f} {p99:8.2f}")
+
+    if not ann_index.faiss_available():
+        print("faiss not installed; skipping HNSW")
+        return
+    start = time.perf_counter()
+    hnsw = ann_index.build_index(vectors, "hnsw")
+    build = time.perf_counter() - start
+    for ef in (16, 32, 64, 128, 256):
+        hnsw.ef_search = ef
+        recall, p50, p99 = evaluate(hnsw, queries, truth, args.k)
+        print(f"{'hnsw ef_search=' + str(ef):24s} {build:8.1f} {recall:7.3f} {p50:8.2f} {p99:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Async database path: /data throughput under concurrent clients, and the
+/search fan-out over several states run one partition at a time vs
+concurrently.
+
+The SQLite stand-in adds a simulated round trip (SURVEYX_FAKE_LATENCY_MS) to
+every execute and fetch. "threaded" drives the blocking pool from worker
+threads (SURVEYX_DB_ASYNC=0, what thick mode uses), so each round trip holds
+a thread; "async" uses the stand-in's asyncio pool, where a round trip holds
+nothing. Requests go through the ASGI app in-process (httpx.ASGITransport):
+
+    python benchmarks/bench_async.py --latency-ms 20 --clients 200 --pool-max 100
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+MODES = ["threaded", "async"]
+STATES = ["Tamil Nadu", "Kerala", "Karnataka", "Telangana", "Maharashtra"]
+
+
+async def drive(args):
+    import httpx
+
+    import main
+    import nco_search
+    import survey_queries
+
+    nco_search.load_model = lambda *a, **k: None  # substring catalog, no model download
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     headers={"X-API-Key": main.API_KEY}) as client:
+            latencies = []
+            statuses = Counter()
+            gate = asyncio.Semaphore(args.clients)
+
+            async def request(url):
+                async with gate:
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] += 1
+
+            await request("/data?limit=100")  # warm up
+            latencies.clear()
+            statuses.clear()
+            start = time.perf_counter()
+            await asyncio.gather(*(request("/data?limit=100") for _ in range(args.requests)))
+            elapsed = time.perf_counter() - start
+            lat = np.array(latencies) * 1000
+            print(f"  /data x{args.requests}, {args.clients} clients: {args.requests / elapsed:8.1f} req/s  "
+                  f"p50={np.percentile(lat, 50):7.1f} ms  p99={np.percentile(lat, 99):7.1f} ms  "
+                  f"statuses={dict(statuses)}")
+
+            import db
+            parts = survey_queries.partitions({"state": STATES})
+            for concurrency in (1, len(parts)):
+                times = []
+                for _ in range(10):
+                    start = time.perf_counter()
+                    await survey_queries.fetch_page_fanout(db.async_connection, parts, limit=100,
+                                                           concurrency=concurrency)
+                    times.append(time.perf_counter() - start)
+                print(f"  /search {len(parts)} states, {concurrency} partition(s) at a time: "
+                      f"p50={np.percentile(times, 50) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--pool-max", type=int, default=100)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "surveyx_bench_async.db"))
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(drive(args))
+        return
+
+    from bench_download import build_db
+
+    print(f"Preparing {args.rows} rows in {args.db} ...")
+    build_db(args.db, args.rows)
+    for mode in MODES:
+        env = dict(os.environ, SURVEYX_DB_DRIVER="fake", SURVEYX_DB_DSN=args.db,
+                   SURVEYX_FAKE_LATENCY_MS=str(args.latency_ms), SURVEYX_POOL_MAX=str(args.pool_max),
+                   SURVEYX_DB_MAX_CONCURRENCY=str(args.pool_max), SURVEYX_DB_MAX_WAITING=str(args.clients),
+                   SURVEYX_DB_ASYNC="0" if mode == "threaded" else "1")
+        print(f"{mode} (round trip {args.latency_ms:g} ms, pool max {args.pool_max})")
+        subprocess.run([sys.executable, __file__, "--mode", mode, "--latency-ms", str(args.latency_ms),
+                        "--clients", str(args.clients), "--requests", str(args.requests)],
+                       check=True, cwd=ROOT, env=env)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+/download benchmark: old fetchall + StringIO export vs the streaming generator.
+
+Runs each mode in its own process against the SQLite stand-in so peak RSS is
+measured per mode (Linux/macOS only, uses the resource module):
+
+    python benchmarks/bench_download.py --rows 1000000
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ["legacy", "stream", "stream-gzip"]
+
+
+def build_db(path, rows):
+    import fake_oracledb
+
+    conn = fake_oracledb.connect(dsn=path)
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM survey_data")
+    if cur.fetchone()[0] == rows:
+        conn.close()
+        return
+    cur.execute("DELETE FROM survey_data")
+    rng = random.Random(42)
+    states = ["Tamil Nadu", "Kerala", "Karnataka", "Telangana", "Maharashtra"]
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append((i, f"Occupation {rng.randint(1, 5000)}", rng.choice(states),
+                      f"District {rng.randint(1, 300)}", rng.choice(["Male", "Female"]),
+                      rng.randint(1, 100), rng.randint(1, 100), rng.randint(1000, 9999)))
+        if len(batch) == 50000:
+            cur.executemany("INSERT INTO survey_data VALUES (:1, :2, :3, :4, :5, :6, :7, :8)", batch)
+            batch = []
+    if batch:
+        cur.executemany("INSERT INTO survey_data VALUES (:1, :2, :3, :4, :5, :6, :7, :8)", batch)
+    conn.commit()
+    conn.close()
+
+
+def legacy_export(db):
+    """The pre-streaming /download body: fetchall, then build the whole CSV."""
+    with db.get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM survey_data")
+        cols = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+        cur.close()
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(cols)
+    writer.writerows(rows)
+    output.seek(0)
+    return output
+
+
+def run_mode(mode, db_path, arraysize):
+    os.environ["SURVEYX_DB_DRIVER"] = "fake"
+    os.environ["SURVEYX_DB_DSN"] = db_path
+    import db
+    import exports
+
+    db.init_pool(min=1, max=1)
+    start = time.perf_counter()
+    ttfb = None
+    nbytes = 0
+    if mode == "legacy":
+        chunks = legacy_export(db)
+    else:
+        conn, cur = exports.open_export_cursor("SELECT * FROM survey_data", arraysize=arraysize)
+        chunks = exports.iter_csv(conn, cur, compress=(mode == "stream-gzip"))
+    for chunk in chunks:
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        nbytes += len(chunk)
+    total = time.perf_counter() - start
+    db.close_pool()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    print(f"{mode:12s} ttfb={ttfb * 1000:9.1f} ms  total={total:7.2f} s  "
+          f"peak_rss={peak_kb / 1024:8.1f} MiB  out={nbytes / 1e6:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--arraysize", type=int, default=5000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "surveyx_bench_download.db"))
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.db, args.arraysize)
+        return
+
+    print(f"Preparing {args.rows} rows in {args.db} ...")
+    build_db(args.db, args.rows)
+    for mode in MODES:
+        subprocess.run([sys.executable, __file__, "--mode", mode, "--db", args.db,
+                        "--arraysize", str(args.arraysize)], check=True)
+
+
+if __name__ == "__main__":
+    main()
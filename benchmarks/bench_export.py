@@ -0,0 +1,76 @@
+"""
+Export of "two columns for one state": the full /download CSV filtered on the
+client (what analytics jobs did before) vs /export with the projection and
+filter pushed into the SQL, in each output format. Reports time and bytes
+on the wire, through the ASGI app in-process against the SQLite stand-in:
+
+    python benchmarks/bench_export.py --rows 1000000
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+QUERY = "columns=id,income&state=Kerala"
+CASES = [
+    ("/download + client filter", "/download"),
+    ("/export csv", f"/export?format=csv&{QUERY}"),
+    ("/export ndjson", f"/export?format=ndjson&{QUERY}"),
+    ("/export ndjson gzip", f"/export?format=ndjson&gzip=true&{QUERY}"),
+    ("/export arrow zstd", f"/export?format=arrow&{QUERY}"),
+    ("/export parquet zstd", f"/export?format=parquet&{QUERY}"),
+]
+
+
+async def drive():
+    import httpx
+
+    import main
+    import nco_search
+
+    nco_search.load_model = lambda *a, **k: None
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None,
+                                     headers={"X-API-Key": main.API_KEY}) as client:
+            for name, url in CASES:
+                start = time.perf_counter()
+                response = await client.get(url)
+                body = response.content
+                rows = None
+                if url == "/download":
+                    df = pd.read_csv(io.BytesIO(body))
+                    rows = len(df.loc[df["STATE"] == "Kerala", ["ID", "INCOME"]])
+                elapsed = time.perf_counter() - start
+                rows_note = f"  rows={rows}" if rows is not None else ""
+                print(f"{name:28s} {elapsed:7.2f} s  {len(body) / 1e6:9.2f} MB{rows_note}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "surveyx_bench_download.db"))
+    args = parser.parse_args()
+
+    from bench_download import build_db
+
+    print(f"Preparing {args.rows} rows in {args.db} ...")
+    build_db(args.db, args.rows)
+    os.environ["SURVEYX_DB_DRIVER"] = "fake"
+    os.environ["SURVEYX_DB_DSN"] = args.db
+    os.chdir(ROOT)
+    asyncio.run(drive())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+BM25 prefilter: per-query latency and recall@k of OccupationCatalog.rank()
+when semantic and fuzzy scoring are limited to the top BM25 hits, against
+scoring the whole catalog, plus the non-ML fallback (substring scan vs BM25).
+
+The catalog is synthetic (benchmarks/synthetic.py titles, hashing encoder);
+queries are catalog titles with one word dropped and the rest lower-cased:
+
+    python benchmarks/bench_lexical.py --titles 100000 --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import nco_search
+from stub_encoder import StubEncoder
+from synthetic import occupation_titles
+
+
+def timed(fn, queries):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append(time.perf_counter() - start)
+    return results, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[200, 1000, 5000])
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    titles, codes = occupation_titles(args.titles)
+    frame = pd.DataFrame({"occupation_title": titles, "nco_code": codes})
+    print(f"Building a {args.titles}-title catalog ...")
+    catalog = nco_search.build_catalog(frame, StubEncoder(), cache_dir=None)
+    catalog.index = None  # always the exact scan path
+    rng = np.random.default_rng(1)
+    queries = []
+    for i in rng.integers(0, len(titles), args.queries):
+        words = titles[i].lower().split()
+        if len(words) > 1:
+            del words[rng.integers(0, len(words))]
+        queries.append(" ".join(words))
+    catalog.encode(queries)  # query embeddings are cached, so encoding is not timed
+
+    start = time.perf_counter()
+    catalog.lexical
+    print(f"BM25 index built in {time.perf_counter() - start:.2f} s")
+    print(f"{'mode':28s} {f'recall@{args.k}':>9s} {'p50 ms':>8s} {'p99 ms':>8s}")
+
+    nco_search.LEXICAL_PREFILTER_MIN = 0
+    nco_search.LEXICAL_CANDIDATES = 0
+    truth, lat = timed(lambda q: catalog.rank([q], args.k)[0][0], queries)
+    print(f"{'full scan':28s} {1.0:9.3f} {np.percentile(lat, 50):8.2f} {np.percentile(lat, 99):8.2f}")
+    for candidates in args.candidates:
+        nco_search.LEXICAL_CANDIDATES = candidates
+        found, lat = timed(lambda q: catalog.rank([q], args.k)[0][0], queries)
+        recall = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth)) / (len(truth) * args.k)
+        print(f"{f'BM25 top {candidates}':28s} {recall:9.3f} {np.percentile(lat, 50):8.2f} "
+              f"{np.percentile(lat, 99):8.2f}")
+
+    _, lat = timed(lambda q: catalog._substring_rows(q, args.k), queries)
+    print(f"{'fallback: substring':28s} {'-':>9s} {np.percentile(lat, 50):8.2f} {np.percentile(lat, 99):8.2f}")
+    _, lat = timed(lambda q: catalog.lexical.search(q, args.k), queries)
+    print(f"{'fallback: BM25':28s} {'-':>9s} {np.percentile(lat, 50):8.2f} {np.percentile(lat, 99):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+bulk_load throughput against the SQLite stand-in: rows/sec for a grid of
+batch sizes and worker counts, plus the row-at-a-time insert it replaces.
+
+Generates a CSV shaped like data/survey_data.ctl describes it and a matching
+control file in a temp directory:
+
+    python benchmarks/bench_load.py --rows 200000 --batch-sizes 1000,5000,20000 --workers 1,4
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import bulk_load
+import ctl
+import fake_oracledb
+
+CONTROL = """OPTIONS (SKIP=1)
+LOAD DATA
+INFILE '{infile}'
+TRUNCATE
+INTO TABLE survey_data
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+TRAILING NULLCOLS
+(
+  id,
+  occupation,
+  state,
+  district,
+  gender,
+  income,
+  year
+)
+"""
+
+
+def build_csv(path, rows):
+    rng = random.Random(42)
+    states = ["Tamil Nadu", "Kerala", "Karnataka", "Telangana", "Maharashtra"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "occupation", "state", "district", "gender", "income", "year"])
+        for i in range(1, rows + 1):
+            writer.writerow([i, f"Occupation, grade {rng.randint(1, 5000)}", rng.choice(states),
+                             f"District {rng.randint(1, 300)}", rng.choice(["Male", "Female"]),
+                             rng.randint(1, 100), rng.randint(1, 100)])
+
+
+def row_by_row(control, db_path):
+    """One execute + commit per record: the shape of a naive Python loader."""
+    conn = fake_oracledb.connect(dsn=db_path)
+    cur = conn.cursor()
+    cur.execute("DELETE FROM survey_data")
+    sql = bulk_load.insert_sql(control)
+    start = time.perf_counter()
+    loaded = 0
+    for _, fields in ctl.read_records(control):
+        cur.execute(sql, bulk_load.to_row(control, fields))
+        conn.commit()
+        loaded += 1
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return loaded, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-sizes", default="1000,5000,20000")
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--skip-row-by-row", action="store_true")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="surveyx_bench_load_")
+    data_path = os.path.join(tmp, "survey.csv")
+    ctl_path = os.path.join(tmp, "survey.ctl")
+    db_path = os.path.join(tmp, "survey.db")
+    print(f"Preparing {args.rows} rows in {tmp} ...")
+    build_csv(data_path, args.rows)
+    with open(ctl_path, "w", encoding="utf-8") as f:
+        f.write(CONTROL.format(infile="survey.csv"))
+    control = ctl.load_control_file(ctl_path)
+
+    def connect():
+        return fake_oracledb.connect(dsn=db_path)
+
+    if not args.skip_row_by_row:
+        loaded, elapsed = row_by_row(control, db_path)
+        print(f"{'row-by-row':>22s}  {loaded / elapsed:12,.0f} rows/s  ({elapsed:.2f} s)")
+    for workers in (int(w) for w in args.workers.split(",")):
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            report = bulk_load.load(control, batch_size=batch_size, workers=workers,
+                                    checkpoint_path="", connect=connect)
+            label = f"batch={batch_size} workers={workers}"
+            print(f"{label:>22s}  {report['rows_per_sec']:12,.0f} rows/s  ({report['seconds']:.2f} s, "
+                  f"{report['loaded']} loaded, {report['rejected']} rejected)")
+
+
+if __name__ == "__main__":
+    main()
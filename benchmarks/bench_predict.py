@@ -0,0 +1,85 @@
+"""
+Batch nco_code assignment: scoring and updating one row at a time (what
+calling the old single-row /predict for every row amounts to) vs
+batch_predict.run() with vectorized chunks, in this process and in a pool of
+model processes. Uses the synthetic work dir and the hashing encoder, so the
+scoring cost is far below the real model's and the pool matters less here:
+
+    python benchmarks/bench_predict.py --rows 200000 --workers 0 1 2
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+
+def stub_catalog():
+    """Catalog with the hashing encoder; module level so worker processes can load it."""
+    import nco_search
+    from stub_encoder import StubEncoder
+
+    return nco_search.CatalogSource(StubEncoder()).get()
+
+
+def fresh_db(source, target):
+    shutil.copyfile(source, target)
+    import fake_oracledb
+    return lambda: fake_oracledb.connect(dsn=target)
+
+
+def row_by_row(connect, sample):
+    import batch_predict
+
+    catalog = stub_catalog()
+    conn = connect()
+    start = time.perf_counter()
+    rows = batch_predict.read_chunk(conn, limit=sample)
+    for _row_id, rid, occupation, _current in rows:
+        code, _score = batch_predict.predict_titles(catalog, [occupation])[0]
+        cur = conn.cursor()
+        cur.execute(batch_predict.UPDATE_SQL, [code, rid])
+        cur.close()
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return len(rows) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--nco-rows", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--sample", type=int, default=2000, help="rows for the row-by-row baseline")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "surveyx_bench_predict"))
+    args = parser.parse_args()
+
+    from run import prepare
+
+    prepare(args.workdir, args.rows, args.nco_rows, 0)
+    os.chdir(args.workdir)
+    import batch_predict
+
+    source = os.path.join("data", "survey_fake.db")
+    target = os.path.join(tempfile.gettempdir(), "surveyx_bench_predict_run.db")
+    rate = row_by_row(fresh_db(source, target), args.sample)
+    print(f"{'row by row':18s} {rate:10.1f} rows/s  (first {args.sample} rows)")
+    for workers in args.workers:
+        report = batch_predict.run(chunk_size=args.chunk_size, workers=workers, checkpoint_path="",
+                                   connect=fresh_db(source, target), load_catalog=stub_catalog, progress=None)
+        print(f"{f'batch, {workers} workers':18s} {report['rows_per_sec']:10.1f} rows/s  "
+              f"{report['processed']} rows, {report['updated']} updated, "
+              f"{report['scored_titles']} titles scored, {report['seconds']} s")
+    os.remove(target)
+
+
+if __name__ == "__main__":
+    main()
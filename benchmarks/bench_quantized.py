@@ -0,0 +1,124 @@
+"""
+Memory, latency and recall@k of the semantic scan per embedding representation:
+
+    tensor column   one float32 torch tensor per title in a DataFrame column,
+                    stacked for every query (how the catalog used to be held)
+    float32         the contiguous matrix (SURVEYX_EMBEDDING_DTYPE=float32)
+    float16, int8   embedding_store compact copies, without and with the exact
+                    float32 re-ranking of the best RERANK_CANDIDATES rows
+
+Recall is against the float32 top-k. Uses the clustered unit vectors of
+bench_ann.py; the float32 matrix is memory-mapped from disk, as it is from the
+embedding cache, so re-ranking pages in only the candidate rows:
+
+    python benchmarks/bench_quantized.py --rows 200000 --queries 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import ann_index
+import embedding_store
+from bench_ann import synthetic_vectors
+from nco_search import top_k_indices
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def search(store, queries, k, rerank):
+    """(top-k rows per query, per-query latencies) for single-query scans."""
+    found, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        scores = store.scores(q[None, :])[0]
+        if rerank:
+            rows = top_k_indices(scores, max(rerank, k))
+            best = rows[top_k_indices(store.exact_scores(q, rows), k)]
+        else:
+            best = top_k_indices(scores, k)
+        latencies.append(time.perf_counter() - start)
+        found.append(best)
+    return found, np.array(latencies) * 1000
+
+
+def tensor_column(vectors, queries, k):
+    import pandas as pd
+    import torch
+
+    before = rss_mb()
+    frame = pd.DataFrame({"embedding": [torch.tensor(np.array(v)) for v in vectors]})
+    memory = rss_mb() - before
+    found, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        scores = (torch.stack(frame["embedding"].tolist()) @ torch.from_numpy(q)).numpy()
+        found.append(top_k_indices(scores, k))
+        latencies.append(time.perf_counter() - start)
+    return memory, found, np.array(latencies) * 1000
+
+
+def recall(found, truth, k):
+    return sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth)) / (len(truth) * k)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=embedding_store.RERANK_CANDIDATES)
+    parser.add_argument("--tensor-queries", type=int, default=10, help="queries for the slow tensor column")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    path = os.path.join(tempfile.gettempdir(), f"surveyx_bench_quantized_{args.rows}x{args.dim}.npy")
+    if not os.path.exists(path):
+        np.save(path, synthetic_vectors(args.rows, args.dim, args.clusters, rng))
+    vectors = np.load(path, mmap_mode="r")
+    picks = rng.integers(0, args.rows, args.queries)
+    queries = ann_index._normalise(
+        np.asarray(vectors[picks]) + (0.5 / np.sqrt(args.dim)) * rng.standard_normal((args.queries, args.dim))
+    ).astype(np.float32)
+
+    exact = embedding_store.build_store(np.ascontiguousarray(vectors), "float32")
+    truth, latencies = search(exact, queries, args.k, 0)
+    print(f"{args.rows} rows x {args.dim} dims, {args.queries} queries, recall@{args.k}, "
+          f"re-rank {args.rerank} candidates")
+    print(f"{'representation':24s} {'MB':>8s} {'recall':>7s} {'p50 ms':>8s} {'p99 ms':>8s}")
+
+    def report(name, memory, found, lat):
+        print(f"{name:24s} {memory:8.1f} {recall(found, truth, args.k):7.4f} "
+              f"{np.percentile(lat, 50):8.2f} {np.percentile(lat, 99):8.2f}")
+
+    try:
+        memory, found, lat = tensor_column(vectors, queries[:args.tensor_queries], args.k)
+        print(f"{'tensor column':24s} {memory:8.1f} {recall(found, truth[:args.tensor_queries], args.k):7.4f} "
+              f"{np.percentile(lat, 50):8.2f} {np.percentile(lat, 99):8.2f}  (RSS growth, "
+              f"{args.tensor_queries} queries)")
+    except ImportError:
+        print("torch not installed; skipping the tensor column")
+    report("float32", exact.nbytes / 1e6, truth, latencies)
+    for dtype in ("float16", "int8"):
+        store = embedding_store.build_store(vectors, dtype)
+        found, lat = search(store, queries, args.k, 0)
+        report(dtype, store.nbytes / 1e6, found, lat)
+        found, lat = search(store, queries, args.k, args.rerank)
+        report(f"{dtype} + re-rank", store.nbytes / 1e6, found, lat)
+
+
+if __name__ == "__main__":
+    main()
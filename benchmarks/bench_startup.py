@@ -0,0 +1,73 @@
+"""
+App start-up: import time, time to the first occupation search response and
+time until semantic search is ready, for the old eager start-up (import the ML
+stack, load the model and encode the catalog before serving) and the
+background warm-up the apps use now.
+
+Each mode runs in a fresh interpreter so imports are not shared:
+
+    python benchmarks/bench_startup.py
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ["eager", "warmup"]
+
+
+def run_mode(mode, query):
+    start = time.perf_counter()
+    if mode == "eager":
+        from sentence_transformers import SentenceTransformer
+        import nco_search
+        imported = time.perf_counter()
+        try:
+            model = SentenceTransformer(nco_search.MODEL_NAME)
+        except Exception as e:
+            print(f"  model not available ({type(e).__name__}); timing the substring fallback")
+            model = None
+        nco_search.CatalogSource(model).get().search(query, 3)
+        first = ready = time.perf_counter()
+    else:
+        import nco_search
+        from warmup import Warmup
+        imported = time.perf_counter()
+        fallback = nco_search.CatalogSource()
+
+        def load_semantic_source():
+            model = nco_search.load_model()
+            if model is None:
+                raise RuntimeError("ML libraries or model not available")
+            return nco_search.CatalogSource(model)
+
+        warmup = Warmup([("semantic search", load_semantic_source)]).start()
+        fallback.get().search(query, 3)
+        first = time.perf_counter()
+        warmup.wait()
+        ready = time.perf_counter()
+        if warmup.errors:
+            print(f"  warm-up errors: {warmup.errors}")
+    print(f"{mode:8s} import={imported - start:6.2f} s  first_response={first - start:6.2f} s  "
+          f"semantic_ready={ready - start:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=MODES)
+    parser.add_argument("--query", default="software engineer")
+    args = parser.parse_args()
+    if args.mode:
+        os.chdir(ROOT)
+        run_mode(args.mode, args.query)
+        return
+    for mode in MODES:
+        subprocess.run([sys.executable, __file__, "--mode", mode, "--query", args.query], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Benchmark suite for the SurveyX hot paths, runnable without Oracle or the model.
+
+A synthetic work dir (benchmarks/synthetic.py) stands in for data/, the
+SQLite driver (fake_oracledb) for Oracle and a hashing encoder
+(benchmarks/stub_encoder.py) for the SentenceTransformer. Each scenario runs
+in its own process with the work dir as cwd, so peak RSS is per scenario:
+
+    api                FastAPI endpoints of main.py through TestClient
+    search_occupation  catalog build, semantic + fuzzy search, substring and BM25 fallbacks
+    search_survey      survey index build, indexed search, unindexed scan
+    loaders            CSV -> snapshot build, mapped snapshot loads, bulk_load
+
+Reports latency percentiles, throughput and peak RSS. --save writes the
+results as a baseline; --compare checks a run against one and exits with
+status 1 when a metric is worse by more than --tolerance:
+
+    python benchmarks/run.py --rows 100000 --save benchmarks/baselines/100k.json
+    python benchmarks/run.py --rows 100000 --compare benchmarks/baselines/100k.json
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ["api", "search_occupation", "search_survey", "loaders"]
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+def measure(name, fn, repeat=1, items=1):
+    """Call fn() `repeat` times; `items` is the work done per call (rows, queries...)."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    lat_ms = np.array(latencies) * 1000
+    total = sum(latencies)
+    return {
+        "name": name,
+        "calls": repeat,
+        "p50_ms": round(float(np.percentile(lat_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat_ms, 99)), 3),
+        "throughput": round(items * repeat / total, 1) if total > 0 else 0.0,
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _cycle(values):
+    state = {"i": -1}
+
+    def next_value():
+        state["i"] += 1
+        return values[state["i"] % len(values)]
+    return next_value
+
+
+# ----------------------------
+# Scenarios (run inside the work dir)
+# ----------------------------
+def bench_api(rows):
+    os.environ["SURVEYX_DB_DRIVER"] = "fake"
+    os.environ["SURVEYX_DB_DSN"] = os.path.join("data", "survey_fake.db")
+    import nco_search
+    from stub_encoder import StubEncoder
+
+    nco_search.load_model = lambda *args, **kwargs: StubEncoder()
+    from fastapi.testclient import TestClient
+
+    import main
+    import stats_cube
+
+    results = []
+    with TestClient(main.app) as client:
+        headers = {"X-API-Key": main.API_KEY}
+
+        def call(url, method="get", **kwargs):
+            response = getattr(client, method)(url, headers=headers, **kwargs)
+            if response.status_code != 200 or (
+                    "json" in response.headers.get("content-type", "") and
+                    response.json().get("status") == "error"):
+                raise RuntimeError(f"{url}: {response.status_code} {response.text[:200]}")
+            return response
+
+        states = ["Tamil Nadu", "Kerala", "Karnataka", "Andhra Pradesh", "Telangana"]
+        next_state = _cycle(states)
+        results.append(measure("GET /", lambda: call("/"), 200))
+        results.append(measure("GET /data limit=100", lambda: call("/data?limit=100"), 200, 100))
+
+        cursor = {"value": None}
+
+        def next_page():
+            url = "/data?limit=1000" + (f"&cursor={cursor['value']}" if cursor["value"] else "")
+            cursor["value"] = call(url).json()["next_cursor"]
+        results.append(measure("GET /data paged limit=1000", next_page, 50, 1000))
+
+        def search_uncached():
+            main.search_cache.clear()
+            call(f"/search?state={next_state()}&limit=100")
+        results.append(measure("GET /search uncached", search_uncached, 100, 100))
+        results.append(measure("GET /search cached", lambda: call("/search?state=Kerala&limit=100"), 200, 100))
+
+        results.append(measure("GET /download", lambda: call("/download"), 3, rows))
+        results.append(measure("GET /download gzip", lambda: call("/download?gzip=true"), 3, rows))
+
+        def stats_build():
+            main.income_cube = stats_cube.StatsCube()
+            call("/stats")
+        results.append(measure("GET /stats cube build", stats_build, 1, rows))
+        results.append(measure("GET /stats by=state,gender", lambda: call("/stats?by=state,gender"), 50))
+
+        counter = {"n": 0}
+
+        def classify_bulk():
+            counter["n"] += 1
+            titles = [f"{t} {counter['n']}" for t in ("software engineer", "data analyst", "nurse", "teacher")] * 25
+            call("/classify", method="post", json={"titles": titles, "top_k": 3})
+        results.append(measure("POST /classify 100 titles", classify_bulk, 20, 100))
+
+        def classify_one():
+            counter["n"] += 1
+            call(f"/classify?title=civil engineer {counter['n']}&top_k=3")
+        results.append(measure("GET /classify", classify_one, 100))
+    return results
+
+
+def bench_search_occupation(rows):
+    import nco_search
+    import snapshot
+    from stub_encoder import StubEncoder
+
+    nco_df = snapshot.load_nco_data()
+    encoder = StubEncoder()
+    holder = {}
+
+    def build():
+        holder["catalog"] = nco_search.build_catalog(nco_df, encoder, cache_dir=None)
+    results = [measure("catalog build (encode + index)", build, 1, len(nco_df))]
+    catalog = holder["catalog"]
+
+    rng = np.random.default_rng(0)
+    titles = nco_df["occupation_title"].astype(str).tolist()
+    queries = [titles[i].lower().replace(" ii", "") for i in rng.integers(0, len(titles), 512)]
+    next_query = _cycle(queries)
+    # search_batch bypasses the result cache, so every call does the full scoring
+    results.append(measure("semantic + fuzzy query", lambda: catalog.search_batch([next_query()], 5), 200))
+    results.append(measure("batch of 256 queries", lambda: catalog.search_batch(queries[:256], 5), 3, 256))
+    results.append(measure("substring fallback query", lambda: catalog.substring_search(next_query(), 5), 200))
+    results.append(measure("BM25 fallback query", lambda: catalog.lexical_search(next_query(), 5), 200))
+    return results
+
+
+def bench_search_survey(rows):
+    import snapshot
+    import survey_index
+
+    survey_df = snapshot.load_survey_data()
+    holder = {}
+
+    def build():
+        holder["index"] = survey_index.SurveyIndex(survey_df)
+    results = [measure("survey index build", build, 1, len(survey_df))]
+    index = holder["index"]
+    results.append(measure("indexed search state", lambda: index.search("state", "kerala"), 50))
+    results.append(measure("indexed search occupation", lambda: index.search("occupation", "engineer"), 50))
+    results.append(measure("indexed search_all state+gender",
+                           lambda: index.search_all({"state": "kerala", "gender": "female"}, exact=True), 50))
+    results.append(measure("scan occupation (fallback)",
+                           lambda: survey_index.scan(survey_df, "occupation", "engineer"), 5, len(survey_df)))
+    return results
+
+
+def bench_loaders(rows):
+    import bulk_load
+    import ctl
+    import fake_oracledb
+    import snapshot
+
+    def cold():
+        shutil.rmtree(snapshot.SNAPSHOT_DIR, ignore_errors=True)
+        snapshot.load_survey_data()
+    results = [measure("survey snapshot build (CSV parse)", cold, 1, rows)]
+    results.append(measure("survey snapshot mapped load", snapshot.load_survey_data, 5, rows))
+    results.append(measure("nco snapshot mapped load", snapshot.load_nco_data, 5))
+
+    control = ctl.load_control_file(snapshot.SURVEY_CTL_PATH)
+    db_path = os.path.join("data", "bench_load.db")
+
+    def load():
+        bulk_load.load(control, method="TRUNCATE", checkpoint_path="", bad_path=os.devnull,
+                       connect=lambda: fake_oracledb.connect(dsn=db_path))
+    results.append(measure("bulk_load survey file", load, 1, rows))
+    return results
+
+
+def run_scenario(name, rows):
+    results = globals()[f"bench_{name}"](rows)
+    print("RESULT " + json.dumps({"metrics": results, "peak_rss_mb": peak_rss_mb()}))
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def prepare(workdir, rows, nco_rows, seed):
+    import synthetic
+
+    params = {"rows": rows, "nco_rows": nco_rows, "seed": seed}
+    marker = os.path.join(workdir, "params.json")
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == params:
+                return
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Generating {rows} survey rows and {nco_rows} NCO titles in {workdir} ...")
+    synthetic.build_workdir(workdir, rows, nco_rows, seed)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every metric that got worse than the baseline by more than tolerance."""
+    regressions = []
+    for scenario, current in results.items():
+        base = baseline.get("results", {}).get(scenario)
+        if not base:
+            continue
+        if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{scenario}: peak RSS {base['peak_rss_mb']} -> {current['peak_rss_mb']} MB")
+        base_metrics = {m["name"]: m for m in base["metrics"]}
+        for metric in current["metrics"]:
+            old = base_metrics.get(metric["name"])
+            if old is None:
+                continue
+            if metric["p50_ms"] > old["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{scenario} / {metric['name']}: p50 {old['p50_ms']} -> {metric['p50_ms']} ms")
+            if metric["throughput"] < old["throughput"] * (1 - tolerance):
+                regressions.append(f"{scenario} / {metric['name']}: "
+                                   f"throughput {old['throughput']} -> {metric['throughput']}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000, help="survey rows (1k to 10M)")
+    parser.add_argument("--nco-rows", type=int, default=2000, help="NCO catalog titles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--workdir", help="default: <tmp>/surveyx_bench_<rows>")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="baseline file to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(args.scenario, args.rows)
+        return
+
+    workdir = os.path.abspath(args.workdir or os.path.join(tempfile.gettempdir(), f"surveyx_bench_{args.rows}"))
+    prepare(workdir, args.rows, args.nco_rows, args.seed)
+
+    results = {}
+    for scenario in args.scenarios.split(","):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", scenario,
+                               "--rows", str(args.rows)], cwd=workdir, capture_output=True, text=True)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+        if proc.returncode != 0 or not lines:
+            print(f"{scenario} failed:\n{proc.stderr[-2000:]}")
+            sys.exit(2)
+        results[scenario] = json.loads(lines[-1][len("RESULT "):])
+        print(f"\n{scenario} (peak RSS {results[scenario]['peak_rss_mb']} MB)")
+        for m in results[scenario]["metrics"]:
+            print(f"  {m['name']:36s} p50={m['p50_ms']:10.3f} ms  p95={m['p95_ms']:10.3f} ms  "
+                  f"p99={m['p99_ms']:10.3f} ms  {m['throughput']:14,.1f}/s")
+
+    report = {"params": {"rows": args.rows, "nco_rows": args.nco_rows, "seed": args.seed},
+              "python": sys.version.split()[0], "results": results}
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            print(f"\nWarning: baseline was recorded with {baseline.get('params')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions (> {args.tolerance:.0%} worse than {args.compare}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Deterministic stand-in for the SentenceTransformer model in benchmarks.
+
+Texts are embedded by hashing their character trigrams into `dim` buckets
+(signed feature hashing) and L2-normalising, so similar titles get similar
+vectors, results are reproducible, and nothing is downloaded. Only the
+encode() signature nco_search uses is implemented; it is far cheaper than the
+real model, so benchmark numbers exclude model inference.
+"""
+import zlib
+
+import numpy as np
+
+DIM = 384
+
+
+class StubEncoder:
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def _vector(self, text):
+        text = f"  {str(text).lower()} "
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for i in range(len(text) - 2):
+            h = zlib.crc32(text[i:i + 3].encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vector
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.stack([self._vector(t) for t in texts]) if texts else np.empty((0, self.dim), np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            vectors /= norms
+        return vectors[0] if single else vectors
@@ -0,0 +1,158 @@
+"""
+Deterministic synthetic SurveyX data for the benchmarks.
+
+Survey rows follow the column list, delimiter and enclosure of
+data/survey_data.ctl; the NCO catalog has the MOCK_DATA_with_NCO.csv layout.
+Rows are generated in NumPy chunks, so 10M-row files take seconds and bounded
+memory. build_workdir() lays the files out like the repository's data/
+folder, so code run with the work dir as cwd picks them up unchanged:
+
+    python benchmarks/synthetic.py --rows 1000000 --nco-rows 5000 --out /tmp/surveyx_synth
+"""
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ctl
+
+CHUNK_ROWS = 500_000
+STATES = {
+    "Tamil Nadu": ["Chennai", "Coimbatore", "Madurai", "Salem", "Tiruchirappalli", "Vellore", "Erode"],
+    "Kerala": ["Ernakulam", "Thiruvananthapuram", "Kozhikode", "Thrissur", "Kollam", "Kannur"],
+    "Karnataka": ["Bengaluru Urban", "Mysuru", "Belagavi", "Dharwad", "Udupi", "Kalaburagi"],
+    "Andhra Pradesh": ["Visakhapatnam", "Guntur", "Krishna", "Kurnool", "Tirupati", "Nellore"],
+    "Telangana": ["Hyderabad", "Warangal", "Karimnagar", "Nizamabad", "Khammam", "Medak"],
+}
+GENDERS = ["Male", "Female", "Non-binary", "Agender", "Genderfluid"]
+LEVELS = ["", "Junior ", "Senior ", "Assistant ", "Chief ", "Lead ", "Associate "]
+FIELDS = ["Software", "Data", "Civil", "Mechanical", "Electrical", "Marketing", "Sales", "Account",
+          "Quality", "Research", "Nursing", "Teaching", "Legal", "Financial", "Systems", "Web"]
+ROLES = ["Engineer", "Analyst", "Manager", "Coordinator", "Assistant", "Technician", "Officer",
+         "Consultant", "Designer", "Developer", "Administrator", "Supervisor", "Specialist"]
+GRADES = ["", " I", " II", " III", " IV"]
+
+
+def occupation_titles(n, seed=0):
+    """n distinct titles ("Senior Data Analyst II", ...) with their NCO codes."""
+    combos = [f"{lvl}{field} {role}{grade}" for lvl in LEVELS for field in FIELDS
+              for role in ROLES for grade in GRADES]
+    rng = np.random.default_rng(seed)
+    titles = [combos[i] for i in rng.permutation(len(combos))[:n]]
+    for i in range(len(titles), n):  # more than the word lists can spell
+        titles.append(f"{combos[i % len(combos)]} {i // len(combos) + 1}")
+    codes = rng.integers(1000, 10000, n)
+    return titles, codes
+
+
+def iter_rows(rows, seed=0, titles=None, codes=None, chunk_rows=CHUNK_ROWS):
+    """DataFrames of up to chunk_rows survey rows with every column SurveyX knows
+    (id, occupation_title, state, district, gender, income, year, nco_code)."""
+    if titles is None:
+        titles, codes = occupation_titles(2000, seed)
+    titles = np.asarray(titles, dtype=object)
+    states = np.asarray(list(STATES), dtype=object)
+    districts = [np.asarray(d, dtype=object) for d in STATES.values()]
+    genders = np.asarray(GENDERS, dtype=object)
+    rng = np.random.default_rng(seed + 1)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        state_idx = rng.integers(0, len(states), n)
+        district = np.empty(n, dtype=object)
+        for s, names in enumerate(districts):
+            mask = state_idx == s
+            district[mask] = names[rng.integers(0, len(names), int(mask.sum()))]
+        occ = rng.integers(0, len(titles), n)
+        yield pd.DataFrame({
+            "id": np.arange(start + 1, start + n + 1),
+            "occupation_title": titles[occ],
+            "state": states[state_idx],
+            "district": district,
+            "gender": genders[rng.integers(0, len(genders), n)],
+            "income": rng.integers(1, 101, n),
+            "year": rng.integers(1, 101, n),
+            "nco_code": np.asarray(codes)[occ],
+        })
+
+
+def _to_csv(chunks, path, columns, delimiter=",", enclosure='"', rename=None):
+    first = True
+    for chunk in chunks:
+        if rename:
+            chunk = chunk.rename(columns=rename)
+        chunk[columns].to_csv(path, sep=delimiter, quotechar=enclosure or '"', index=False,
+                              header=first, mode="w" if first else "a")
+        first = False
+
+
+def write_survey_csv(path, rows, control, seed=0, titles=None, codes=None):
+    """Survey file in the layout the control file describes (header row for SKIP=1)."""
+    columns = [c.name for c in control.data_columns]
+    delimiter = "\t" if control.delimiter == ctl.WHITESPACE else control.delimiter
+    _to_csv(iter_rows(rows, seed, titles, codes), path, columns, delimiter, control.enclosure,
+            rename={"occupation_title": "occupation"})
+
+
+def write_nco_csv(path, rows, seed=0):
+    """NCO catalog in the MOCK_DATA_with_NCO.csv layout, one row per distinct title."""
+    titles, codes = occupation_titles(rows, seed)
+    chunks = iter_rows(rows, seed, titles, codes)
+    first = True
+    for start, chunk in zip(range(0, rows, CHUNK_ROWS), chunks):
+        chunk["occupation_title"] = titles[start:start + len(chunk)]
+        chunk["nco_code"] = codes[start:start + len(chunk)]
+        chunk.to_csv(path, index=False, header=first, mode="w" if first else "a")
+        first = False
+    return titles, codes
+
+
+def seed_db(dsn, survey_path, control):
+    """Load the survey file into the SQLite stand-in with the bulk loader."""
+    import bulk_load
+    import fake_oracledb
+
+    return bulk_load.load(control, survey_path, method="TRUNCATE", workers=1, checkpoint_path="",
+                          bad_path=os.devnull, connect=lambda: fake_oracledb.connect(dsn=dsn))
+
+
+def build_workdir(out, rows, nco_rows=2000, seed=0, with_db=True):
+    """data/ layout under `out`: survey_data.ctl (copied from the repo) with its
+    INFILE, MOCK_DATA_with_NCO.csv and, with_db, the SQLite stand-in survey_fake.db."""
+    data_dir = os.path.join(out, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    ctl_path = os.path.join(data_dir, "survey_data.ctl")
+    shutil.copyfile(os.path.join(ROOT, "data", "survey_data.ctl"), ctl_path)
+    control = ctl.load_control_file(ctl_path)
+
+    titles, codes = write_nco_csv(os.path.join(data_dir, "MOCK_DATA_with_NCO.csv"), nco_rows, seed)
+    write_survey_csv(control.infile, rows, control, seed, titles, codes)
+    db_path = os.path.join(data_dir, "survey_fake.db")
+    if with_db:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        seed_db(db_path, control.infile, control)
+    return {"ctl": ctl_path, "survey": control.infile, "nco": os.path.join(data_dir, "MOCK_DATA_with_NCO.csv"),
+            "db": db_path}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--nco-rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--no-db", action="store_true")
+    args = parser.parse_args()
+    paths = build_workdir(args.out, args.rows, args.nco_rows, args.seed, not args.no_db)
+    for name, path in paths.items():
+        print(f"{name:7s} {path}")
+
+
+if __name__ == "__main__":
+    main()
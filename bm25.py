@@ -0,0 +1,116 @@
+"""
+BM25 inverted index over the NCO occupation titles.
+
+Titles are NFC-normalised, case-folded and split into runs of letters,
+combining marks and digits, so Tamil and Devanagari words (whose vowel signs
+are combining marks, not letters) stay whole tokens. Postings are stored
+CSR-style: `offsets[t]:offsets[t + 1]` of `docs` / `weights` lists the titles
+containing term t with their precomputed BM25 weight, so a query only touches
+the postings of its own terms, not the whole catalog. A query word that is not
+in the vocabulary is expanded to the terms it prefixes ("engin" -> "engineer",
+"engineering"), since queries are often typed partially.
+
+    index = BM25Index(titles)
+    index.search("data analyst", n) -> (rows, scores in [0, 1]), best first
+"""
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from ann_index import top_n
+
+BM25_K1 = float(os.environ.get("SURVEYX_BM25_K1", "1.2"))
+BM25_B = float(os.environ.get("SURVEYX_BM25_B", "0.75"))
+PREFIX_MIN_CHARS = 3
+PREFIX_MAX_TERMS = 50
+
+
+def _token_pattern():
+    # \w has letters and digits but not combining marks (M*), which Indic
+    # scripts use for vowel signs and viramas; ZWJ/ZWNJ also occur inside words
+    # (Basic Multilingual Plane only: it holds every Indian script)
+    marks = "".join(chr(c) for c in range(0x300, 0x10000) if unicodedata.category(chr(c))[0] == "M")
+    return re.compile("(?:[^\\W_]|[" + re.escape(marks) + "\u200c\u200d])+")
+
+
+_TOKEN_RE = _token_pattern()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(unicodedata.normalize("NFC", str(text)).casefold())
+
+
+class BM25Index:
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        vocab = {}
+        term_ids, doc_ids, tfs = [], [], []
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+
+        self.n_docs = len(documents)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+        self.idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norm = k1 * (1 - b + b * lengths[doc_ids] / avg_length)
+        weights = self.idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)
+
+        order = np.argsort(term_ids, kind="stable")
+        self.docs = doc_ids[order].astype(np.int32)
+        self.weights = weights[order].astype(np.float32)
+        self.offsets = np.concatenate([[0], np.cumsum(df.astype(np.int64))])
+        self.vocab = vocab
+        self._sorted_terms = sorted(vocab)
+
+    def __len__(self):
+        return self.n_docs
+
+    def _expand(self, token):
+        """Vocabulary ids for one query token: itself, or the terms it prefixes."""
+        term = self.vocab.get(token)
+        if term is not None:
+            return [term]
+        if len(token) < PREFIX_MIN_CHARS:
+            return []
+        start = bisect_left(self._sorted_terms, token)
+        found = []
+        for candidate in self._sorted_terms[start:start + PREFIX_MAX_TERMS]:
+            if not candidate.startswith(token):
+                break
+            found.append(self.vocab[candidate])
+        return found
+
+    def search(self, query, n):
+        """Top-n (rows, scores) of the titles sharing a word with the query.
+        Scores are divided by the query's maximum possible BM25 score, so they
+        fall in [0, 1] and compare across queries; no shared word, no row."""
+        expanded = [self._expand(token) for token in dict.fromkeys(tokenize(query))]
+        groups = [ids for ids in expanded if ids]
+        if not groups:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Words found nowhere count as the rarest term, so they still lower the score
+        bound = (sum(float(self.idf[ids].max()) for ids in groups)
+                 + (len(expanded) - len(groups)) * float(self.idf.max())) * (self.k1 + 1)
+        terms = [term for ids in groups for term in ids]
+        docs = np.concatenate([self.docs[self.offsets[t]:self.offsets[t + 1]] for t in terms])
+        weights = np.concatenate([self.weights[self.offsets[t]:self.offsets[t + 1]] for t in terms])
+        rows, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        best = top_n(scores, n)
+        return rows[best].astype(np.int64), np.minimum(scores[best] / bound, 1.0)
@@ -0,0 +1,329 @@
+"""
+Native bulk loader for SQL*Loader control files (data/survey_data.ctl).
+
+The control file is parsed with ctl.parse(); its data file is streamed record
+by record and cut into batches of `batch_size` rows. Each batch is inserted
+with one array-bound executemany (batch errors enabled) and committed, on one
+of `workers` connections, so memory stays bounded by the batches in flight.
+
+Records that cannot be loaded (too few fields without TRAILING NULLCOLS, or
+rejected by the database) go to the bad file, like SQL*Loader's .bad file;
+the load stops once more than ERRORS records were rejected. Committed batches
+are recorded in a checkpoint file, so a rerun after a crash skips them and
+carries on where it stopped.
+
+    python bulk_load.py data/survey_data.ctl --batch-size 5000 --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ctl
+import db
+from cache import file_version
+
+LOAD_BATCH_SIZE = int(os.environ.get("SURVEYX_LOAD_BATCH_SIZE", "5000"))
+LOAD_WORKERS = int(os.environ.get("SURVEYX_LOAD_WORKERS", "4"))
+
+
+class LoadAborted(Exception):
+    """The load stopped early (too many rejected records or a table that must be empty)."""
+
+
+def to_row(control, fields):
+    """Bind values for one record, in load_columns order; raises ValueError for a bad record."""
+    data_columns = control.data_columns
+    if len(fields) < len(data_columns) and not control.trailing_nullcols:
+        raise ValueError(f"Expected {len(data_columns)} fields, found {len(fields)}")
+    values = dict(zip((c.name for c in data_columns), (v.strip() or None for v in fields)))
+    row = []
+    for column in control.load_columns:
+        row.append(column.constant if column.constant is not None else values.get(column.name))
+    return row
+
+
+def insert_sql(control):
+    columns = control.load_columns
+    binds = ", ".join(f":{i}" for i in range(1, len(columns) + 1))
+    return f"INSERT INTO {control.table} ({', '.join(c.name for c in columns)}) VALUES ({binds})"
+
+
+class Checkpoint:
+    """Record ranges already committed, merged into as few [start, end] spans as possible.
+    Saved atomically after every batch; tied to the data file's mtime/size."""
+
+    def __init__(self, path, source_version):
+        self.path = path
+        self.source_version = list(source_version) if source_version else None
+        self.ranges = []
+        self.loaded = 0
+        self.rejected = 0
+
+    @classmethod
+    def load(cls, path, source_version):
+        checkpoint = cls(path, source_version)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if state.get("source_version") != checkpoint.source_version:
+            print(f"{path} belongs to a different version of the data file; starting over")
+            return checkpoint
+        checkpoint.ranges = [tuple(r) for r in state.get("ranges", [])]
+        checkpoint.loaded = state.get("loaded", 0)
+        checkpoint.rejected = state.get("rejected", 0)
+        return checkpoint
+
+    @property
+    def resumed(self):
+        return bool(self.ranges)
+
+    def covers(self, record_no):
+        return any(start <= record_no <= end for start, end in self.ranges)
+
+    def mark(self, start, end, loaded, rejected):
+        merged = []
+        for lo, hi in sorted(self.ranges + [(start, end)]):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self.ranges = merged
+        self.loaded += loaded
+        self.rejected += rejected
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source_version": self.source_version, "ranges": self.ranges,
+                       "loaded": self.loaded, "rejected": self.rejected}, f)
+        os.replace(tmp, self.path)
+
+
+class _Connections:
+    """One connection per worker thread, all closed at the end of the load."""
+
+    def __init__(self, connect):
+        self.connect = connect
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+
+
+def _insert_batch(connections, sql, rows):
+    """executemany + commit; returns the [(offset, reason)] of rows the database rejected."""
+    conn = connections.get()
+    cur = conn.cursor()
+    try:
+        cur.executemany(sql, rows, batcherrors=True)
+        errors = [(e.offset, e.message) for e in cur.getbatcherrors()]
+        conn.commit()
+    finally:
+        cur.close()
+    return errors
+
+
+def _prepare_table(control, method, connect):
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        if method == "INSERT":
+            cur.execute(f"SELECT COUNT(*) FROM {control.table} WHERE ROWNUM = 1")
+            if cur.fetchone()[0]:
+                raise LoadAborted(f"Table {control.table} is not empty (use APPEND, REPLACE or TRUNCATE)")
+        elif method == "REPLACE":
+            cur.execute(f"DELETE FROM {control.table}")
+        elif method == "TRUNCATE":
+            cur.execute(f"TRUNCATE TABLE {control.table}")
+        cur.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load(control, data_path=None, batch_size=None, workers=LOAD_WORKERS, method=None,
+         checkpoint_path=None, bad_path=None, connect=db.connect, encoding="utf-8", max_errors=None):
+    """Load the control file's data file; returns a report dict with rows/sec.
+
+    batch_size defaults to the control file's ROWS option, then LOAD_BATCH_SIZE.
+    checkpoint_path defaults to <data file>.ckpt and bad_path to the BADFILE
+    clause or <data file>.bad. Pass checkpoint_path="" to disable checkpoints.
+    """
+    data_path = data_path or control.infile
+    batch_size = batch_size or control.rows or LOAD_BATCH_SIZE
+    method = (method or control.method).upper()
+    max_errors = control.errors if max_errors is None else max_errors
+    if checkpoint_path is None:
+        checkpoint_path = f"{os.path.splitext(data_path)[0]}.ckpt"
+    bad_path = bad_path or control.badfile or f"{os.path.splitext(data_path)[0]}.bad"
+
+    checkpoint = Checkpoint.load(checkpoint_path, file_version(data_path)) if checkpoint_path \
+        else Checkpoint("", None)
+    if not checkpoint.resumed:
+        _prepare_table(control, method, connect)
+
+    sql = insert_sql(control)
+    connections = _Connections(connect)
+    stats = {"read": 0, "skipped": 0, "loaded": 0, "rejected": 0, "batches": 0}
+    reasons = []
+    start_time = time.perf_counter()
+    bad_file = open(bad_path, "a" if checkpoint.resumed else "w", encoding=encoding, newline="")
+    bad_writer = csv.writer(bad_file, delimiter="\t" if control.delimiter == ctl.WHITESPACE else control.delimiter,
+                            quotechar=control.enclosure or '"')
+
+    def reject(record_no, fields, reason):
+        bad_writer.writerow(fields)
+        stats["rejected"] += 1
+        if len(reasons) < 10:
+            reasons.append(f"record {record_no}: {reason}")
+
+    def finish(first, last, records, rejects, errors):
+        """Book one batch: rejects are (record number, fields, reason) found
+        before insert, errors the (offset into records, reason) from the database."""
+        for record_no, fields, reason in rejects:
+            reject(record_no, fields, reason)
+        for offset, reason in errors:
+            record_no, fields = records[offset]
+            reject(record_no, fields, reason)
+        bad_file.flush()
+        loaded = len(records) - len(errors)
+        stats["loaded"] += loaded
+        stats["batches"] += 1
+        checkpoint.mark(first, last, loaded, len(rejects) + len(errors))
+
+    pending = {}
+    unbooked = []
+    rejected_before = checkpoint.rejected  # by earlier, interrupted runs
+
+    def over_limit(current=0):
+        """Whether the records rejected so far exceed ERRORS: those written to
+        the bad file, those found in batches still in flight and `current`."""
+        in_flight = sum(len(batch[3]) for batch in pending.values())
+        return rejected_before + stats["rejected"] + in_flight + current > max_errors
+
+    def drain(limit):
+        while len(pending) > limit:
+            for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                batch = pending.pop(future)
+                if future.exception() is not None:
+                    raise future.exception()
+                finish(*batch, future.result())
+
+    aborted = None
+    first = last = None
+    rows, records, rejects = [], [], []
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bulk-load")
+    try:
+        for record_no, fields in ctl.read_records(control, data_path, encoding):
+            if checkpoint.covers(record_no):
+                stats["skipped"] += 1
+                continue
+            stats["read"] += 1
+            first = record_no if first is None else first
+            last = record_no
+            try:
+                rows.append(to_row(control, fields))
+                records.append((record_no, fields))
+            except ValueError as e:
+                rejects.append((record_no, fields, str(e)))
+            if over_limit(len(rejects)):
+                aborted = f"More than {max_errors} records rejected"
+                unbooked = rejects
+                break
+            if len(rows) >= batch_size:
+                future = executor.submit(_insert_batch, connections, sql, rows)
+                pending[future] = (first, last, records, rejects)
+                first = last = None
+                rows, records, rejects = [], [], []
+                # Bound the batches in flight so reading never runs far ahead of the database
+                drain(2 * max(1, workers) - 1)
+                if over_limit():
+                    aborted = f"More than {max_errors} records rejected"
+                    break
+        if first is not None and aborted is None:
+            if rows:
+                future = executor.submit(_insert_batch, connections, sql, rows)
+                pending[future] = (first, last, records, rejects)
+            else:
+                finish(first, last, records, rejects, [])
+        drain(0)
+        if aborted is None and over_limit():
+            aborted = f"More than {max_errors} records rejected"
+        # Into the bad file, but not the checkpoint: a rerun retries the unfinished batch
+        for record_no, bad_fields, reason in unbooked:
+            reject(record_no, bad_fields, reason)
+        bad_file.flush()
+    except BaseException:
+        # Checkpoint the batches that did commit, so a rerun does not repeat them
+        executor.shutdown(wait=True)
+        for future, batch in pending.items():
+            if not future.cancelled() and future.exception() is None:
+                finish(*batch, future.result())
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        connections.close()
+        bad_file.close()
+
+    elapsed = time.perf_counter() - start_time
+    report = {
+        **stats,
+        "workers": workers,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(stats["loaded"] / elapsed, 1) if elapsed > 0 else 0.0,
+        "bad_file": bad_path,
+        "first_rejects": reasons,
+        "aborted": aborted,
+    }
+    if aborted:
+        raise LoadAborted(f"{aborted}; see {bad_path}. Rerun to resume after fixing the data. {report}")
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a data file described by a SQL*Loader control file")
+    parser.add_argument("control", nargs="?", default=os.path.join("data", "survey_data.ctl"))
+    parser.add_argument("--data", help="data file (default: the control file's INFILE)")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--method", choices=ctl.LOAD_METHODS)
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <data file>.ckpt)")
+    parser.add_argument("--bad", help="bad file (default: BADFILE or <data file>.bad)")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--errors", type=int, help="rejected records allowed (default: ERRORS option)")
+    args = parser.parse_args()
+
+    control = ctl.load_control_file(args.control)
+    report = load(control, args.data, args.batch_size, args.workers, args.method,
+                  args.checkpoint, args.bad, encoding=args.encoding, max_errors=args.errors)
+    print(f"Loaded {report['loaded']} rows ({report['rejected']} rejected, {report['skipped']} already loaded) "
+          f"in {report['seconds']} s: {report['rows_per_sec']} rows/s")
+    for reason in report["first_rejects"]:
+        print(f"  {reason}")
+
+
+if __name__ == "__main__":
+    main()
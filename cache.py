@@ -0,0 +1,179 @@
+"""
+Bounded in-process result cache: LRU eviction, per-entry TTL, limits on both
+entry count and (approximate) bytes, and single-flight de-duplication so
+concurrent callers asking for the same missing key compute it once.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+CACHE_TTL = float(os.environ.get("SURVEYX_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.environ.get("SURVEYX_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.environ.get("SURVEYX_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def approx_size(value, _depth=0):
+    """Rough memory footprint of a cached value."""
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    size = sys.getsizeof(value)
+    if _depth < 3:
+        if isinstance(value, dict):
+            size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+        elif isinstance(value, (list, tuple)):
+            size += sum(approx_size(v, _depth + 1) for v in value)
+    return size
+
+
+def file_version(path):
+    """Changes whenever the file is rewritten; used to key caches on source data."""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class TTLCache:
+    def __init__(self, name, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 sizeof=approx_size):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            return False, None
+        self._data.move_to_end(key)
+        return True, entry[2]
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def get(self, key):
+        """(hit, value)"""
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return hit, value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while self._data and (len(self._data) > self.max_entries or self.bytes > self.max_bytes):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, calling compute() on a miss. Concurrent misses
+        for the same key wait for the first caller instead of recomputing."""
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                self.hits += 1
+                return value
+            self.misses += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def get_or_compute_async(self, key, compute):
+        """get_or_compute for coroutines: `compute()` returns an awaitable, and
+        callers waiting on an in-flight computation suspend instead of blocking."""
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                self.hits += 1
+                return value
+            self.misses += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,231 @@
+"""
+SQL*Loader control file parsing (data/survey_data.ctl).
+
+parse() understands the subset of the control file syntax SurveyX uses:
+
+    OPTIONS (SKIP=n, ROWS=n, ERRORS=n)
+    LOAD DATA
+    INFILE 'file' [BADFILE 'file']
+    [INSERT | APPEND | REPLACE | TRUNCATE]
+    INTO TABLE name
+    FIELDS TERMINATED BY {'c' | X'hh' | WHITESPACE} [OPTIONALLY] ENCLOSED BY 'c'
+    TRAILING NULLCOLS
+    (column [FILLER | CONSTANT 'value' | <type spec>], ...)
+
+Type specs and NULLIF clauses are kept on the column but not interpreted; the
+database converts the character data on insert. read_records() streams the
+data file's records the way the control file describes them, for the bulk
+loader and the survey snapshot alike.
+"""
+import csv
+import os
+import re
+
+LOAD_METHODS = ("INSERT", "APPEND", "REPLACE", "TRUNCATE")
+WHITESPACE = "WHITESPACE"
+
+_OPTIONS_RE = re.compile(r"OPTIONS\s*\(([^)]*)\)", re.IGNORECASE)
+_INFILE_RE = re.compile(r"INFILE\s+(?:'([^']+)'|\"([^\"]+)\")", re.IGNORECASE)
+_BADFILE_RE = re.compile(r"BADFILE\s+(?:'([^']+)'|\"([^\"]+)\")", re.IGNORECASE)
+_TABLE_RE = re.compile(r"INTO\s+TABLE\s+([\w$#.\"]+)", re.IGNORECASE)
+_METHOD_RE = re.compile(r"\b(INSERT|APPEND|REPLACE|TRUNCATE)\b", re.IGNORECASE)
+_TERMINATED_RE = re.compile(r"TERMINATED\s+BY\s+(WHITESPACE|X'([0-9A-Fa-f]+)'|'([^']*)')", re.IGNORECASE)
+_ENCLOSED_RE = re.compile(r"(OPTIONALLY\s+)?ENCLOSED\s+BY\s+(?:X'([0-9A-Fa-f]+)'|'([^']*)')", re.IGNORECASE)
+_TRAILING_RE = re.compile(r"TRAILING\s+NULLCOLS", re.IGNORECASE)
+_CONSTANT_RE = re.compile(r"\bCONSTANT\s+(?:'([^']*)'|\"([^\"]*)\"|(\S+))", re.IGNORECASE)
+
+
+class ControlFileError(ValueError):
+    """The control file is missing a required clause or uses unsupported syntax."""
+
+
+class Column:
+    def __init__(self, name, spec="", filler=False, constant=None):
+        self.name = name
+        self.spec = spec
+        self.filler = filler
+        self.constant = constant
+
+    def __repr__(self):
+        return f"Column({self.name!r}, filler={self.filler}, constant={self.constant!r})"
+
+
+class ControlFile:
+    def __init__(self, path, infile, table, columns, delimiter=",", enclosure=None,
+                 optionally_enclosed=False, trailing_nullcols=False, skip=0, rows=None,
+                 errors=50, method="INSERT", badfile=None):
+        self.path = path
+        self.infile = infile
+        self.table = table
+        self.columns = columns
+        self.delimiter = delimiter
+        self.enclosure = enclosure
+        self.optionally_enclosed = optionally_enclosed
+        self.trailing_nullcols = trailing_nullcols
+        self.skip = skip
+        self.rows = rows
+        self.errors = errors
+        self.method = method
+        self.badfile = badfile
+
+    @property
+    def data_columns(self):
+        """Columns that take a field from the data file (in field order)."""
+        return [c for c in self.columns if c.constant is None]
+
+    @property
+    def load_columns(self):
+        """Columns that are inserted into the table."""
+        return [c for c in self.columns if not c.filler]
+
+
+def read_ctl(ctl_path):
+    with open(ctl_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _resolve(ctl_path, raw_path):
+    raw_path = raw_path.strip()
+    if not os.path.isabs(raw_path):
+        return os.path.join(os.path.dirname(ctl_path), raw_path)
+    return raw_path
+
+
+def data_file_path(ctl_path, ctl_content=None):
+    """Path of the INFILE, resolved relative to the control file; None if absent."""
+    ctl_content = ctl_content if ctl_content is not None else read_ctl(ctl_path)
+    infile_match = _INFILE_RE.search(ctl_content)
+    if not infile_match:
+        return None
+    return _resolve(ctl_path, infile_match.group(1) or infile_match.group(2))
+
+
+def _strip_comments(text):
+    return "\n".join(re.sub(r"--.*$", "", line) for line in text.splitlines())
+
+
+def _char(hex_value, literal):
+    return bytes.fromhex(hex_value).decode("latin-1") if hex_value else literal
+
+
+def _column_list(text, start):
+    """Contents of the first balanced (...) at or after `start`, split on top-level commas."""
+    open_at = text.find("(", start)
+    if open_at < 0:
+        raise ControlFileError("Column list not found")
+    depth, quote, parts, current = 0, None, [], []
+    for ch in text[open_at:]:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+            if depth == 1:
+                continue
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                parts.append("".join(current))
+                return [p.strip() for p in parts if p.strip()]
+        elif ch == "," and depth == 1:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    raise ControlFileError("Unbalanced parentheses in column list")
+
+
+def _parse_column(spec):
+    match = re.match(r"\s*(\"[^\"]+\"|[\w$#]+)\s*(.*)", spec, re.DOTALL)
+    if not match:
+        raise ControlFileError(f"Cannot parse column: {spec!r}")
+    name, rest = match.group(1).strip('"').lower(), match.group(2).strip()
+    constant = _CONSTANT_RE.search(rest)
+    if constant:
+        value = next(g for g in constant.groups() if g is not None)
+        return Column(name, rest, constant=value)
+    return Column(name, rest, filler=bool(re.match(r"(BOUND)?FILLER\b", rest, re.IGNORECASE)))
+
+
+def parse(ctl_content, ctl_path=""):
+    text = _strip_comments(ctl_content)
+
+    options = {}
+    options_match = _OPTIONS_RE.search(text)
+    if options_match:
+        for item in options_match.group(1).split(","):
+            if "=" in item:
+                key, value = item.split("=", 1)
+                options[key.strip().upper()] = value.strip().strip("'\"")
+
+    infile = _INFILE_RE.search(text)
+    if not infile:
+        raise ControlFileError("INFILE clause not found")
+    table = _TABLE_RE.search(text)
+    if not table:
+        raise ControlFileError("INTO TABLE clause not found")
+    badfile = _BADFILE_RE.search(text)
+
+    # Clauses between INTO TABLE and the column list
+    fields_at = text.find("(", table.end())
+    header = text[table.end():fields_at] if fields_at >= 0 else text[table.end():]
+    method = _METHOD_RE.search(text[:table.start()]) or _METHOD_RE.search(header)
+
+    delim = ","
+    terminated = _TERMINATED_RE.search(header)
+    if terminated:
+        if terminated.group(1).upper() == WHITESPACE:
+            delim = WHITESPACE
+        else:
+            delim = _char(terminated.group(2), terminated.group(3))
+    enclosure = None
+    optionally = False
+    enclosed = _ENCLOSED_RE.search(header)
+    if enclosed:
+        optionally = bool(enclosed.group(1))
+        enclosure = _char(enclosed.group(2), enclosed.group(3))
+
+    columns = [_parse_column(spec) for spec in _column_list(text, table.end())]
+    if not columns:
+        raise ControlFileError("Empty column list")
+
+    return ControlFile(
+        path=ctl_path,
+        infile=_resolve(ctl_path, infile.group(1) or infile.group(2)),
+        table=table.group(1),
+        columns=columns,
+        delimiter=delim,
+        enclosure=enclosure,
+        optionally_enclosed=optionally,
+        trailing_nullcols=bool(_TRAILING_RE.search(header)),
+        skip=int(options.get("SKIP", 0)),
+        rows=int(options["ROWS"]) if "ROWS" in options else None,
+        errors=int(options.get("ERRORS", 50)),
+        method=method.group(1).upper() if method else "INSERT",
+        badfile=_resolve(ctl_path, badfile.group(1) or badfile.group(2)) if badfile else None,
+    )
+
+
+def load_control_file(ctl_path):
+    return parse(read_ctl(ctl_path), ctl_path)
+
+
+def read_records(control, data_path=None, encoding="utf-8"):
+    """Yield (record number, fields) for every data record after SKIP.
+    Record numbers count data records from 1, as in SQL*Loader logs."""
+    path = data_path or control.infile
+    with open(path, "r", encoding=encoding, newline="") as f:
+        if control.delimiter == WHITESPACE:
+            reader = (line.split() for line in f)
+        elif control.enclosure:
+            reader = csv.reader(f, delimiter=control.delimiter, quotechar=control.enclosure)
+        else:
+            reader = csv.reader(f, delimiter=control.delimiter, quoting=csv.QUOTE_NONE)
+        record_no = 0
+        for fields in reader:
+            if not fields:
+                continue
+            record_no += 1
+            if record_no > control.skip:
+                yield record_no - control.skip, fields
@@ -0,0 +1,327 @@
+"""
+Shared Oracle connection pool for the SurveyX services.
+
+The pool is created once per process (FastAPI startup) and every request
+borrows a connection from it instead of opening its own session. python-oracledb
+runs in thin mode unless ORACLE_CLIENT_LIB_DIR is set, in which case the
+Instant Client is initialised when the pool is created (needed for 11g).
+
+Async endpoints use async_connection(): python-oracledb's asyncio pool in thin
+mode, or the blocking pool driven from worker threads in thick mode (the
+asyncio API is thin-only). Either way at most DB_MAX_CONCURRENCY requests
+per process use the database at once and at most DB_MAX_WAITING queue behind
+them; anything beyond that is refused with PoolUnavailable right away instead
+of piling up.
+"""
+import asyncio
+import importlib
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+import metrics
+
+DB_DRIVER = os.environ.get("SURVEYX_DB_DRIVER", "oracledb")  # "oracledb" or "fake"
+DB_USER = os.environ.get("SURVEYX_DB_USER", "penta_survey")
+DB_PASS = os.environ.get("SURVEYX_DB_PASS", "555")
+DB_DSN = os.environ.get("SURVEYX_DB_DSN", "//localhost:1522/orcl")
+ORACLE_CLIENT_LIB_DIR = os.environ.get("ORACLE_CLIENT_LIB_DIR")
+
+POOL_MIN = int(os.environ.get("SURVEYX_POOL_MIN", "2"))
+POOL_MAX = int(os.environ.get("SURVEYX_POOL_MAX", "10"))
+POOL_INCREMENT = int(os.environ.get("SURVEYX_POOL_INCREMENT", "1"))
+POOL_WAIT_TIMEOUT_MS = int(os.environ.get("SURVEYX_POOL_WAIT_TIMEOUT_MS", "5000"))
+POOL_PING_INTERVAL = int(os.environ.get("SURVEYX_POOL_PING_INTERVAL", "60"))
+STMT_CACHE_SIZE = int(os.environ.get("SURVEYX_STMT_CACHE_SIZE", "40"))
+
+DB_ASYNC = os.environ.get("SURVEYX_DB_ASYNC", "1") == "1"  # 0: always use the thread fallback
+DB_MAX_CONCURRENCY = int(os.environ.get("SURVEYX_DB_MAX_CONCURRENCY", str(POOL_MAX)))
+DB_MAX_WAITING = int(os.environ.get("SURVEYX_DB_MAX_WAITING", "100"))
+
+_pool = None
+_async_pool = None
+_limiter = None
+_pool_lock = threading.Lock()
+_client_initialised = False
+
+
+class PoolUnavailable(Exception):
+    """No connection could be handed out (pool not started, exhausted or DB down)."""
+
+
+def get_driver():
+    """Return the DB-API module in use: python-oracledb or the SQLite stand-in."""
+    if DB_DRIVER == "fake":
+        return importlib.import_module("fake_oracledb")
+    return importlib.import_module("oracledb")
+
+
+def _init_client(driver):
+    global _client_initialised
+    if ORACLE_CLIENT_LIB_DIR and not _client_initialised:
+        driver.init_oracle_client(lib_dir=ORACLE_CLIENT_LIB_DIR)
+        _client_initialised = True
+
+
+def connect():
+    """Open a standalone connection (scripts and one-off jobs)."""
+    driver = get_driver()
+    _init_client(driver)
+    return driver.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
+
+
+def init_pool(min=POOL_MIN, max=POOL_MAX, increment=POOL_INCREMENT,
+              wait_timeout=POOL_WAIT_TIMEOUT_MS, stmtcachesize=STMT_CACHE_SIZE):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        driver = get_driver()
+        _init_client(driver)
+        _pool = driver.create_pool(
+            user=DB_USER,
+            password=DB_PASS,
+            dsn=DB_DSN,
+            min=min,
+            max=max,
+            increment=increment,
+            getmode=driver.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=wait_timeout,
+            stmtcachesize=stmtcachesize,
+            ping_interval=POOL_PING_INTERVAL,
+        )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close(force=True)
+            _pool = None
+
+
+def acquire():
+    """Borrow a pooled connection; raises PoolUnavailable if none arrives in time."""
+    pool = _pool
+    if pool is None:
+        raise PoolUnavailable("Database pool is not initialised")
+    driver = get_driver()
+    try:
+        with metrics.timer("pool_acquire"):
+            return pool.acquire()
+    except driver.Error as e:
+        raise PoolUnavailable(f"Database unavailable: {e}") from e
+
+
+def release(conn):
+    pool = _pool
+    if pool is not None:
+        pool.release(conn)
+    else:
+        conn.close()
+
+
+@contextmanager
+def get_connection():
+    conn = acquire()
+    try:
+        yield conn
+    finally:
+        release(conn)
+
+
+def pool_stats():
+    pool = _pool
+    if pool is None:
+        return {"initialised": False}
+    stats = {
+        "initialised": True,
+        "driver": DB_DRIVER,
+        "thin_mode": not _client_initialised,
+        "opened": pool.opened,
+        "busy": pool.busy,
+        "min": pool.min,
+        "max": pool.max,
+        "increment": pool.increment,
+        "wait_timeout_ms": pool.wait_timeout,
+        "stmtcachesize": pool.stmtcachesize,
+    }
+    if _limiter is not None:
+        stats["async"] = {"native": _async_pool is not None, **_limiter.stats()}
+        if _async_pool is not None:
+            stats["async"].update(opened=_async_pool.opened, busy=_async_pool.busy)
+    return stats
+
+
+# ----------------------------
+# asyncio
+# ----------------------------
+class AsyncLimiter:
+    """At most `limit` holders at once and at most `max_waiting` callers queued
+    behind them; a caller that would queue beyond that, or waits longer than
+    `timeout` seconds, gets PoolUnavailable."""
+
+    def __init__(self, limit=DB_MAX_CONCURRENCY, max_waiting=DB_MAX_WAITING,
+                 timeout=POOL_WAIT_TIMEOUT_MS / 1000):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PoolUnavailable("Too many requests waiting for the database")
+        self.waiting += 1
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), self.timeout)
+        except BaseException as e:
+            # The acquire can complete just as the wait gives up (timeout or the
+            # caller being cancelled); hand that slot back instead of leaking it
+            if acquire.done() and not acquire.cancelled() and acquire.exception() is None:
+                self._semaphore.release()
+            else:
+                acquire.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise PoolUnavailable("Timed out waiting for a database slot")
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {"limit": self.limit, "max_waiting": self.max_waiting, "in_flight": self.in_flight,
+                "waiting": self.waiting, "rejected": self.rejected}
+
+
+class ThreadedCursor:
+    """asyncio cursor API over a blocking cursor; every call runs in a worker thread."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name == "_cursor":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+    async def execute(self, statement, parameters=None, **kwargs):
+        await asyncio.to_thread(self._cursor.execute, statement, parameters, **kwargs)
+
+    async def fetchone(self):
+        return await asyncio.to_thread(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        if size is None:
+            return await asyncio.to_thread(self._cursor.fetchmany)
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+    def close(self):
+        self._cursor.close()
+
+
+class ThreadedConnection:
+    def __init__(self, conn):
+        self.sync = conn
+
+    def cursor(self):
+        return ThreadedCursor(self.sync.cursor())
+
+    async def commit(self):
+        await asyncio.to_thread(self.sync.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self.sync.rollback)
+
+
+def async_supported(driver=None):
+    driver = driver or get_driver()
+    return DB_ASYNC and hasattr(driver, "create_pool_async") and not ORACLE_CLIENT_LIB_DIR
+
+
+async def init_async_pool(min=POOL_MIN, max=POOL_MAX, increment=POOL_INCREMENT,
+                          wait_timeout=POOL_WAIT_TIMEOUT_MS, stmtcachesize=STMT_CACHE_SIZE):
+    """Start the asyncio pool (thin mode) and the concurrency limiter; call
+    from the running event loop, after init_pool()."""
+    global _async_pool, _limiter
+    _limiter = AsyncLimiter()
+    driver = get_driver()
+    if async_supported(driver) and _async_pool is None:
+        _async_pool = driver.create_pool_async(
+            user=DB_USER,
+            password=DB_PASS,
+            dsn=DB_DSN,
+            min=min,
+            max=max,
+            increment=increment,
+            getmode=driver.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=wait_timeout,
+            stmtcachesize=stmtcachesize,
+            ping_interval=POOL_PING_INTERVAL,
+        )
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool, _limiter
+    pool, _async_pool, _limiter = _async_pool, None, None
+    if pool is not None:
+        await pool.close(force=True)
+
+
+async def _acquire_async():
+    pool = _async_pool
+    if pool is None:
+        return ThreadedConnection(await asyncio.to_thread(acquire))
+    driver = get_driver()
+    try:
+        with metrics.timer("pool_acquire"):
+            return await pool.acquire()
+    except driver.Error as e:
+        raise PoolUnavailable(f"Database unavailable: {e}") from e
+
+
+async def _release_async(conn):
+    if isinstance(conn, ThreadedConnection):
+        await asyncio.to_thread(release, conn.sync)
+    elif _async_pool is not None:
+        await _async_pool.release(conn)
+    else:
+        await conn.close()
+
+
+@asynccontextmanager
+async def async_connection():
+    """Borrow a connection with the asyncio cursor API (execute, fetchmany...
+    are coroutines). Raises PoolUnavailable when the process is saturated."""
+    limiter = _limiter
+    if limiter is None:
+        raise PoolUnavailable("Database pool is not initialised")
+    async with limiter:
+        conn = await _acquire_async()
+        try:
+            yield conn
+        finally:
+            await _release_async(conn)
+
+
+def async_stats():
+    return _limiter.stats() if _limiter is not None else None
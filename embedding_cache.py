@@ -0,0 +1,178 @@
+"""
+Persistent on-disk store for NCO catalog embeddings.
+
+Vectors are kept per model under data/.embedding_cache/<model>/ as a .npy file
+in catalog order, next to a .npy of title hashes and a small meta.json. When the
+catalog is unchanged the vectors are returned as a read-only memory map, so a
+restart costs milliseconds. Otherwise only titles whose hash is not cached yet
+are encoded, rows for titles that disappeared are dropped, and a new generation
+of files is published atomically (meta.json is replaced last), so the Gradio
+and Streamlit apps can share one cache directory.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+
+import numpy as np
+
+CACHE_DIR = os.path.join("data", ".embedding_cache")
+LOCK_TIMEOUT = 600
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_title(title):
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", str(title))).strip()
+
+
+def title_keys(titles):
+    """16-byte blake2b digest of each normalised title."""
+    return np.array(
+        [hashlib.blake2b(normalize_title(t).encode("utf-8"), digest_size=16).digest() for t in titles],
+        dtype="S16",
+    )
+
+
+def model_dir(model_name, cache_dir=CACHE_DIR):
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    return os.path.join(cache_dir, slug)
+
+
+class _FileLock:
+    """Cross-process lock based on exclusive creation of a lock file."""
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                # A lock older than the timeout was left behind by a dead process
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.timeout:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.path}")
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_generation(model_name, cache_dir=CACHE_DIR):
+    meta = _read_meta(model_dir(model_name, cache_dir))
+    return meta["generation"] if meta else None
+
+
+def _load_generation(directory, meta):
+    keys = np.load(os.path.join(directory, meta["keys_file"]))
+    vectors = np.load(os.path.join(directory, meta["vectors_file"]), mmap_mode="r")
+    return keys, vectors
+
+
+def _publish(directory, model_name, keys, vectors, old_meta):
+    generation = (old_meta or {}).get("generation", 0) + 1
+    vectors_file = f"vectors-{generation}.npy"
+    keys_file = f"keys-{generation}.npy"
+    np.save(os.path.join(directory, vectors_file), vectors)
+    np.save(os.path.join(directory, keys_file), keys)
+    meta = {
+        "model": model_name,
+        "generation": generation,
+        "count": int(len(keys)),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "vectors_file": vectors_file,
+        "keys_file": keys_file,
+    }
+    tmp = os.path.join(directory, f"meta.json.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, "meta.json"))
+
+    # Old generations may still be mapped by another process (Windows refuses
+    # to delete them); they get another chance on the next publish.
+    for name in os.listdir(directory):
+        if name.endswith(".npy") and name not in (vectors_file, keys_file):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return meta
+
+
+def load_embeddings(model, model_name, titles, encode, cache_dir=CACHE_DIR):
+    """Return embeddings for titles (catalog order), encoding only uncached titles.
+
+    `encode(model, titles)` must return a normalised float32 matrix.
+    """
+    titles = [str(t) for t in titles]
+    keys = title_keys(titles)
+    directory = model_dir(model_name, cache_dir)
+
+    meta = _read_meta(directory)
+    if meta and meta.get("count") == len(keys):
+        try:
+            cached_keys, vectors = _load_generation(directory, meta)
+            if np.array_equal(cached_keys, keys):
+                return vectors
+        except OSError:
+            pass  # superseded by a concurrent publish; retry under the lock
+
+    os.makedirs(directory, exist_ok=True)
+    with _FileLock(os.path.join(directory, ".lock")):
+        # Another process may have refreshed the cache while we waited
+        meta = _read_meta(directory)
+        cached = {}
+        old_vectors = None
+        if meta:
+            cached_keys, old_vectors = _load_generation(directory, meta)
+            if np.array_equal(cached_keys, keys):
+                return old_vectors
+            cached = {k: i for i, k in enumerate(cached_keys.tolist())}
+
+        missing = {}
+        for i, k in enumerate(keys.tolist()):
+            if k not in cached and k not in missing:
+                missing[k] = i
+        if missing:
+            print(f"Encoding {len(missing)} new NCO titles...")
+            new_vectors = encode(model, [titles[i] for i in missing.values()])
+            dim = new_vectors.shape[1]
+        else:
+            new_vectors = None
+            dim = old_vectors.shape[1]
+
+        vectors = np.empty((len(keys), dim), dtype=np.float32)
+        new_rows = {k: j for j, k in enumerate(missing)}
+        for i, k in enumerate(keys.tolist()):
+            if k in new_rows:
+                vectors[i] = new_vectors[new_rows[k]]
+            else:
+                vectors[i] = old_vectors[cached[k]]
+        del old_vectors
+
+        meta = _publish(directory, model_name, keys, vectors, meta)
+        return _load_generation(directory, meta)[1]
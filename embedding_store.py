@@ -0,0 +1,154 @@
+"""
+Compact copies of the normalised NCO embedding matrix for the semantic scan.
+
+- float32: the matrix itself, scored with one matrix product (the default).
+- float16: half the memory; scores differ from float32 by about 1e-3.
+- int8:    symmetric per-dimension scalar quantisation (code = round(v / scale),
+           scale = max |v| / 127 per dimension), a quarter of the memory.
+
+Compact stores are scanned in blocks of SCAN_BLOCK_ROWS rows that are widened
+to float32 in a reused buffer, so the scan reads 1-2 bytes per value and the
+BLAS product stays in cache. Their scores are approximate; OccupationCatalog
+re-scores the best RERANK_CANDIDATES rows of each query against the float32
+vectors the store was built from.
+
+The memory saving depends on where those vectors live. Loaded from the
+embedding cache (build_catalog with a cache_dir, or the shared store) they
+are memory-mapped, so only the re-ranked rows are paged in. Without the cache
+(cache_dir=None) they are an in-memory array that stays resident next to the
+compact copy, so a compact store then costs more memory than float32 alone.
+benchmarks/bench_quantized.py memory-maps the vectors the way the cache does
+and measures memory, latency and recall against float32.
+
+    store = build_store(vectors, "int8")
+    store.scores(query_matrix) -> (queries, rows) approximate inner products
+    store.save(path) / load_store(path, vectors)
+"""
+import importlib
+import importlib.util
+import json
+import os
+
+import numpy as np
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+EMBEDDING_DTYPE = os.environ.get("SURVEYX_EMBEDDING_DTYPE", "float32")
+# Rows re-scored exactly per query after a compact scan; 0 keeps the approximate scores
+RERANK_CANDIDATES = int(os.environ.get("SURVEYX_RERANK_CANDIDATES", "100"))
+SCAN_BLOCK_ROWS = 16384
+
+
+class EmbeddingStore:
+    def __init__(self, vectors, dtype="float32", codes=None, scale=None):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype: {dtype}")
+        self.vectors = vectors
+        self.dtype = dtype
+        self.codes = vectors if dtype == "float32" else codes
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def quantized(self):
+        return self.dtype != "float32"
+
+    @property
+    def nbytes(self):
+        """Bytes scanned per query (the compact copy, or the float32 matrix)."""
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    @classmethod
+    def build(cls, vectors, dtype="float32"):
+        if dtype == "float32":
+            return cls(vectors)
+        if dtype == "float16":
+            return cls(vectors, dtype, _blocks_to(vectors, np.float16))
+        if dtype == "int8":
+            scale = np.zeros(vectors.shape[1], dtype=np.float32)
+            for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+                np.maximum(scale, np.abs(vectors[start:start + SCAN_BLOCK_ROWS]).max(axis=0), out=scale)
+            scale = np.where(scale > 0, scale / 127, 1).astype(np.float32)
+            codes = np.empty(vectors.shape, dtype=np.int8)
+            for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+                block = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS], dtype=np.float32) / scale
+                codes[start:start + SCAN_BLOCK_ROWS] = np.clip(np.rint(block), -127, 127)
+            return cls(vectors, dtype, codes, scale)
+        raise ValueError(f"Unknown embedding dtype: {dtype}")
+
+    def scores(self, queries):
+        """Inner products of each query row with every stored row, float32."""
+        queries = np.asarray(queries, dtype=np.float32)
+        if not self.quantized:
+            return queries @ self.codes.T
+        if self.scale is not None:
+            # q . (code * scale) == (q * scale) . code
+            queries = queries * self.scale
+        # Rows x queries, so each block's product is written contiguously
+        out = np.empty((len(self.codes), len(queries)), dtype=np.float32)
+        buffer = np.empty((min(SCAN_BLOCK_ROWS, len(self.codes)), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.codes), SCAN_BLOCK_ROWS):
+            block = self.codes[start:start + SCAN_BLOCK_ROWS]
+            widened = buffer[:len(block)]
+            _widen(widened, block)
+            np.matmul(widened, queries.T, out=out[start:start + len(block)])
+        return np.ascontiguousarray(out.T)
+
+    def exact_scores(self, query, rows):
+        """float32 inner products of one query with `rows` of the original vectors."""
+        return np.asarray(self.vectors[rows], dtype=np.float32) @ query
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        if self.quantized:
+            np.save(os.path.join(path, "codes.npy"), self.codes)
+        if self.scale is not None:
+            np.save(os.path.join(path, "scale.npy"), self.scale)
+        with open(os.path.join(path, "store.json"), "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "rows": len(self)}, f)
+
+
+_torch = []
+
+
+def _widen(out, block):
+    """out[...] = block. NumPy converts float16 element by element; torch
+    (installed with the model) does it with SIMD, several times faster."""
+    if block.dtype == np.float16:
+        if not _torch:
+            _torch.append(importlib.import_module("torch") if importlib.util.find_spec("torch") else None)
+        if _torch[0] is not None:
+            _torch[0].from_numpy(out).copy_(_torch[0].from_numpy(np.asarray(block)))
+            return
+    out[...] = block
+
+
+def _blocks_to(vectors, dtype):
+    out = np.empty(vectors.shape, dtype=dtype)
+    for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+        out[start:start + SCAN_BLOCK_ROWS] = vectors[start:start + SCAN_BLOCK_ROWS]
+    return out
+
+
+def build_store(vectors, dtype=EMBEDDING_DTYPE):
+    """Store over `vectors`, which it keeps for re-ranking: pass a memory-mapped
+    matrix (np.load(..., mmap_mode="r")) for a compact store to save memory."""
+    return EmbeddingStore.build(vectors, dtype)
+
+
+def load_store(path, vectors):
+    """Load a store saved with .save(path), memory-mapped; `vectors` is the
+    float32 matrix it was built from."""
+    with open(os.path.join(path, "store.json"), "r", encoding="utf-8") as f:
+        info = json.load(f)
+    dtype = info["dtype"]
+    if dtype == "float32":
+        return EmbeddingStore(vectors)
+    scale_path = os.path.join(path, "scale.npy")
+    return EmbeddingStore(
+        vectors,
+        dtype,
+        np.load(os.path.join(path, "codes.npy"), mmap_mode="r"),
+        np.load(scale_path) if os.path.exists(scale_path) else None,
+    )
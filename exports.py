@@ -0,0 +1,303 @@
+"""
+Streaming exports of survey_data.
+
+Rows are pulled from the cursor in `arraysize` batches and each batch is turned
+into a chunk of output straight away, so memory stays bounded by one batch and
+the first bytes go out as soon as the first batch arrives. The async variants
+hold a db.async_connection() for the length of the stream.
+
+Besides CSV, /export writes NDJSON, an Arrow IPC stream or Parquet. The Arrow
+formats turn each fetched batch of row tuples straight into a RecordBatch
+(one typed array per column) without building per-row dicts or a DataFrame;
+Parquet buffers batches up to PARQUET_ROW_GROUP_ROWS per row group.
+"""
+import csv
+import json
+import zlib
+from contextlib import AsyncExitStack
+from io import StringIO
+
+import pandas as pd
+
+import db
+import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_ARRAYSIZE = 5000
+PARQUET_ROW_GROUP_ROWS = 100_000
+INTEGER_COLUMNS = ("id", "income", "year", "nco_code")
+ARROW_COMPRESSIONS = ("zstd", "lz4", "none")
+
+
+def open_export_cursor(query, params=None, arraysize=EXPORT_ARRAYSIZE):
+    """Acquire a pooled connection and execute the query before streaming starts.
+
+    Doing this eagerly means pool/query errors surface as a normal error
+    response instead of a truncated download.
+    """
+    conn = db.acquire()
+    try:
+        cur = conn.cursor()
+        cur.arraysize = arraysize
+        cur.prefetchrows = arraysize + 1
+        with metrics.timer("query_execute"):
+            cur.execute(query, params or {})
+        return conn, cur
+    except Exception:
+        db.release(conn)
+        raise
+
+
+class TextChunks:
+    """Base for text formats: text, or gzip bytes when compress=True."""
+
+    def __init__(self, compress=False):
+        self.buffer = StringIO()
+        self.gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def _drain(self):
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate(0)
+        if self.gz is None:
+            return text
+        # Sync flush so every batch reaches the client instead of sitting in zlib
+        return self.gz.compress(text.encode("utf-8")) + self.gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.gz.flush() if self.gz is not None else ""
+
+
+class CsvChunks(TextChunks):
+    def __init__(self, compress=False, lower_names=False):
+        super().__init__(compress)
+        self.writer = csv.writer(self.buffer)
+        self.lower_names = lower_names
+
+    def header(self, description):
+        self.writer.writerow([d[0].lower() if self.lower_names else d[0] for d in description])
+        return self._drain()
+
+    def rows(self, rows):
+        with metrics.timer("serialize"):
+            self.writer.writerows(rows)
+            return self._drain()
+
+
+class NdjsonChunks(TextChunks):
+    """One JSON object per line, keyed by lower-case column name."""
+
+    def header(self, description):
+        self.names = [d[0].lower() for d in description]
+        return ""
+
+    def rows(self, rows):
+        names = self.names
+        dumps = json.JSONEncoder(ensure_ascii=False, default=str).encode
+        with metrics.timer("serialize"):
+            self.buffer.write("".join(dumps(dict(zip(names, row))) + "\n" for row in rows))
+            return self._drain()
+
+
+class _Sink:
+    """File-like target for the pyarrow writers; drain() hands over what was written."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def arrow_schema(description):
+    """Lower-case column names; integer survey columns as int64, the rest as strings."""
+    names = [d[0].lower() for d in description]
+    return pa.schema([(n, pa.int64() if n in INTEGER_COLUMNS else pa.string()) for n in names])
+
+
+def _arrow_array(values, type):
+    try:
+        return pa.array(values, type=type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        # Numbers stored as text (or blanks) in the loaded data
+        numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+        return pa.array(numbers, from_pandas=True).cast(type, safe=False)
+
+
+def record_batch(rows, schema):
+    """RecordBatch from a list of row tuples, built column by column."""
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [_arrow_array(list(values), field.type) for values, field in zip(columns, schema)], schema=schema
+    )
+
+
+class ArrowChunks:
+    """Arrow IPC stream (pyarrow.ipc.open_stream reads it), one RecordBatch per fetched batch."""
+
+    def __init__(self, compression="zstd"):
+        self.sink = _Sink()
+        self.compression = None if compression == "none" else compression
+
+    def header(self, description):
+        self.schema = arrow_schema(description)
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        self.writer = pa.ipc.new_stream(self.sink, self.schema, options=options)
+        return self.sink.drain()
+
+    def rows(self, rows):
+        with metrics.timer("serialize"):
+            self.writer.write_batch(record_batch(rows, self.schema))
+            return self.sink.drain()
+
+    def finish(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+class ParquetChunks:
+    """Parquet file streamed row group by row group; the footer comes last."""
+
+    def __init__(self, compression="zstd", row_group_rows=PARQUET_ROW_GROUP_ROWS):
+        self.sink = _Sink()
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        self.pending = []
+        self.pending_rows = 0
+
+    def header(self, description):
+        self.schema = arrow_schema(description)
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression=self.compression)
+        return self.sink.drain()
+
+    def _flush(self):
+        if self.pending:
+            self.writer.write_table(pa.Table.from_batches(self.pending, self.schema),
+                                    row_group_size=self.row_group_rows)
+            self.pending = []
+            self.pending_rows = 0
+
+    def rows(self, rows):
+        with metrics.timer("serialize"):
+            self.pending.append(record_batch(rows, self.schema))
+            self.pending_rows += len(rows)
+            if self.pending_rows >= self.row_group_rows:
+                self._flush()
+            return self.sink.drain()
+
+    def finish(self):
+        with metrics.timer("serialize"):
+            self._flush()
+            self.writer.close()
+            return self.sink.drain()
+
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def export_chunks(format, compression="zstd", gzip=False):
+    """Encoder for one of EXPORT_FORMATS; compression applies to arrow and
+    parquet, gzip to the text formats."""
+    if format in ("arrow", "parquet") and pa is None:
+        raise RuntimeError(f"{format} export requires pyarrow")
+    if format == "arrow":
+        return ArrowChunks(compression)
+    if format == "parquet":
+        return ParquetChunks(compression)
+    if format == "ndjson":
+        return NdjsonChunks(gzip)
+    return CsvChunks(gzip, lower_names=True)
+
+
+def iter_csv(conn, cur, compress=False):
+    """Yield CSV chunks (str, or gzip bytes when compress=True) one batch at a time.
+
+    Owns the connection: it is released when the generator finishes or is closed.
+    """
+    chunks = CsvChunks(compress)
+    try:
+        yield chunks.header(cur.description)
+        while True:
+            with metrics.timer("row_fetch"):
+                rows = cur.fetchmany()
+            if not rows:
+                break
+            chunk = chunks.rows(rows)
+            if chunk:
+                yield chunk
+        tail = chunks.finish()
+        if tail:
+            yield tail
+    finally:
+        cur.close()
+        db.release(conn)
+
+
+async def open_export_cursor_async(query, params=None, arraysize=EXPORT_ARRAYSIZE):
+    """open_export_cursor for async endpoints: returns (resources, cursor);
+    `resources` (an AsyncExitStack) releases the connection when closed."""
+    resources = AsyncExitStack()
+    try:
+        conn = await resources.enter_async_context(db.async_connection())
+        cur = conn.cursor()
+        resources.callback(cur.close)
+        cur.arraysize = arraysize
+        cur.prefetchrows = arraysize + 1
+        with metrics.timer("query_execute"):
+            await cur.execute(query, params or {})
+        return resources, cur
+    except BaseException:
+        await resources.aclose()
+        raise
+
+
+async def iter_export_async(resources, cur, chunks):
+    """Encoded chunks of an asyncio cursor's rows (`chunks` is one of the
+    *Chunks encoders); closes `resources` when done or closed."""
+    try:
+        head = chunks.header(cur.description)
+        if head:
+            yield head
+        while True:
+            with metrics.timer("row_fetch"):
+                rows = await cur.fetchmany()
+            if not rows:
+                break
+            chunk = chunks.rows(rows)
+            if chunk:
+                yield chunk
+        tail = chunks.finish()
+        if tail:
+            yield tail
+    finally:
+        await resources.aclose()
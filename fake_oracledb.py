@@ -0,0 +1,548 @@
+"""
+SQLite-backed stand-in for the parts of python-oracledb that SurveyX uses.
+
+Select it with SURVEYX_DB_DRIVER=fake; SURVEYX_DB_DSN is then the path of the
+SQLite file. Seed it from a CSV with:
+
+    python fake_oracledb.py data/MOCK_DATA_with_NCO.csv
+
+The asyncio API (create_pool_async, connect_async) is mirrored as well: SQLite
+calls run in worker threads. SURVEYX_FAKE_LATENCY_MS adds a simulated network
+round trip to every execute and fetch (time.sleep in the sync API,
+asyncio.sleep in the async one) so concurrency effects can be measured locally.
+"""
+import asyncio
+import csv
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+POOL_GETMODE_WAIT = 0
+POOL_GETMODE_NOWAIT = 1
+POOL_GETMODE_FORCEGET = 2
+POOL_GETMODE_TIMEDWAIT = 3
+
+DEFAULT_DSN = "data/survey_fake.db"
+FAKE_LATENCY_MS = float(os.environ.get("SURVEYX_FAKE_LATENCY_MS", "0"))
+
+SURVEY_DDL = """
+CREATE TABLE IF NOT EXISTS survey_data (
+    id INTEGER,
+    occupation TEXT,
+    state TEXT,
+    district TEXT,
+    gender TEXT,
+    income INTEGER,
+    year INTEGER,
+    nco_code INTEGER
+)
+"""
+SURVEY_INDEX_DDL = "CREATE INDEX IF NOT EXISTS survey_data_id_idx ON survey_data (id)"
+
+
+# ----------------------------
+# Errors (same shape as oracledb: e.args[0].full_code)
+# ----------------------------
+class _ErrorInfo:
+    def __init__(self, full_code, message):
+        self.full_code = full_code
+        self.message = f"{full_code}: {message}"
+
+    def __str__(self):
+        return self.message
+
+
+class Error(Exception):
+    pass
+
+
+class DatabaseError(Error):
+    def __init__(self, full_code, message):
+        super().__init__(_ErrorInfo(full_code, message))
+
+
+class InterfaceError(Error):
+    pass
+
+
+class _BatchError:
+    """Row-level error reported by Cursor.getbatcherrors()."""
+
+    def __init__(self, offset, full_code, message):
+        self.offset = offset
+        self.full_code = full_code
+        self.message = f"{full_code}: {message}"
+
+    def __str__(self):
+        return self.message
+
+
+def init_oracle_client(lib_dir=None, **kwargs):
+    """Thick mode does not exist here; accepted so callers need no special case."""
+
+
+# ----------------------------
+# SQL translation
+# ----------------------------
+_ROWNUM_RE = re.compile(r"(\bAND\s+)?\bROWNUM\s*(<=|=)\s*(:\w+|\d+)", re.IGNORECASE)
+_NUMERIC_BIND_RE = re.compile(r":(\d+)\b")
+_TRUNCATE_RE = re.compile(r"^\s*TRUNCATE\s+TABLE\b", re.IGNORECASE)
+
+
+def _translate(sql):
+    """Rewrite the Oracle-only bits of a statement into SQLite."""
+    limit = None
+
+    def _rownum(match):
+        nonlocal limit
+        limit = match.group(3)
+        return "" if match.group(1) else "1=1"
+
+    sql = _TRUNCATE_RE.sub("DELETE FROM", sql)
+    sql = _ROWNUM_RE.sub(_rownum, sql)
+    sql = _NUMERIC_BIND_RE.sub(r"?\1", sql)
+    if limit is not None:
+        sql = f"{sql.rstrip()} LIMIT {limit}"
+    return sql
+
+
+def _wrap_errors(fn, *args):
+    try:
+        return fn(*args)
+    except sqlite3.Error as e:
+        raise DatabaseError("ORA-00900", str(e)) from e
+
+
+# ----------------------------
+# Connection / cursor
+# ----------------------------
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self._cur = connection._conn.cursor()
+        self._batch_errors = []
+        self._latency = connection.latency
+
+    def _round_trip(self):
+        if self._latency:
+            time.sleep(self._latency)
+
+    @property
+    def description(self):
+        if self._cur.description is None:
+            return None
+        return [(d[0].upper(), None, None, None, None, None, True) for d in self._cur.description]
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    def execute(self, statement, parameters=None, **kwargs):
+        params = parameters if parameters is not None else kwargs
+        self._round_trip()
+        _wrap_errors(self._cur.execute, _translate(statement), params)
+        return self if self._cur.description is not None else None
+
+    def executemany(self, statement, parameters, batcherrors=False, **kwargs):
+        self._batch_errors = []
+        self._round_trip()
+        sql = _translate(statement)
+        if not batcherrors:
+            _wrap_errors(self._cur.executemany, sql, parameters)
+            return
+        # Like Oracle's batch errors: good rows are applied, bad rows are reported.
+        # Try the whole batch first; replay it row by row only if something fails.
+        parameters = list(parameters)
+        if not self.connection._conn.in_transaction:
+            self._cur.execute("BEGIN")
+        self._cur.execute("SAVEPOINT batch")
+        try:
+            self._cur.executemany(sql, parameters)
+            self._cur.execute("RELEASE SAVEPOINT batch")
+            return
+        except sqlite3.Error:
+            self._cur.execute("ROLLBACK TO SAVEPOINT batch")
+            self._cur.execute("RELEASE SAVEPOINT batch")
+        for offset, row in enumerate(parameters):
+            try:
+                self._cur.execute(sql, row)
+            except sqlite3.Error as e:
+                self._batch_errors.append(_BatchError(offset, "ORA-00900", str(e)))
+
+    def getbatcherrors(self):
+        return list(self._batch_errors)
+
+    def fetchone(self):
+        self._round_trip()
+        return self._cur.fetchone()
+
+    def fetchmany(self, size=None):
+        self._round_trip()
+        return self._cur.fetchmany(size or self.arraysize)
+
+    def fetchall(self):
+        self._round_trip()
+        return self._cur.fetchall()
+
+    def close(self):
+        self._cur.close()
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany()
+            if not rows:
+                return
+            yield from rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Connection:
+    def __init__(self, dsn=None, stmtcachesize=20, latency_ms=None):
+        self.dsn = dsn or DEFAULT_DSN
+        self.stmtcachesize = stmtcachesize
+        self.latency = (FAKE_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+        self._conn = sqlite3.connect(
+            self.dsn, check_same_thread=False, cached_statements=stmtcachesize
+        )
+        self._conn.execute(SURVEY_DDL)
+        self._conn.execute(SURVEY_INDEX_DDL)
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self):
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect(user=None, password=None, dsn=None, stmtcachesize=20, **kwargs):
+    return Connection(dsn, stmtcachesize)
+
+
+# ----------------------------
+# Pool
+# ----------------------------
+class ConnectionPool:
+    def __init__(self, dsn=None, min=1, max=2, increment=1, getmode=POOL_GETMODE_WAIT,
+                 wait_timeout=0, stmtcachesize=20):
+        self.dsn = dsn
+        self.min = min
+        self.max = max
+        self.increment = increment
+        self.getmode = getmode
+        self.wait_timeout = wait_timeout
+        self.stmtcachesize = stmtcachesize
+        self._idle = []
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        for _ in range(min):
+            self._idle.append(Connection(dsn, stmtcachesize))
+
+    @property
+    def opened(self):
+        with self._cond:
+            return len(self._idle) + len(self._busy)
+
+    @property
+    def busy(self):
+        with self._cond:
+            return len(self._busy)
+
+    def _grow(self):
+        room = self.max - len(self._idle) - len(self._busy)
+        for _ in range(min(self.increment, room)):
+            self._idle.append(Connection(self.dsn, self.stmtcachesize))
+
+    def acquire(self):
+        deadline = None
+        if self.getmode == POOL_GETMODE_TIMEDWAIT:
+            deadline = time.monotonic() + self.wait_timeout / 1000
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise InterfaceError("DPY-1002: connection pool is not open")
+                if not self._idle:
+                    self._grow()
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._busy.add(conn)
+                    return conn
+                if self.getmode == POOL_GETMODE_NOWAIT:
+                    raise DatabaseError("DPY-4005", "no connections available in the pool")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise DatabaseError(
+                        "DPY-4005",
+                        "timed out waiting for the connection pool to return a connection",
+                    )
+                self._cond.wait(remaining)
+
+    def release(self, connection):
+        with self._cond:
+            self._busy.discard(connection)
+            if self._closed:
+                connection.close()
+            else:
+                connection.rollback()
+                self._idle.append(connection)
+            self._cond.notify()
+
+    def close(self, force=False):
+        with self._cond:
+            if self._busy and not force:
+                raise DatabaseError("DPY-1005", "connection pool has busy connections")
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+def create_pool(user=None, password=None, dsn=None, min=1, max=2, increment=1,
+                getmode=POOL_GETMODE_WAIT, wait_timeout=0, stmtcachesize=20, **kwargs):
+    return ConnectionPool(dsn, min, max, increment, getmode, wait_timeout, stmtcachesize)
+
+
+# ----------------------------
+# asyncio API
+# ----------------------------
+class AsyncCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = Cursor(connection._sync)
+
+    @property
+    def arraysize(self):
+        return self._cursor.arraysize
+
+    @arraysize.setter
+    def arraysize(self, value):
+        self._cursor.arraysize = value
+
+    @property
+    def prefetchrows(self):
+        return self._cursor.prefetchrows
+
+    @prefetchrows.setter
+    def prefetchrows(self, value):
+        self._cursor.prefetchrows = value
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    async def _call(self, fn, *args, **kwargs):
+        if self.connection.latency:
+            await asyncio.sleep(self.connection.latency)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def execute(self, statement, parameters=None, **kwargs):
+        await self._call(self._cursor.execute, statement, parameters, **kwargs)
+
+    async def executemany(self, statement, parameters, batcherrors=False, **kwargs):
+        await self._call(self._cursor.executemany, statement, parameters, batcherrors, **kwargs)
+
+    def getbatcherrors(self):
+        return self._cursor.getbatcherrors()
+
+    async def fetchone(self):
+        return await self._call(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        return await self._call(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await self._call(self._cursor.fetchall)
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncConnection:
+    def __init__(self, dsn=None, stmtcachesize=20, latency_ms=None):
+        # The simulated round trip is awaited here, not slept in a worker thread
+        self._sync = Connection(dsn, stmtcachesize, latency_ms=0)
+        self.latency = (FAKE_LATENCY_MS if latency_ms is None else latency_ms) / 1000
+
+    def cursor(self):
+        return AsyncCursor(self)
+
+    async def commit(self):
+        await asyncio.to_thread(self._sync.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self._sync.rollback)
+
+    async def ping(self):
+        await asyncio.to_thread(self._sync.ping)
+
+    async def close(self):
+        self._sync.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def connect_async(user=None, password=None, dsn=None, stmtcachesize=20, **kwargs):
+    return AsyncConnection(dsn, stmtcachesize)
+
+
+class AsyncConnectionPool:
+    """ConnectionPool for coroutines: waiting for a connection suspends the
+    caller instead of blocking a thread."""
+
+    def __init__(self, dsn=None, min=1, max=2, increment=1, getmode=POOL_GETMODE_WAIT,
+                 wait_timeout=0, stmtcachesize=20):
+        self.dsn = dsn
+        self.min = min
+        self.max = max
+        self.increment = increment
+        self.getmode = getmode
+        self.wait_timeout = wait_timeout
+        self.stmtcachesize = stmtcachesize
+        self._idle = [AsyncConnection(dsn, stmtcachesize) for _ in range(min)]
+        self._busy = set()
+        self._cond = None  # asyncio.Condition, created in the event loop
+        self._closed = False
+
+    @property
+    def opened(self):
+        return len(self._idle) + len(self._busy)
+
+    @property
+    def busy(self):
+        return len(self._busy)
+
+    def _grow(self):
+        room = self.max - len(self._idle) - len(self._busy)
+        for _ in range(min(self.increment, room)):
+            self._idle.append(AsyncConnection(self.dsn, self.stmtcachesize))
+
+    def acquire(self):
+        return self._acquire()
+
+    async def _acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+        deadline = None
+        if self.getmode == POOL_GETMODE_TIMEDWAIT:
+            deadline = loop.time() + self.wait_timeout / 1000
+        async with self._cond:
+            while True:
+                if self._closed:
+                    raise InterfaceError("DPY-1002: connection pool is not open")
+                if not self._idle:
+                    self._grow()
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._busy.add(conn)
+                    return conn
+                if self.getmode == POOL_GETMODE_NOWAIT:
+                    raise DatabaseError("DPY-4005", "no connections available in the pool")
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise DatabaseError(
+                        "DPY-4005",
+                        "timed out waiting for the connection pool to return a connection",
+                    )
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, connection):
+        self._busy.discard(connection)
+        if self._closed:
+            await connection.close()
+        else:
+            await connection.rollback()
+            self._idle.append(connection)
+        if self._cond is not None:
+            async with self._cond:
+                self._cond.notify()
+
+    async def close(self, force=False):
+        if self._busy and not force:
+            raise DatabaseError("DPY-1005", "connection pool has busy connections")
+        self._closed = True
+        for conn in self._idle:
+            await conn.close()
+        self._idle.clear()
+        if self._cond is not None:
+            async with self._cond:
+                self._cond.notify_all()
+
+
+def create_pool_async(user=None, password=None, dsn=None, min=1, max=2, increment=1,
+                      getmode=POOL_GETMODE_WAIT, wait_timeout=0, stmtcachesize=20, **kwargs):
+    return AsyncConnectionPool(dsn, min, max, increment, getmode, wait_timeout, stmtcachesize)
+
+
+# ----------------------------
+# Seeding
+# ----------------------------
+def seed_from_csv(csv_path, dsn=None, delimiter=","):
+    """Load a MOCK_DATA-style CSV (occupation_title header) into survey_data."""
+    conn = connect(dsn=dsn)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        rows = [
+            (r["id"], r.get("occupation_title") or r.get("occupation"), r["state"], r["district"],
+             r["gender"], r["income"], r["year"], r.get("nco_code"))
+            for r in reader
+        ]
+    cur = conn.cursor()
+    cur.execute("DELETE FROM survey_data")
+    cur.executemany(
+        "INSERT INTO survey_data (id, occupation, state, district, gender, income, year, nco_code) "
+        "VALUES (:1, :2, :3, :4, :5, :6, :7, :8)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/MOCK_DATA_with_NCO.csv"
+    target = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DSN
+    print(f"Seeded {seed_from_csv(source, target)} rows into {target}")
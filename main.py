@@ -1,18 +1,167 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List
 from fastapi import FastAPI, Query, Security, HTTPException, status
 from fastapi.security.api_key import APIKeyHeader
-from fastapi.responses import StreamingResponse
-import oracledb
-import csv
-from io import StringIO
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
-app = FastAPI()
+import batch_predict
+import db
+import exports
+import metrics
+import nco_search
+import profiler
+import shared_store
+import stats_cube
+import survey_queries
+from batching import MicroBatcher
+from cache import TTLCache
 
-# Oracle Client init
-oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_11_2")
+CLASSIFY_MAX_TITLES = int(os.environ.get("SURVEYX_CLASSIFY_MAX_TITLES", "10000"))
+CLASSIFY_MAX_BATCH = int(os.environ.get("SURVEYX_CLASSIFY_MAX_BATCH", "64"))
+CLASSIFY_MAX_WAIT_MS = int(os.environ.get("SURVEYX_CLASSIFY_MAX_WAIT_MS", "10"))
 
-DB_USER = "penta_survey"
-DB_PASS = "555"
-DB_DSN  = "//localhost:1522/orcl"
+# survey_data is considered changed when its row count or max id moves
+SURVEY_VERSION_INTERVAL = float(os.environ.get("SURVEYX_SURVEY_VERSION_INTERVAL", "5"))
+
+catalog_source = None
+classify_batcher = None
+search_cache = TTLCache("survey_search")
+income_cube = stats_cube.StatsCube()
+prediction_job = batch_predict.BatchJob()
+_survey_version = {"value": None, "checked": float("-inf")}
+# Held only while recording a version, never across a query, so the event loop
+# can take it; sync callers serialise their re-reads on the refresh lock instead
+_survey_version_lock = threading.Lock()
+_survey_version_refresh_lock = threading.Lock()
+_survey_version_async_lock = asyncio.Lock()
+
+
+def classify_batch(items):
+    """Micro-batch worker: items are (title, top_k); one rank call for all of them."""
+    top_k = max(k for _, k in items)
+    results = catalog_source.get().classify([title for title, _ in items], top_k)
+    return [matches[:k] for (_, k), matches in zip(items, results)]
+
+
+def error_response(e):
+    """Errors are still answered with {"status": "error"}, but counted in /metrics."""
+    metrics.record_error(e)
+    return {"status": "error", "message": str(e)}
+
+
+def service_unavailable(e):
+    """503 for a saturated or unreachable database; clients should retry shortly."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+VERSION_SQL = "SELECT COUNT(*), MAX(id) FROM survey_data"
+
+
+def _survey_version_fresh():
+    return time.monotonic() - _survey_version["checked"] < SURVEY_VERSION_INTERVAL
+
+
+def _record_survey_version(version):
+    """Store a freshly read version; call with _survey_version_lock held."""
+    if version != _survey_version["value"]:
+        search_cache.clear()
+    _survey_version["value"] = version
+    _survey_version["checked"] = time.monotonic()
+
+
+def survey_data_version():
+    """(row count, max id) of survey_data, re-read at most every
+    SURVEY_VERSION_INTERVAL seconds; a change empties the search cache."""
+    with _survey_version_refresh_lock:
+        if _survey_version_fresh():
+            return _survey_version["value"]
+        with db.get_connection() as conn:
+            cur = conn.cursor()
+            with metrics.timer("query_execute"):
+                cur.execute(VERSION_SQL)
+                version = tuple(cur.fetchone())
+            cur.close()
+        with _survey_version_lock:
+            _record_survey_version(version)
+        return version
+
+
+async def survey_data_version_async():
+    """survey_data_version for async endpoints; one re-read at a time per process."""
+    if _survey_version_fresh():
+        return _survey_version["value"]
+    async with _survey_version_async_lock:
+        if _survey_version_fresh():
+            return _survey_version["value"]
+        async with db.async_connection() as conn:
+            cur = conn.cursor()
+            try:
+                with metrics.timer("query_execute"):
+                    await cur.execute(VERSION_SQL)
+                    version = tuple(await cur.fetchone())
+            finally:
+                cur.close()
+        with _survey_version_lock:
+            _record_survey_version(version)
+        return version
+
+
+# Connection pool, NCO catalog and classification batcher live for the whole application
+@asynccontextmanager
+async def lifespan(app):
+    global catalog_source, classify_batcher
+    db.init_pool()
+    await db.init_async_pool()
+    if shared_store.STORE_DIR:
+        # Model, embeddings and catalog are memory-mapped from the shared store
+        catalog_source = shared_store.SharedCatalogSource()
+    else:
+        catalog_source = nco_search.CatalogSource(nco_search.load_model())
+    classify_batcher = MicroBatcher(classify_batch, CLASSIFY_MAX_BATCH, CLASSIFY_MAX_WAIT_MS)
+    classify_batcher.start()
+    profiler.install_signal_toggle()
+    yield
+    prediction_job.cancel()
+    await classify_batcher.stop()
+    await db.close_async_pool()
+    db.close_pool()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _pool_gauges():
+    stats = db.pool_stats()
+    if not stats["initialised"]:
+        return []
+    return [(("opened",), stats["opened"]), (("busy",), stats["busy"]), (("max",), stats["max"])]
+
+
+def _cache_counts(field):
+    def collect():
+        caches = {"survey_search": search_cache}
+        if catalog_source is not None:
+            catalog = catalog_source.get()
+            caches.update(query_embeddings=catalog.query_cache, occupation_results=catalog.result_cache)
+        return [((name,), cache.stats()[field]) for name, cache in caches.items()]
+    return collect
+
+
+metrics.Collected("surveyx_pool_connections", "Database pool connections.", ("state",), _pool_gauges)
+metrics.Collected("surveyx_db_requests", "Async requests using or queued for the database.", ("state",),
+                  lambda: [((k,), v) for k, v in (db.async_stats() or {}).items() if k in ("in_flight", "waiting")])
+metrics.Collected("surveyx_db_rejected_total", "Async requests refused with 503 (backpressure).", (),
+                  lambda: [((), db.async_stats()["rejected"])] if db.async_stats() else [], "counter")
+metrics.Collected("surveyx_cache_entries", "Entries held by each result cache.", ("cache",), _cache_counts("entries"))
+metrics.Collected("surveyx_cache_hits_total", "Result cache hits.", ("cache",), _cache_counts("hits"), "counter")
+metrics.Collected("surveyx_cache_misses_total", "Result cache misses.", ("cache",), _cache_counts("misses"), "counter")
+metrics.Collected("surveyx_classify_batches_total", "Micro-batches run for GET /classify.", (),
+                  lambda: [((), classify_batcher.batches)] if classify_batcher else [], "counter")
 
 # API Key settings
 API_KEY = "mysecret123"
@@ -29,127 +178,345 @@ def get_api_key(api_key_header: str = Security(api_key_header), api_key: str = N
         detail="Invalid or missing API Key",
     )
 
-# Root endpoint - Row count
+# Root endpoint - Row count (shared with the cache version check)
 @app.get("/")
-def read_root(api_key: str = Security(get_api_key)):
+async def read_root(api_key: str = Security(get_api_key)):
     try:
-        conn = oracledb.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM survey_data")
-        count = cur.fetchone()[0]
-        cur.close()
-        conn.close()
+        count, _ = await survey_data_version_async()
         return {"status": "success", "row_count": count}
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return error_response(e)
+
+# Connection pool statistics
+@app.get("/pool")
+def get_pool_stats(api_key: str = Security(get_api_key)):
+    return {"status": "success", "pool": db.pool_stats()}
 
-# Fetch limited data
+# Fetch data page by page (keyset pagination; pass next_cursor back as cursor)
 @app.get("/data")
-def get_data(limit: int = Query(5, ge=1, le=100), api_key: str = None, api_key_header: str = Security(api_key_header)):
+async def get_data(
+    limit: int = Query(5, ge=1, le=survey_queries.MAX_PAGE_SIZE),
+    cursor: str = None,
+    columns: str = None,
+    api_key: str = None,
+    api_key_header: str = Security(api_key_header),
+):
     key = api_key_header or api_key
     if key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API Key")
     try:
-        conn = oracledb.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM survey_data WHERE ROWNUM <= {limit}")
-        cols = [d[0] for d in cur.description]
-        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-        cur.close()
-        conn.close()
-        return {"status": "success", "data": rows}
+        cols = survey_queries.parse_columns(columns)
+        async with db.async_connection() as conn:
+            page = await survey_queries.fetch_page_async(conn, columns=cols, cursor=cursor, limit=limit)
+        return {"status": "success", **page}
+    except survey_queries.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return error_response(e)
 
-# Download all data as CSV
+# Download all data as CSV (streamed in batches, optionally gzip-compressed)
 @app.get("/download")
-def download_csv(api_key: str = None, api_key_header: str = Security(api_key_header)):
+async def download_csv(
+    gzip: bool = False,
+    arraysize: int = Query(exports.EXPORT_ARRAYSIZE, ge=100, le=100000),
+    api_key: str = None,
+    api_key_header: str = Security(api_key_header),
+):
     key = api_key_header or api_key
     if key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API Key")
     try:
-        conn = oracledb.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM survey_data")
-        cols = [d[0] for d in cur.description]
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(cols)
-        writer.writerows(rows)
-        output.seek(0)
+        resources, cur = await exports.open_export_cursor_async("SELECT * FROM survey_data", arraysize=arraysize)
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        return error_response(e)
 
+    if gzip:
         return StreamingResponse(
-            output,
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=survey_data.csv"}
+            exports.iter_export_async(resources, cur, exports.CsvChunks(compress=True)),
+            media_type="application/gzip",
+            headers={"Content-Disposition": "attachment; filename=survey_data.csv.gz"}
         )
+    return StreamingResponse(
+        exports.iter_export_async(resources, cur, exports.CsvChunks()),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=survey_data.csv"}
+    )
+
+# Export selected columns of the rows matching the filters as Parquet, an Arrow
+# IPC stream, NDJSON or CSV. Columns and filters are part of the SQL, so only
+# the requested data is read and sent.
+@app.get("/export")
+async def export_data(
+    format: str = Query("parquet", pattern="^(parquet|arrow|ndjson|csv)$"),
+    columns: str = None,
+    state: List[str] = Query(None),
+    district: List[str] = Query(None),
+    gender: List[str] = Query(None),
+    year_from: int = None,
+    year_to: int = None,
+    income_from: int = None,
+    income_to: int = None,
+    compression: str = Query("zstd", pattern="^(zstd|lz4|none)$"),
+    gzip: bool = False,
+    arraysize: int = Query(exports.EXPORT_ARRAYSIZE, ge=100, le=100000),
+    api_key: str = Security(get_api_key),
+):
+    try:
+        cols = survey_queries.parse_columns(columns)
+        filters = {
+            "state": survey_queries.split_values(state),
+            "district": survey_queries.split_values(district),
+            "gender": survey_queries.split_values(gender),
+        }
+        ranges = {"year": (year_from, year_to), "income": (income_from, income_to)}
+        chunks = exports.export_chunks(format, compression, gzip)
+        sql, params = survey_queries.export_query(cols, filters, ranges)
+        resources, cur = await exports.open_export_cursor_async(sql, params, arraysize=arraysize)
+    except survey_queries.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return error_response(e)
+
+    media_type, extension = exports.EXPORT_FORMATS[format]
+    filename = f"survey_data.{extension}"
+    if gzip and format in ("ndjson", "csv"):
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    return StreamingResponse(
+        exports.iter_export_async(resources, cur, chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+async def query_survey(filters, columns=None, cursor=None, limit=100):
+    partitions = survey_queries.partitions(filters)
+    if len(partitions) == 1:
+        async with db.async_connection() as conn:
+            return await survey_queries.fetch_page_async(conn, partitions[0], columns, cursor, limit)
+    return await survey_queries.fetch_page_fanout(db.async_connection, partitions, columns, cursor, limit)
 
-# Search data by state and/or gender
+# Search data by state and/or gender, page by page (cached until survey_data changes).
+# Several values (?state=Kerala,Goa or repeated ?state=) are queried concurrently and merged.
 @app.get("/search")
-def search_data(state: str = None, gender: str = None, api_key: str = None, api_key_header: str = Security(api_key_header)):
+async def search_data(
+    state: List[str] = Query(None),
+    gender: List[str] = Query(None),
+    limit: int = Query(100, ge=1, le=survey_queries.MAX_PAGE_SIZE),
+    cursor: str = None,
+    columns: str = None,
+    api_key: str = None,
+    api_key_header: str = Security(api_key_header),
+):
     key = api_key_header or api_key
     if key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API Key")
     try:
-        conn = oracledb.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
-        cur = conn.cursor()
-        query = "SELECT * FROM survey_data WHERE 1=1"
-        params = {}
-        if state:
-            query += " AND state = :state"
-            params["state"] = state
-        if gender:
-            query += " AND gender = :gender"
-            params["gender"] = gender
-
-        cur.execute(query, params)
-        cols = [d[0] for d in cur.description]
-        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-        cur.close()
-        conn.close()
-        return {"status": "success", "data": rows}
+        filters = {
+            "state": survey_queries.split_values(state),
+            "gender": survey_queries.split_values(gender),
+        }
+        survey_queries.partitions(filters)  # reject too many combinations before any query
+        cols = survey_queries.parse_columns(columns)
+        if cursor:
+            survey_queries.decode_cursor(cursor)
+        cache_key = (await survey_data_version_async(), tuple(filters["state"]), tuple(filters["gender"]),
+                     tuple(cols or ()), cursor, limit)
+        page = await search_cache.get_or_compute_async(
+            cache_key, lambda: query_survey(filters, cols, cursor, limit)
+        )
+        return {"status": "success", **page}
+    except survey_queries.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        return error_response(e)
+
+def parse_quantiles(quantiles):
+    if not quantiles:
+        return stats_cube.DEFAULT_QUANTILES
+    try:
+        values = [float(q) for q in quantiles.split(",") if q.strip()]
+    except ValueError:
+        raise survey_queries.InvalidQuery("Quantiles must be numbers between 0 and 1")
+    if not all(0 <= q <= 1 for q in values):
+        raise survey_queries.InvalidQuery("Quantiles must be numbers between 0 and 1")
+    return values
+
+# Income statistics grouped by any of state, district, gender, year, served from
+# the pre-aggregated cube (refreshed from newly inserted ids when survey_data changes)
+@app.get("/stats")
+def income_stats(
+    by: str = None,
+    state: str = None,
+    district: str = None,
+    gender: str = None,
+    year_from: int = None,
+    year_to: int = None,
+    quantiles: str = None,
+    api_key: str = Security(get_api_key),
+):
+    try:
+        dims = list(dict.fromkeys(d.strip().lower() for d in by.split(",") if d.strip())) if by else []
+        unknown = [d for d in dims if d not in stats_cube.DIMENSIONS]
+        if unknown:
+            raise survey_queries.InvalidQuery(f"Unknown dimension(s): {', '.join(unknown)}")
+        qs = parse_quantiles(quantiles)
+        version = survey_data_version()
+        if version != income_cube.version:
+            with db.get_connection() as conn:
+                income_cube.refresh(conn, version)
+        filters = {
+            "state": state.strip() if state else None,
+            "district": district.strip() if district else None,
+            "gender": gender.strip() if gender else None,
+            "year_from": year_from,
+            "year_to": year_to,
+        }
+        groups = income_cube.summarize(dims, qs, filters)
+        return {"status": "success", "by": dims, "groups": stats_cube.records(groups),
+                "cube": income_cube.stats()}
+    except survey_queries.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        return error_response(e)
+
+# Cache statistics
+@app.get("/cache")
+def cache_stats(api_key: str = Security(get_api_key)):
+    return {
+        "status": "success",
+        "survey_search": search_cache.stats(),
+        **catalog_source.get().cache_stats(),
+    }
+
+# ---------------- Occupation classification ----------------
+class ClassifyRequest(BaseModel):
+    titles: List[str] = Field(..., min_length=1, max_length=CLASSIFY_MAX_TITLES)
+    top_k: int = Field(3, ge=1, le=50)
+
+# Bulk: map many free-text job titles to NCO codes in one call
+@app.post("/classify")
+def classify_titles(request: ClassifyRequest, api_key: str = Security(get_api_key)):
+    try:
+        catalog = catalog_source.get()
+        results = catalog.classify(request.titles, request.top_k)
+        return {
+            "status": "success",
+            "semantic": catalog.semantic_ready,
+            "results": [{"title": t, "matches": m} for t, m in zip(request.titles, results)],
+        }
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return error_response(e)
+
+# Single title; concurrent calls are coalesced into one model batch
+@app.get("/classify")
+async def classify_title(title: str = Query(..., min_length=1), top_k: int = Query(3, ge=1, le=50),
+                         api_key: str = Security(get_api_key)):
+    try:
+        matches = await classify_batcher.submit((title, top_k))
+        return {"status": "success", "title": title, "matches": matches}
+    except Exception as e:
+        return error_response(e)
+
+@app.get("/classify/stats")
+def classify_stats(api_key: str = Security(get_api_key)):
+    catalog = catalog_source.get()
+    return {"status": "success", "catalog_size": len(catalog), "semantic": catalog.semantic_ready,
+            "batcher": classify_batcher.stats()}
+
+# ---------------- Monitoring ----------------
+# Prometheus scrape target (per worker process); scrapers can pass ?api_key=
+@app.get("/metrics")
+def get_metrics(api_key: str = Security(get_api_key)):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Sampling profiler of this worker: start, stop, then read the hottest stacks
+@app.post("/profiler/start")
+def start_profiler(interval_ms: float = Query(profiler.PROFILE_INTERVAL_MS, gt=0, le=1000),
+                   duration: float = Query(None, gt=0, le=3600), include_idle: bool = False,
+                   api_key: str = Security(get_api_key)):
+    started = profiler.profiler.start(interval_ms, duration, include_idle)
+    return {"status": "success" if started else "already_running", "profiler": profiler.profiler.status()}
+
+@app.post("/profiler/stop")
+def stop_profiler(api_key: str = Security(get_api_key)):
+    return {"status": "success", "profiler": profiler.profiler.stop()}
+
+@app.get("/profiler")
+def get_profile(format: str = Query("json", pattern="^(json|collapsed)$"), limit: int = Query(20, ge=1, le=1000),
+                api_key: str = Security(get_api_key)):
+    if format == "collapsed":
+        return PlainTextResponse(profiler.profiler.collapsed())
+    return {"status": "success", "profiler": profiler.profiler.status(), "stacks": profiler.profiler.top(limit)}
 
 # ---------------- Prediction logic ----------------
-def make_prediction(input_data):
-    """
-    Replace this function with real ML model prediction logic.
-    For now, it just returns a dummy string based on input.
-    """
-    # Example: pretend we predict a category based on first column
-    return f"Predicted value based on input: {input_data}"
+def served_catalog():
+    return catalog_source.get()
 
 @app.get("/predict")
-def predict(api_key: str = None, api_key_header: str = Security(api_key_header)):
-    key = api_key_header or api_key
-    if key != API_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API Key")
+def predict(limit: int = Query(1, ge=1, le=survey_queries.MAX_PAGE_SIZE), api_key: str = Security(get_api_key)):
+    """NCO codes predicted from the occupation of the first `limit` rows, without writing them back."""
     try:
-        # Fetch input data from DB (example: first row)
-        conn = oracledb.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM survey_data WHERE ROWNUM = 1")
-        data = cur.fetchone()
-        cur.close()
-        conn.close()
-
-        if not data:
+        with db.get_connection() as conn:
+            rows = batch_predict.read_chunk(conn, limit=limit)
+        if not rows:
             return {"status": "error", "message": "No data found for prediction"}
+        titles = list(dict.fromkeys(row[2] for row in rows if row[2] is not None))
+        predicted = dict(zip(titles, batch_predict.predict_titles(served_catalog(), titles)))
+        predictions = [
+            {"id": row_id, "occupation": occupation, "nco_code": current,
+             "predicted_nco_code": predicted.get(occupation, (None, None))[0],
+             "score": predicted.get(occupation, (None, None))[1]}
+            for row_id, _rid, occupation, current in rows
+        ]
+        return {"status": "success", "predictions": predictions}
+    except batch_predict.ModelUnavailable as e:
+        raise service_unavailable(e)
+    except db.PoolUnavailable as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        return error_response(e)
 
-        # Prepare input (adjust according to your table structure)
-        input_data = [data[1], data[2]]  # Example: using 2 columns
-
-        # Call the prediction function
-        prediction = make_prediction(input_data)
+@app.post("/predict/batch")
+def start_batch_prediction(
+    state: List[str] = Query(None),
+    district: List[str] = Query(None),
+    gender: List[str] = Query(None),
+    only_missing: bool = True,
+    min_score: float = Query(batch_predict.PREDICT_MIN_SCORE, ge=0, le=1),
+    chunk_size: int = Query(batch_predict.PREDICT_CHUNK_SIZE, ge=100, le=1_000_000),
+    workers: int = Query(0, ge=0, le=32),
+    api_key: str = Security(get_api_key),
+):
+    """Start scoring survey_data in the background (resuming an interrupted run
+    with the same filters). workers=0 scores with this process's model; more
+    start that many model processes. Poll GET /predict/batch for progress."""
+    filters = {
+        "state": survey_queries.split_values(state),
+        "district": survey_queries.split_values(district),
+        "gender": survey_queries.split_values(gender),
+    }
+    if workers == 0 and not served_catalog().semantic_ready:
+        raise service_unavailable(batch_predict.ModelUnavailable("The occupation model is not loaded"))
+    load_catalog = served_catalog if workers == 0 else batch_predict.default_catalog
+    started = prediction_job.start(filters=filters, only_missing=only_missing, chunk_size=chunk_size,
+                                   workers=workers, min_score=min_score, load_catalog=load_catalog)
+    return {"status": "success" if started else "already_running", "job": prediction_job.status()}
 
-        return {"status": "success", "prediction": prediction}
+@app.get("/predict/batch")
+def batch_prediction_status(api_key: str = Security(get_api_key)):
+    return {"status": "success", "job": prediction_job.status()}
 
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+@app.post("/predict/batch/cancel")
+def cancel_batch_prediction(api_key: str = Security(get_api_key)):
+    return {"status": "success", "job": prediction_job.cancel()}
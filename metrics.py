@@ -0,0 +1,186 @@
+"""
+In-process metrics in the Prometheus text format, without extra dependencies.
+
+MetricsMiddleware counts every request and records its latency (until the
+last body chunk is sent, so streamed downloads are timed in full) under the
+route template, e.g. "/search", never the raw URL. Hot paths wrap their
+distinct phases in timer("phase") so a slow endpoint can be pinned on pool
+acquire, query execute, row fetch, serialization, query encoding or scoring.
+Exceptions the endpoints turn into {"status": "error"} are counted through
+record_error(). Values are per process; with several workers scrape each one.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_request_scope = ContextVar("surveyx_request_scope", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, count in items:
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(count)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][slot] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, (list(counts), total)) for values, (counts, total) in self._values.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _labels(self.labels, values, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Collected:
+    """Values read from elsewhere at scrape time (pool size, cache hits...):
+    `collect()` returns [(label values, value), ...]."""
+
+    def __init__(self, name, help, labels, collect, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self.kind = kind
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = list(self.collect())
+        except Exception as e:
+            print(f"Error collecting {self.name}: {e}")
+            samples = []
+        for values, value in samples:
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(value)}")
+        return lines
+
+
+REQUESTS = Counter("surveyx_requests_total", "HTTP requests by route and status.",
+                   ("method", "endpoint", "status"))
+REQUEST_LATENCY = Histogram("surveyx_request_duration_seconds",
+                            "HTTP request latency including the streamed body.", ("method", "endpoint"))
+ERRORS = Counter("surveyx_errors_total", "Exceptions returned to clients as {\"status\": \"error\"}.",
+                 ("endpoint", "exception"))
+PHASES = Histogram("surveyx_phase_duration_seconds", "Time spent in each hot-path phase.", ("phase",))
+
+
+def timer(phase):
+    """with timer("query_execute"): ..."""
+    return PHASES.time(phase)
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def route_label(scope):
+    """Route template of a request ("/classify/stats"), "unmatched" for 404s."""
+    route = scope.get("route") if scope else None
+    return getattr(route, "path", None) or "unmatched"
+
+
+def record_error(exc):
+    """Count an exception an endpoint handled itself, under the current route."""
+    ERRORS.inc(route_label(_request_scope.get()), type(exc).__name__)
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding REQUESTS and REQUEST_LATENCY."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_scope.reset(token)
+            endpoint = route_label(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], endpoint)
+            REQUESTS.inc(scope["method"], endpoint, str(status["code"]))
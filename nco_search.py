@@ -0,0 +1,409 @@
+"""
+Occupation search over the NCO catalog, shared by the Gradio and Streamlit apps.
+
+Catalog embeddings are held as one contiguous, L2-normalised float32 matrix so a
+query is scored with a single matrix-vector product, and the top-k rows are
+picked with a partial selection instead of sorting the whole catalog. With
+SURVEYX_EMBEDDING_DTYPE=float16 or int8 the scan runs over a compact copy
+(embedding_store) and the best candidates are re-scored exactly. Fuzzy
+scores come from rapidfuzz.process.cdist over pre-lowercased titles, so a batch
+of queries is scored against the catalog in one call.
+
+A BM25 index over the titles (bm25.py) ranks results when the model is not
+available. In catalogs of LEXICAL_PREFILTER_MIN titles or more it also picks
+the LEXICAL_CANDIDATES best lexical hits of a query, and only those are
+scored semantically and fuzzily; queries with fewer than top_k lexical hits
+(titles sharing a word with them: other languages, synonyms) still scan
+everything.
+"""
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import ann_index
+import bm25
+import embedding_cache
+import embedding_store
+import metrics
+import snapshot
+from cache import TTLCache, file_version
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = process = None
+
+MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+NCO_DATA_PATH = snapshot.NCO_DATA_PATH
+ENCODE_BATCH_SIZE = 256
+SEMANTIC_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.3
+# "auto", "exact", "ivf" or "hnsw" (see ann_index.build_index)
+ANN_INDEX = os.environ.get("SURVEYX_ANN_INDEX", "auto")
+# Semantic candidates fetched from an approximate index before fuzzy fusion
+ANN_CANDIDATES = int(os.environ.get("SURVEYX_ANN_CANDIDATES", "200"))
+# Fuzzy scores below this (0-100) count as 0 and are pruned early by rapidfuzz
+FUZZY_SCORE_CUTOFF = int(os.environ.get("SURVEYX_FUZZY_SCORE_CUTOFF", "30"))
+FUZZY_WORKERS = int(os.environ.get("SURVEYX_FUZZY_WORKERS", "-1"))
+# Catalogs this large score semantic + fuzzy only on a query's top BM25 hits
+LEXICAL_PREFILTER_MIN = int(os.environ.get("SURVEYX_LEXICAL_PREFILTER_MIN", "20000"))
+LEXICAL_CANDIDATES = int(os.environ.get("SURVEYX_LEXICAL_CANDIDATES", "1000"))
+SCORE_BLOCK_CELLS = 8_000_000
+
+
+def load_nco_data(path=NCO_DATA_PATH):
+    return snapshot.load_nco_data(path)
+
+
+def load_model(model_name=MODEL_NAME):
+    """SentenceTransformer model, or None when the ML stack is unavailable."""
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    except Exception as e:
+        print(f"ML model not available: {e}")
+        return None
+
+
+def encode_titles(model, titles, batch_size=ENCODE_BATCH_SIZE):
+    """Encode titles with batched model.encode calls into a normalised float32 matrix."""
+    embeddings = model.encode(
+        [str(t) for t in titles],
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def encode_queries(model, queries, batch_size=ENCODE_BATCH_SIZE):
+    return encode_titles(model, queries, batch_size)
+
+
+def encode_query(model, query):
+    return encode_queries(model, [query])[0]
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, without a full sort."""
+    return ann_index.top_n(scores, k)
+
+
+def message_frame(message):
+    return pd.DataFrame({'occupation_title': [message], 'nco_code': ['N/A'], 'final_score': [0.0]})
+
+
+class OccupationCatalog:
+    """NCO titles, codes and (optionally) their embedding matrix."""
+
+    def __init__(self, nco_df, model=None, embeddings=None, index=None, version=None, store=None):
+        self.titles = nco_df['occupation_title'].astype(str).tolist()
+        self.norm_titles = [t.lower() for t in self.titles]
+        self.nco_codes = nco_df['nco_code'].to_numpy()
+        self.model = model
+        self.embeddings = embeddings
+        self.index = index
+        if store is None and embeddings is not None:
+            store = embedding_store.EmbeddingStore(embeddings)
+        self.store = store
+        self.version = version
+        self._lexical = None
+        self._lexical_lock = threading.Lock()
+        # Caches live and die with the catalog, so a rebuilt catalog starts clean
+        self.query_cache = TTLCache("query_embeddings")
+        self.result_cache = TTLCache("occupation_results")
+
+    def __len__(self):
+        return len(self.titles)
+
+    @property
+    def semantic_ready(self):
+        return self.model is not None and self.embeddings is not None and fuzz is not None
+
+    def _frame(self, idx, scores):
+        return pd.DataFrame({
+            'occupation_title': [self.titles[i] for i in idx],
+            'nco_code': self.nco_codes[idx],
+            'final_score': scores,
+        })
+
+    def _substring_rows(self, query, top_k):
+        q = query.lower()
+        with metrics.timer("substring_search"):
+            idx = [i for i, title in enumerate(self.norm_titles) if q in title][:int(top_k)]
+        return np.asarray(idx, dtype=np.int64), np.ones(len(idx))
+
+    def substring_search(self, query, top_k):
+        """Plain substring match."""
+        rows, scores = self._substring_rows(query, top_k)
+        if not len(rows):
+            return message_frame('No matches found')
+        return self._frame(rows, scores)
+
+    @property
+    def lexical(self):
+        """BM25 index over the titles, built on first use."""
+        if self._lexical is None:
+            with self._lexical_lock:
+                if self._lexical is None:
+                    self._lexical = bm25.BM25Index(self.titles)
+        return self._lexical
+
+    def _lexical_rows(self, query, top_k):
+        with metrics.timer("lexical_search"):
+            rows, scores = self.lexical.search(query, top_k)
+        if len(rows):
+            return rows, scores
+        # No whole or leading word in common; a match inside a word still counts
+        return self._substring_rows(query, top_k)
+
+    def lexical_search(self, query, top_k):
+        """Fallback when the ML stack is unavailable: titles ranked by BM25."""
+        rows, scores = self._lexical_rows(query, top_k)
+        if not len(rows):
+            return message_frame('No matches found')
+        return self._frame(rows, scores)
+
+    def fuzzy_scores(self, queries, rows=None):
+        """token_sort_ratio in [0, 1] for every query against the catalog (or `rows`
+        of it), shape (len(queries), n). rapidfuzz zeroes scores under
+        FUZZY_SCORE_CUTOFF, often without evaluating them fully."""
+        choices = self.norm_titles if rows is None else [self.norm_titles[i] for i in rows]
+        scores = process.cdist(
+            [q.lower() for q in queries],
+            choices,
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=FUZZY_SCORE_CUTOFF,
+            workers=FUZZY_WORKERS,
+            dtype=np.float32,
+        )
+        return scores / 100
+
+    def _lexical_candidates(self, query):
+        with metrics.timer("lexical_search"):
+            return self.lexical.search(query, LEXICAL_CANDIDATES)[0]
+
+    def _fuse(self, query, rows, semantic, top_k):
+        """Final scores of `rows` given their semantic scores; top-k of them."""
+        with metrics.timer("fuzzy_scoring"):
+            final = SEMANTIC_WEIGHT * semantic + FUZZY_WEIGHT * self.fuzzy_scores([query], rows)[0]
+        best = top_k_indices(final, top_k)
+        return rows[best], final[best]
+
+    def rank(self, queries, top_k):
+        """Top-k (rows, final scores) for each query, best first."""
+        queries = list(queries)
+        query_embs = self.encode(queries)
+        prefilter = LEXICAL_CANDIDATES > 0 and len(self.titles) >= LEXICAL_PREFILTER_MIN
+        results = [None] * len(queries)
+        if self.index is None or self.index.kind == "exact":
+            scan = []
+            for i, (query, emb) in enumerate(zip(queries, query_embs)):
+                rows = self._lexical_candidates(query) if prefilter else ()
+                if len(rows) < max(1, int(top_k)):
+                    scan.append(i)
+                    continue
+                with metrics.timer("semantic_scoring"):
+                    semantic = self.store.exact_scores(emb, rows)
+                results[i] = self._fuse(query, rows, semantic, top_k)
+
+            # Score whole blocks of the other queries against the full catalog at once,
+            # keeping each (queries x catalog) block to SCORE_BLOCK_CELLS floats
+            step = max(1, SCORE_BLOCK_CELLS // max(1, len(self.titles)))
+            rerank = self.store.quantized and embedding_store.RERANK_CANDIDATES > 0
+            for start in range(0, len(scan), step):
+                ids = scan[start:start + step]
+                block = query_embs[ids]
+                with metrics.timer("semantic_scoring"):
+                    final = self.store.scores(block)
+                    final *= SEMANTIC_WEIGHT
+                with metrics.timer("fuzzy_scoring"):
+                    fuzzy = self.fuzzy_scores([queries[i] for i in ids])
+                    final += FUZZY_WEIGHT * fuzzy
+                for i, emb, row, fuzzy_row in zip(ids, block, final, fuzzy):
+                    if not rerank:
+                        best = top_k_indices(row, top_k)
+                        results[i] = (best, row[best])
+                        continue
+                    # Compact scores only pick the candidates; their final scores are exact
+                    with metrics.timer("exact_rerank"):
+                        rows = top_k_indices(row, max(embedding_store.RERANK_CANDIDATES, int(top_k)))
+                        exact = SEMANTIC_WEIGHT * self.store.exact_scores(emb, rows) + FUZZY_WEIGHT * fuzzy_row[rows]
+                        best = top_k_indices(exact, top_k)
+                    results[i] = (rows[best], exact[best])
+            return results
+
+        for i, (query, emb) in enumerate(zip(queries, query_embs)):
+            with metrics.timer("semantic_scoring"):
+                rows, semantic = self.index.search(emb, max(ANN_CANDIDATES, int(top_k)))
+            if prefilter:
+                # Exact word matches the approximate index missed are scored too
+                extra = np.setdiff1d(self._lexical_candidates(query), rows)
+                if len(extra):
+                    with metrics.timer("semantic_scoring"):
+                        semantic = np.concatenate([semantic, self.store.exact_scores(emb, extra)])
+                    rows = np.concatenate([rows, extra])
+            results[i] = self._fuse(query, rows, semantic, top_k)
+        return results
+
+    def encode(self, queries):
+        """Query embeddings; only queries missing from the cache are encoded (in one batch)."""
+        keys = [normalize_query(q) for q in queries]
+        found = {}
+        for key in keys:
+            if key not in found:
+                hit, vector = self.query_cache.get(key)
+                if hit:
+                    found[key] = vector
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            with metrics.timer("query_encode"):
+                vectors = encode_queries(self.model, missing)
+            for key, vector in zip(missing, vectors):
+                vector = np.array(vector)
+                self.query_cache.set(key, vector)
+                found[key] = vector
+        return np.stack([found[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    def search_batch(self, queries, top_k):
+        """One result frame per query; scores every query in one pass."""
+        if not self.semantic_ready:
+            return [self.lexical_search(q, top_k) for q in queries]
+        return [self._frame(rows, scores) for rows, scores in self.rank(queries, top_k)]
+
+    def search(self, query, top_k):
+        key = ("search", normalize_query(query), int(top_k))
+        return self.result_cache.get_or_compute(key, lambda: self.search_batch([query], top_k)[0])
+
+    def classify(self, queries, top_k):
+        """Like search_batch, but plain lists of dicts (API responses). Cached
+        per query; the misses are scored together in one batch."""
+        keys = [("classify", normalize_query(q), int(top_k)) for q in queries]
+        found = {}
+        for key in keys:
+            if key not in found:
+                hit, matches = self.result_cache.get(key)
+                if hit:
+                    found[key] = matches
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            texts = [key[1] for key in missing]
+            if self.semantic_ready:
+                ranked = self.rank(texts, top_k)
+            else:
+                ranked = [self._lexical_rows(q, top_k) for q in texts]
+            for key, (rows, scores) in zip(missing, ranked):
+                matches = [
+                    {"occupation_title": self.titles[i], "nco_code": code, "score": round(float(score), 4)}
+                    for i, code, score in zip(rows, self.nco_codes[rows].tolist(), scores)
+                ]
+                self.result_cache.set(key, matches)
+                found[key] = matches
+        return [found[key] for key in keys]
+
+    def cache_stats(self):
+        return {"query_embeddings": self.query_cache.stats(), "occupation_results": self.result_cache.stats()}
+
+
+def normalize_query(query):
+    return embedding_cache.normalize_title(query)
+
+
+def build_catalog(nco_df, model=None, model_name=MODEL_NAME, cache_dir=embedding_cache.CACHE_DIR, version=None):
+    """Create the catalog; with a model, embeddings come from the on-disk cache
+    (only new titles are encoded). cache_dir=None always encodes in memory."""
+    embeddings = None
+    index = None
+    store = None
+    if model is not None:
+        titles = nco_df['occupation_title'].astype(str).tolist()
+        if cache_dir:
+            embeddings = embedding_cache.load_embeddings(model, model_name, titles, encode_titles, cache_dir)
+            index = load_or_build_index(embeddings, model_name, cache_dir)
+            store = load_or_build_store(embeddings, model_name, cache_dir)
+        else:
+            embeddings = encode_titles(model, titles)
+            index = ann_index.build_index(embeddings, ANN_INDEX)
+            store = embedding_store.build_store(embeddings)
+    return OccupationCatalog(nco_df, model, embeddings, index, version, store)
+
+
+class CatalogSource:
+    """Keeps a catalog in sync with the NCO CSV: when the file changes the
+    catalog is rebuilt (incrementally, through the embedding cache) and its
+    query/result caches go with the old one. The file is checked at most every
+    `check_interval` seconds; callers keep the current catalog during a rebuild."""
+
+    def __init__(self, model=None, path=NCO_DATA_PATH, check_interval=5.0, **build_kwargs):
+        self.model = model
+        self.path = path
+        self.check_interval = check_interval
+        self.build_kwargs = build_kwargs
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self._catalog = self._build()
+
+    def _build(self):
+        version = file_version(self.path)
+        return build_catalog(load_nco_data(self.path), self.model, version=version, **self.build_kwargs)
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._checked = now
+                if file_version(self.path) != self._catalog.version:
+                    print("NCO data changed, rebuilding catalog...")
+                    self._catalog = self._build()
+            except Exception as e:
+                print(f"Error rebuilding catalog, keeping the previous one: {e}")
+            finally:
+                self._lock.release()
+        return self._catalog
+
+
+def load_or_build_index(embeddings, model_name, cache_dir, kind=ANN_INDEX):
+    """Reuse the index saved for the current embedding cache generation, or build
+    and save a new one (dropping indexes of older generations)."""
+    kind = ann_index.resolve_kind(len(embeddings), kind)
+    if kind == "exact":
+        return ann_index.ExactIndex(embeddings)
+
+    directory = embedding_cache.model_dir(model_name, cache_dir)
+    generation = embedding_cache.current_generation(model_name, cache_dir)
+    path = os.path.join(directory, f"index-{kind}-g{generation}")
+    if os.path.exists(os.path.join(path, "index.json")):
+        return ann_index.load_index(path, embeddings)
+
+    index = ann_index.build_index(embeddings, kind)
+    index.save(path)
+    for name in os.listdir(directory):
+        if name.startswith("index-") and os.path.join(directory, name) != path:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return index
+
+
+def load_or_build_store(embeddings, model_name, cache_dir, dtype=None):
+    """Reuse the compact embedding copy saved for the current cache generation,
+    or quantise and save a new one (dropping copies of older generations)."""
+    dtype = dtype or embedding_store.EMBEDDING_DTYPE
+    if dtype == "float32":
+        return embedding_store.EmbeddingStore(embeddings)
+
+    directory = embedding_cache.model_dir(model_name, cache_dir)
+    generation = embedding_cache.current_generation(model_name, cache_dir)
+    path = os.path.join(directory, f"store-{dtype}-g{generation}")
+    if os.path.exists(os.path.join(path, "store.json")):
+        return embedding_store.load_store(path, embeddings)
+
+    store = embedding_store.build_store(embeddings, dtype)
+    store.save(path)
+    for name in os.listdir(directory):
+        if name.startswith("store-") and os.path.join(directory, name) != path:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return store
@@ -1,14 +1,10 @@
-import oracledb
+import db
 
-# Initialize the Instant Client (adjust path if different)
-oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_11_2")
-
-DB_USER = "penta_survey"
-DB_PASS = "555"
-DB_DSN  = "//localhost:1522/orcl"  # service name matches your listener
+# Connection settings come from db.py (SURVEYX_DB_* environment variables).
+# Set ORACLE_CLIENT_LIB_DIR=C:\oracle\instantclient_11_2 to use thick mode.
 
 try:
-    conn = oracledb.connect(user=DB_USER, password=DB_PASS, dsn=DB_DSN)
+    conn = db.connect()
     cur = conn.cursor()
 
     # Show total rows
@@ -0,0 +1,139 @@
+"""
+Sampling profiler that can be switched on in a live worker.
+
+A daemon thread wakes every `interval` seconds, snapshots the stack of every
+other thread with sys._current_frames() and counts identical stacks. Threads
+parked in a wait (idle pool workers, the event loop selector) are skipped.
+The result is in the collapsed format ("outer;inner;leaf count") that
+flamegraph.pl and speedscope read. The cost while running is one stack walk
+per thread per sample; when stopped there is none.
+
+Toggle it over HTTP (/profiler/start, /profiler/stop, /profiler) or, to reach
+one particular worker, with `kill -USR2 <pid>`: the first signal starts it,
+the second stops it and writes the stacks to PROFILE_DIR/profile-<pid>-<time>.txt.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_INTERVAL_MS = float(os.environ.get("SURVEYX_PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("SURVEYX_PROFILE_DIR", os.path.join("data", ".profiles"))
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("selectors.py", "select"), ("thread.py", "_worker"), ("_base.py", "wait"),
+}
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})"
+
+
+def _is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.samples = 0
+        self.started = None
+        self.stopped = None
+        self._stacks = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=None, duration=None, include_idle=False):
+        """Start sampling (clearing earlier samples); stops by itself after
+        `duration` seconds if given. Returns False if it was already running."""
+        with self._lock:
+            if self.running:
+                return False
+            if interval_ms:
+                self.interval = interval_ms / 1000
+            self._stacks = Counter()
+            self.samples = 0
+            self.started = time.time()
+            self.stopped = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration, include_idle),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        thread = self._thread
+        self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        return self.status()
+
+    def _run(self, duration, include_idle):
+        me = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (not include_idle and _is_idle(frame)):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped = time.time()
+
+    def top(self, limit=20):
+        """Most frequent stacks, hottest first."""
+        stacks = self._stacks.copy()  # the sampler keeps adding while running
+        total = sum(stacks.values()) or 1
+        return [{"stack": stack.split(";"), "samples": count, "share": round(count / total, 4)}
+                for stack, count in stacks.most_common(limit)]
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.copy().most_common())
+
+    def status(self):
+        return {"running": self.running, "pid": os.getpid(), "interval_ms": self.interval * 1000,
+                "samples": self.samples, "stacks": len(self._stacks),
+                "started": self.started, "stopped": self.stopped}
+
+    def dump(self, directory=PROFILE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile-{os.getpid()}-{int(time.time())}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return path
+
+
+profiler = SamplingProfiler()
+
+
+def install_signal_toggle(signum=getattr(signal, "SIGUSR2", None)):
+    """Toggle the process profiler on `signum`. Only possible from the main
+    thread and on platforms with SIGUSR2; returns whether it was installed."""
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def toggle(_signum, _frame):
+        if profiler.running:
+            profiler.stop()
+            print(f"Profiler stopped, stacks written to {profiler.dump()}")
+        else:
+            profiler.start()
+            print(f"Profiler started in process {os.getpid()}")
+
+    signal.signal(signum, toggle)
+    return True
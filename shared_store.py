@@ -0,0 +1,308 @@
+"""
+Read-only model and data store shared by worker processes.
+
+Under `uvicorn --workers N`, or with several Streamlit processes, every worker
+used to hold its own copy of the SentenceTransformer weights, the NCO
+embeddings and the survey/NCO frames. With the store, one loader process
+publishes them as files in a generation directory:
+
+    model.pt        model state dict, attached with torch.load(mmap=True)
+    embeddings.npy  NCO title embeddings, attached with np.load(mmap_mode="r")
+    index/          ANN index for large catalogs (IVF lists are memory-mapped too)
+    store/          float16/int8 copy of the embeddings (SURVEYX_EMBEDDING_DTYPE)
+    nco.arrow       NCO catalog and survey rows as single-batch Arrow files,
+    survey.arrow    attached with snapshot.read_mapped()
+
+and then atomically replaces CURRENT.json to point at it. Workers
+memory-map those files, so their pages sit once in the OS page cache however
+many workers attach. Each worker re-reads CURRENT.json at most every
+`check_interval` seconds and moves to a newer generation by itself; the
+loader keeps the previous generation so workers still using it are not cut
+off.
+
+Enable it by pointing SURVEYX_SHARED_STORE at the store directory, then:
+
+    python shared_store.py publish    # build a generation now
+    python shared_store.py watch      # republish whenever the source CSVs change
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import ann_index
+import ctl
+import embedding_cache
+import embedding_store
+import nco_search
+import snapshot
+from cache import file_version
+
+# Unset: every process loads its own copy, as before
+STORE_DIR = os.environ.get("SURVEYX_SHARED_STORE")
+DEFAULT_STORE_DIR = os.path.join("data", ".shared_store")
+CHECK_INTERVAL = float(os.environ.get("SURVEYX_SHARED_STORE_CHECK_INTERVAL", "5"))
+KEEP_GENERATIONS = 2
+CURRENT_FILE = "CURRENT.json"
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, value):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+
+
+def source_versions():
+    """mtime/size of every file a generation is built from."""
+    paths = [snapshot.NCO_DATA_PATH, snapshot.SURVEY_CTL_PATH]
+    if os.path.exists(snapshot.SURVEY_CTL_PATH):
+        survey_path = ctl.data_file_path(snapshot.SURVEY_CTL_PATH)
+        if survey_path:
+            paths.append(survey_path)
+    return {path: list(file_version(path) or ()) for path in paths}
+
+
+# ----------------------------
+# Loader side
+# ----------------------------
+def publish(store_dir=DEFAULT_STORE_DIR, model_name=nco_search.MODEL_NAME):
+    """Build a new generation from the current source files and make it current."""
+    os.makedirs(store_dir, exist_ok=True)
+    current = _read_json(os.path.join(store_dir, CURRENT_FILE)) or {}
+    generation = current.get("generation", 0) + 1
+    name = f"g{generation}"
+    tmp = os.path.join(store_dir, f"{name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    manifest = {"generation": generation, "model": None, "index": None, "embedding_dtype": None,
+                "sources": source_versions(), "created": time.time()}
+    nco_df = snapshot.load_nco_data()
+    snapshot.write_mapped(nco_df, os.path.join(tmp, "nco.arrow"))
+    survey_df = snapshot.load_survey_data()
+    if not survey_df.empty:
+        snapshot.write_mapped(survey_df, os.path.join(tmp, "survey.arrow"))
+
+    model = nco_search.load_model(model_name)
+    if model is not None:
+        import torch
+
+        torch.save(model.state_dict(), os.path.join(tmp, "model.pt"))
+        # The embedding cache means only titles added since the last run are encoded
+        titles = nco_df["occupation_title"].astype(str).tolist()
+        embeddings = embedding_cache.load_embeddings(model, model_name, titles, nco_search.encode_titles)
+        np.save(os.path.join(tmp, "embeddings.npy"), np.asarray(embeddings, dtype=np.float32))
+        kind = ann_index.resolve_kind(len(embeddings), nco_search.ANN_INDEX)
+        if kind != "exact":
+            ann_index.build_index(embeddings, kind).save(os.path.join(tmp, "index"))
+        if embedding_store.EMBEDDING_DTYPE != "float32":
+            embedding_store.build_store(embeddings).save(os.path.join(tmp, "store"))
+        manifest["model"] = model_name
+        manifest["index"] = kind
+        manifest["embedding_dtype"] = embedding_store.EMBEDDING_DTYPE
+
+    _write_json(os.path.join(tmp, "manifest.json"), manifest)
+    os.replace(tmp, os.path.join(store_dir, name))
+    _write_json(os.path.join(store_dir, CURRENT_FILE), {"generation": generation, "path": name})
+    _prune(store_dir, generation)
+    return manifest
+
+
+def _prune(store_dir, generation):
+    """Drop generations older than the last KEEP_GENERATIONS. Workers that
+    still map their files keep working on POSIX; elsewhere the delete is
+    retried on the next publish."""
+    for name in os.listdir(store_dir):
+        if not name.startswith("g") or not os.path.isdir(os.path.join(store_dir, name)):
+            continue
+        number = name[1:].split(".", 1)[0]
+        if number.isdigit() and int(number) <= generation - KEEP_GENERATIONS:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+def watch(store_dir=DEFAULT_STORE_DIR, model_name=nco_search.MODEL_NAME, interval=CHECK_INTERVAL):
+    """Publish whenever a source file changes (and once at start if needed)."""
+    while True:
+        current = _read_json(os.path.join(store_dir, CURRENT_FILE))
+        manifest = _read_json(os.path.join(store_dir, current["path"], "manifest.json")) if current else None
+        if manifest is None or manifest["sources"] != source_versions():
+            print("Source data changed, publishing a new generation...")
+            manifest = publish(store_dir, model_name)
+            print(f"Published generation {manifest['generation']}")
+        time.sleep(interval)
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+def attach_model(path, model_name):
+    """SentenceTransformer whose parameters are views of the memory-mapped
+    state dict. The model is built from the local Hugging Face cache first;
+    its private weights are released when the mapped ones are assigned."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    state = torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+    model.load_state_dict(state, assign=True)
+    return model.eval()
+
+
+class Generation:
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.number = manifest["generation"]
+        self._frames = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _frame(self, name):
+        if name not in self._frames:
+            path = self._file(f"{name}.arrow")
+            self._frames[name] = snapshot.read_mapped(path) if os.path.exists(path) else pd.DataFrame()
+        return self._frames[name]
+
+    def nco_df(self):
+        return self._frame("nco")
+
+    def survey_df(self):
+        return self._frame("survey")
+
+    def embeddings(self):
+        path = self._file("embeddings.npy")
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def model(self):
+        if not self.manifest.get("model"):
+            return None
+        return attach_model(self._file("model.pt"), self.manifest["model"])
+
+    def catalog(self, model=None):
+        """OccupationCatalog over this generation; pass `model` to reuse one
+        already attached for the same model name."""
+        model = model if model is not None else self.model()
+        embeddings = self.embeddings() if model is not None else None
+        index = store = None
+        if embeddings is not None:
+            index_path = self._file("index")
+            if os.path.exists(os.path.join(index_path, "index.json")):
+                index = ann_index.load_index(index_path, embeddings)
+            else:
+                index = ann_index.ExactIndex(embeddings)
+            store_path = self._file("store")
+            if os.path.exists(os.path.join(store_path, "store.json")):
+                store = embedding_store.load_store(store_path, embeddings)
+        return nco_search.OccupationCatalog(self.nco_df(), model, embeddings, index, version=self.number,
+                                            store=store)
+
+
+class SharedStore:
+    def __init__(self, store_dir=None, check_interval=CHECK_INTERVAL):
+        self.store_dir = store_dir or STORE_DIR or DEFAULT_STORE_DIR
+        self.check_interval = check_interval
+        self._generation = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The current Generation (None until the loader has published one)."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self._generation
+        with self._lock:
+            self._checked = now
+            pointer = _read_json(os.path.join(self.store_dir, CURRENT_FILE))
+            if pointer and (self._generation is None or pointer["generation"] != self._generation.number):
+                path = os.path.join(self.store_dir, pointer["path"])
+                manifest = _read_json(os.path.join(path, "manifest.json"))
+                if manifest is not None:
+                    self._generation = Generation(path, manifest)
+            return self._generation
+
+
+_store = None
+
+
+def get_store():
+    """Process-wide SharedStore for STORE_DIR."""
+    global _store
+    if _store is None:
+        _store = SharedStore()
+    return _store
+
+
+class SharedCatalogSource:
+    """Drop-in for nco_search.CatalogSource backed by the shared store: the
+    catalog follows the current generation, reusing the attached model while
+    the model name stays the same. Until a generation is published it serves
+    the plain CSV catalog (substring search)."""
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._model = (None, None)
+        self._fallback = None
+        self._failed = None
+
+    def _build(self, generation):
+        name = generation.manifest.get("model")
+        model = self._model[1] if name and self._model[0] == name else None
+        catalog = generation.catalog(model)
+        self._model = (name, catalog.model)
+        return catalog
+
+    def get(self):
+        generation = self.store.current()
+        if generation is None:
+            if self._fallback is None:
+                self._fallback = nco_search.CatalogSource()
+            return self._fallback.get()
+        if self._catalog is not None and generation.number in (self._catalog.version, self._failed):
+            return self._catalog
+        # The first catalog is waited for; later refreshes keep serving the old one
+        if self._lock.acquire(blocking=self._catalog is None):
+            try:
+                if self._catalog is None or self._catalog.version != generation.number:
+                    self._catalog = self._build(generation)
+            except Exception as e:
+                if self._catalog is None:
+                    raise
+                self._failed = generation.number
+                print(f"Error attaching generation {generation.number}, keeping the previous one: {e}")
+            finally:
+                self._lock.release()
+        return self._catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the shared model/data store")
+    parser.add_argument("command", choices=["publish", "watch"])
+    parser.add_argument("--store", default=STORE_DIR or DEFAULT_STORE_DIR)
+    parser.add_argument("--model", default=nco_search.MODEL_NAME)
+    args = parser.parse_args()
+    if args.command == "publish":
+        manifest = publish(args.store, args.model)
+        print(f"Published generation {manifest['generation']} to {args.store}")
+    else:
+        watch(args.store, args.model)
+
+
+if __name__ == "__main__":
+    main()
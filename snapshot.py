@@ -0,0 +1,153 @@
+"""
+Columnar snapshots of the survey and NCO CSV files.
+
+The first load parses the CSV once, shrinks the dtypes (categoricals for the
+text dimensions, the smallest integer type for numbers) and writes an
+uncompressed Arrow IPC file under data/.snapshots/. Later loads memory-map
+that file instead of parsing text. A snapshot is rebuilt only when the source
+CSV (or the control file that points at it) changes. Without pyarrow the
+loaders fall back to parsing the CSV, still with compact dtypes.
+
+Build both snapshots ahead of time with:
+
+    python snapshot.py
+"""
+import json
+import os
+from io import StringIO
+
+import pandas as pd
+
+import ctl
+from cache import file_version
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
+
+SNAPSHOT_DIR = os.path.join("data", ".snapshots")
+SURVEY_CTL_PATH = os.path.join("data", "survey_data.ctl")
+NCO_DATA_PATH = os.path.join("data", "MOCK_DATA_with_NCO.csv")
+
+CATEGORY_COLUMNS = ("state", "district", "gender", "occupation", "occupation_title")
+INTEGER_COLUMNS = ("id", "income", "year", "nco_code")
+
+
+def read_text_csv(path, delimiter=","):
+    """Read the file once; decode as UTF-8 and fall back to latin-1 on the same bytes."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+    return pd.read_csv(StringIO(text), delimiter=delimiter, quotechar='"')
+
+
+def read_control_data(control, data_path=None):
+    """The control file's data file, read as bulk_load reads it (ctl.read_records:
+    delimiter, enclosure, SKIP) with the column list as header. Extra fields
+    are ignored, missing ones are NULL, FILLER fields are dropped and CONSTANT
+    columns filled in."""
+    names = [c.name for c in control.data_columns]
+    width = len(names)
+
+    def read(encoding):
+        return [fields[:width] + [""] * (width - len(fields))
+                for _, fields in ctl.read_records(control, data_path, encoding)]
+
+    try:
+        records = read("utf-8")
+    except UnicodeDecodeError:
+        records = read("latin-1")
+    df = pd.DataFrame(records, columns=names, dtype=object)
+    for name in names:
+        values = df[name].str.strip().replace("", None)
+        try:
+            df[name] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            df[name] = values.astype("string")
+    for column in control.columns:
+        if column.constant is not None:
+            df[column.name] = column.constant
+    return df[[c.name for c in control.load_columns]]
+
+
+def compact_dtypes(df):
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS and pd.api.types.is_string_dtype(df[col]) \
+                and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+        elif col in INTEGER_COLUMNS and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def write_mapped(df, path):
+    """Write df as one uncompressed record batch, so read_mapped() can map it without copying."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp, compression="uncompressed", chunksize=max(1, len(df)))
+    os.replace(tmp, path)
+
+
+def read_mapped(path):
+    """Memory-map an Arrow IPC file as a DataFrame. Numeric and categorical
+    columns of a single-batch file stay views of the mapping (read-only), so
+    processes mapping the same file share its pages instead of copying them."""
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _snapshot_paths(name, snapshot_dir):
+    return os.path.join(snapshot_dir, f"{name}.arrow"), os.path.join(snapshot_dir, f"{name}.json")
+
+
+def load_snapshot(name, sources, build, snapshot_dir=SNAPSHOT_DIR):
+    """Memory-map snapshot `name` if it was built from the current `sources`
+    files, otherwise call build() and write a fresh snapshot."""
+    versions = {path: file_version(path) for path in sources}
+    data_path, meta_path = _snapshot_paths(name, snapshot_dir)
+    if feather is not None:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("sources") == {p: list(v) if v else None for p, v in versions.items()}:
+                return read_mapped(data_path)
+        except (OSError, ValueError):
+            pass
+
+    df = compact_dtypes(build())
+    if feather is not None:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        write_mapped(df, data_path)
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sources": {p: list(v) if v else None for p, v in versions.items()}}, f)
+        os.replace(tmp, meta_path)
+    return df
+
+
+def load_survey_data(ctl_path=SURVEY_CTL_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Survey rows from the CSV named by the control file's INFILE (empty if missing)."""
+    control = ctl.load_control_file(ctl_path)
+    if not os.path.exists(control.infile):
+        return pd.DataFrame()
+    return load_snapshot(
+        "survey_data",
+        [ctl_path, control.infile],
+        lambda: read_control_data(control),
+        snapshot_dir,
+    )
+
+
+def load_nco_data(path=NCO_DATA_PATH, snapshot_dir=SNAPSHOT_DIR):
+    return load_snapshot("nco_data", [path], lambda: read_text_csv(path), snapshot_dir)
+
+
+if __name__ == "__main__":
+    survey_df = load_survey_data()
+    nco_df = load_nco_data()
+    print(f"survey_data: {len(survey_df)} rows, {survey_df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+    print(f"nco_data: {len(nco_df)} rows, {nco_df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
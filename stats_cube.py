@@ -0,0 +1,202 @@
+"""
+Pre-aggregated income statistics over survey_data (the /stats cube).
+
+The cube keeps one row per distinct (state, district, gender, year, income)
+with its row count. That is enough to answer count, sum, mean and exact
+quantiles of income for any combination of the dimensions without reading
+survey_data again. It is built with one GROUP BY in the database and then
+refreshed incrementally: only rows with an id above the highest id already
+folded in are aggregated and merged. Ids are not unique in the loaded data,
+so a refresh that leaves the cube total different from COUNT(*) (rows were
+deleted, or inserted with an old id) falls back to a full rebuild.
+
+The cells are close to one per survey row, so summarising them is not free;
+each summary is cached under the cube version it was computed from and
+dropped when the cube changes.
+
+The Streamlit app builds the same cube from the survey DataFrame.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from cache import TTLCache
+
+DIMENSIONS = ("state", "district", "gender", "year")
+CELL_COLUMNS = DIMENSIONS + ("income",)
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+FETCH_ARRAYSIZE = 5000
+
+AGGREGATE_SQL = (
+    "SELECT state, district, gender, year, income, COUNT(*) FROM survey_data{where} "
+    "GROUP BY state, district, gender, year, income"
+)
+
+
+def _empty_cells():
+    return pd.DataFrame({**{c: pd.Series(dtype=object) for c in CELL_COLUMNS}, "n": pd.Series(dtype=np.int64)})
+
+
+def _merge(*frames):
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return _empty_cells()
+    merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return merged.groupby(list(CELL_COLUMNS), dropna=False, observed=True, sort=False)["n"].sum().reset_index()
+
+
+def aggregate(conn, after_id=None, upto_id=None):
+    """Cells for the rows with after_id < id <= upto_id (each bound optional;
+    rows without an id are only included when there is no lower bound)."""
+    clauses, params = [], {}
+    if after_id is not None:
+        clauses.append("id > :after_id")
+        params["after_id"] = after_id
+    if upto_id is not None:
+        clauses.append("(id <= :upto_id OR id IS NULL)" if after_id is None else "id <= :upto_id")
+        params["upto_id"] = upto_id
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    cur = conn.cursor()
+    cur.arraysize = FETCH_ARRAYSIZE
+    with metrics.timer("query_execute"):
+        cur.execute(AGGREGATE_SQL.format(where=where), params)
+    rows = []
+    with metrics.timer("row_fetch"):
+        while True:
+            batch = cur.fetchmany()
+            if not batch:
+                break
+            rows.extend(batch)
+    cur.close()
+    if not rows:
+        return _empty_cells()
+    cells = pd.DataFrame(rows, columns=list(CELL_COLUMNS) + ["n"])
+    cells["income"] = pd.to_numeric(cells["income"], errors="coerce")
+    cells["n"] = cells["n"].astype(np.int64)
+    return cells
+
+
+def summarize(cells, by=(), quantiles=DEFAULT_QUANTILES, filters=None):
+    """Group-by statistics of income over the cells.
+
+    filters: {dimension: value} equality filters, plus optional "year_from" /
+    "year_to" bounds. Returns one row per group with count (all rows),
+    income_count (rows with an income), income_sum, income_mean and one
+    income_p<q> column per quantile (nearest-rank, so always an observed value).
+    """
+    by = list(by)
+    for column, value in (filters or {}).items():
+        if value is None:
+            continue
+        if column == "year_from":
+            cells = cells[cells["year"] >= value]
+        elif column == "year_to":
+            cells = cells[cells["year"] <= value]
+        else:
+            cells = cells[cells[column] == value]
+
+    keys = by or ["_all"]
+    if not by:
+        cells = cells.assign(_all=0)
+    grouped = dict(dropna=False, observed=True, sort=True)
+
+    out = cells.groupby(keys, **grouped)["n"].sum().to_frame("count")
+    valued = cells[cells["income"].notna()].sort_values(keys + ["income"], kind="stable")
+    valued = valued.assign(weighted=valued["income"] * valued["n"])
+    by_group = valued.groupby(keys, **grouped)
+    out["income_count"] = by_group["n"].sum()
+    out["income_sum"] = by_group["weighted"].sum()
+    out["income_count"] = out["income_count"].fillna(0).astype(np.int64)
+    out["income_mean"] = out["income_sum"] / out["income_count"].where(out["income_count"] > 0)
+
+    cumulative = by_group["n"].cumsum()
+    totals = by_group["n"].transform("sum")
+    for q in quantiles:
+        rank = np.maximum(1, np.ceil(q * totals))
+        picked = valued[cumulative >= rank].groupby(keys, **grouped)["income"].first()
+        out[f"income_p{round(q * 100, 2):g}"] = picked
+
+    out = out.reset_index()
+    return out.drop(columns=["_all"]) if not by else out
+
+
+def records(frame):
+    """DataFrame -> list of JSON-ready dicts (NaN becomes None)."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+class StatsCube:
+    """Cells plus the (row count, max id) version of survey_data they cover.
+
+    Readers use whatever cells are current; refresh() swaps in a new frame
+    under a lock, so concurrent refreshes do the work once. summarize() results
+    are cached per version until the next refresh.
+    """
+
+    def __init__(self, cells=None, max_id=None, version=None):
+        self.cells = cells if cells is not None else _empty_cells()
+        self.max_id = max_id
+        self.version = version
+        self.full_builds = 0
+        self.incremental_refreshes = 0
+        self.summaries = TTLCache("income_stats")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Cube over an in-memory survey DataFrame (the Streamlit explorer)."""
+        if df.empty or not set(CELL_COLUMNS) <= set(df.columns):
+            return cls()
+        frame = df[list(CELL_COLUMNS)].copy()
+        for column in ("state", "district", "gender"):
+            frame[column] = frame[column].astype(object)
+        cells = frame.groupby(list(CELL_COLUMNS), dropna=False, sort=False).size().reset_index(name="n")
+        ids = df["id"] if "id" in df.columns else pd.Series(dtype=np.int64)
+        max_id = None if ids.isna().all() else ids.max()
+        return cls(cells, max_id, (len(df), max_id))
+
+    def total(self):
+        return int(self.cells["n"].sum())
+
+    def refresh(self, conn, version):
+        """Bring the cube up to `version` = (row count, max id) of survey_data.
+        Returns "unchanged", "incremental" or "rebuilt"."""
+        with self._lock:
+            if version == self.version:
+                return "unchanged"
+            count, max_id = version
+            if self.version is not None and self.max_id is not None and max_id is not None \
+                    and max_id >= self.max_id:
+                cells = _merge(self.cells, aggregate(conn, after_id=self.max_id, upto_id=max_id))
+                if int(cells["n"].sum()) == count:
+                    self.cells, self.max_id, self.version = cells, max_id, version
+                    self.incremental_refreshes += 1
+                    self.summaries.clear()
+                    return "incremental"
+            self.cells = _merge(aggregate(conn, upto_id=max_id))
+            self.max_id, self.version = max_id, version
+            self.full_builds += 1
+            self.summaries.clear()
+            return "rebuilt"
+
+    def summarize(self, by=(), quantiles=DEFAULT_QUANTILES, filters=None):
+        """summarize() over the current cells, cached; treat the result as read-only."""
+        # Version before cells: a refresh in between caches newer cells under the
+        # old version, never older cells under the new one
+        version = self.version
+        cells = self.cells
+        key = (version, tuple(by), tuple(quantiles),
+               tuple(sorted((k, v) for k, v in (filters or {}).items() if v is not None)))
+        return self.summaries.get_or_compute(key, lambda: summarize(cells, by, quantiles, filters))
+
+    def stats(self):
+        return {
+            "cells": len(self.cells),
+            "rows": self.total(),
+            "max_id": None if self.max_id is None else int(self.max_id),
+            "full_builds": self.full_builds,
+            "incremental_refreshes": self.incremental_refreshes,
+            "summaries": self.summaries.stats(),
+        }
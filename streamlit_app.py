@@ -1,14 +1,16 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import re, os
 
-try:
-    from sentence_transformers import SentenceTransformer, util
-    from rapidfuzz import fuzz
-    ML_AVAILABLE = True
-except ImportError as e:
-    st.warning(f"ML libraries not available: {e}")
-    ML_AVAILABLE = False
+import ctl
+import nco_search
+import shared_store
+import snapshot
+from stats_cube import DIMENSIONS, StatsCube
+from survey_index import SurveyIndex, scan
+from cache import file_version
+from warmup import Warmup
 
 # Page configuration
 st.set_page_config(
@@ -21,97 +23,70 @@ st.set_page_config(
 # Load datasets
 # ----------------------------
 @st.cache_data
-def load_nco_data():
+def load_nco_data(version=None):
+    # `version` (file mtime/size) is part of the cache key, so an edited CSV is re-read
     try:
-        return pd.read_csv("data/MOCK_DATA_with_NCO.csv")
+        return nco_search.load_nco_data()
     except FileNotFoundError:
         st.error("NCO data file not found. Please ensure MOCK_DATA_with_NCO.csv exists in the data folder.")
         return pd.DataFrame()
 
+def survey_version(generation):
+    # The shared-store generation, or the control file and its data file
+    if generation is not None:
+        return ("generation", generation.number)
+    if not os.path.exists(snapshot.SURVEY_CTL_PATH):
+        return None
+    data_path = ctl.data_file_path(snapshot.SURVEY_CTL_PATH)
+    return (file_version(snapshot.SURVEY_CTL_PATH), file_version(data_path) if data_path else None)
+
 @st.cache_data
-def load_survey_data():
+def load_survey_data(version=None):
     try:
-        ctl_file_path = "data/survey_data.ctl"
-        with open(ctl_file_path, "r", encoding="utf-8") as f:
-            ctl_content = f.read()
-
-        infile_match = re.search(r"INFILE\s+'([^']+)'", ctl_content, re.IGNORECASE)
-        if not infile_match:
-            return pd.DataFrame()
-
-        raw_path = infile_match.group(1).strip()
-        if not os.path.isabs(raw_path):
-            data_file_path = os.path.join(os.path.dirname(ctl_file_path), raw_path)
-        else:
-            data_file_path = raw_path
-
-        if not os.path.exists(data_file_path):
-            return pd.DataFrame()
-
-        delimiter_match = re.search(r"FIELDS TERMINATED BY\s+'([^']+)'", ctl_content, re.IGNORECASE)
-        delimiter = delimiter_match.group(1) if delimiter_match else ","
-
-        try:
-            df = pd.read_csv(data_file_path, delimiter=delimiter, encoding="utf-8", quotechar='"')
-            return df
-        except UnicodeDecodeError:
-            return pd.read_csv(data_file_path, delimiter=delimiter, encoding="latin-1", quotechar='"')
+        # Memory-mapped columnar snapshot, rebuilt from the CSV only when it changes
+        return snapshot.load_survey_data()
     except Exception as e:
         st.error(f"Error loading survey data: {e}")
         return pd.DataFrame()
 
+@st.cache_resource
+def load_stats_cube(_survey_df, version=None):
+    # Same pre-aggregated cube as the API's /stats endpoint; keyed on `version`,
+    # since hashing the frame itself would cost a full pass on every rerun
+    return StatsCube.from_frame(_survey_df)
+
 # ----------------------------
-# Load model + embeddings (with caching)
+# Model + embeddings, warmed up in the background
 # ----------------------------
 @st.cache_resource
-def load_model():
-    if ML_AVAILABLE:
-        try:
-            with st.spinner("Loading SentenceTransformer model..."):
-                model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-                st.success("Model loaded successfully!")
-                return model
-        except Exception as e:
-            st.error(f"Error loading model: {e}")
-            return None
-    else:
-        return None
+def load_fallback_catalog(_nco_df, version=None):
+    # Substring search, served until the semantic catalog is ready; keyed on the
+    # NCO file version rather than a hash of the frame
+    return nco_search.build_catalog(_nco_df)
+
+def load_semantic_source():
+    if shared_store.STORE_DIR:
+        return shared_store.SharedCatalogSource()
+    model = nco_search.load_model()
+    if model is None:
+        raise RuntimeError("ML libraries or model not available")
+    return nco_search.CatalogSource(model)
 
-def search_occupation(query, top_k, nco_df, model):
-    if not ML_AVAILABLE or model is None:
-        # Fallback to simple text matching
-        temp_df = nco_df.copy()
-        temp_df['simple_score'] = temp_df['occupation_title'].apply(
-            lambda title: 1.0 if query.lower() in title.lower() else 0.0
-        )
-        results = temp_df[temp_df['simple_score'] > 0].sort_values(by='simple_score', ascending=False).head(top_k)
-        if results.empty:
-            return pd.DataFrame({'occupation_title': ['No matches found'], 'nco_code': ['N/A'], 'final_score': [0.0]})
-        return results[['occupation_title', 'nco_code', 'simple_score']].rename(columns={'simple_score': 'final_score'})
-    
+@st.cache_resource
+def start_warmup(_survey_df, version=None):
+    # One warm-up per process and survey version, shared by all sessions; pages
+    # render while it runs
+    return Warmup([
+        ("semantic search", load_semantic_source),
+        ("survey index", lambda: SurveyIndex(_survey_df)),
+    ]).start()
+
+def search_occupation(query, top_k, catalog):
     try:
-        query_emb = model.encode(query, convert_to_tensor=True)
-        temp_df = nco_df.copy()
-        
-        # Create embeddings if they don't exist
-        if 'embeddings' not in temp_df.columns:
-            with st.spinner("Creating embeddings..."):
-                temp_df['embeddings'] = temp_df['occupation_title'].apply(
-                    lambda x: model.encode(str(x), convert_to_tensor=True)
-                )
-        
-        temp_df['semantic_score'] = temp_df['embeddings'].apply(
-            lambda emb: float(util.cos_sim(query_emb, emb))
-        )
-        temp_df['fuzzy_score'] = temp_df['occupation_title'].apply(
-            lambda title: fuzz.token_sort_ratio(query.lower(), title.lower()) / 100
-        )
-        temp_df['final_score'] = 0.7 * temp_df['semantic_score'] + 0.3 * temp_df['fuzzy_score']
-        results = temp_df.sort_values(by='final_score', ascending=False).head(top_k)
-        return results[['occupation_title', 'nco_code', 'final_score']]
+        return catalog.search(query, top_k)
     except Exception as e:
         st.error(f"Error in search_occupation: {e}")
-        return pd.DataFrame({'occupation_title': ['Search error'], 'nco_code': ['N/A'], 'final_score': [0.0]})
+        return nco_search.message_frame('Search error')
 
 # ----------------------------
 # Main App
@@ -121,12 +96,19 @@ def main():
     st.markdown("### Comprehensive survey data management with AI-powered occupation search")
 
     # Load data
-    nco_df = load_nco_data()
-    survey_df = load_survey_data()
-    model = load_model()
+    nco_key = file_version(nco_search.NCO_DATA_PATH)
+    nco_df = load_nco_data(nco_key)
+    generation = shared_store.get_store().current() if shared_store.STORE_DIR else None
+    # From the shared store the frame is memory-mapped instead of copied per session
+    survey_key = survey_version(generation)
+    survey_df = generation.survey_df() if generation is not None else load_survey_data(survey_key)
+    warmup = start_warmup(survey_df, survey_key)
+    semantic = warmup.get("semantic search")
+    catalog = semantic.get() if semantic is not None else load_fallback_catalog(nco_df, nco_key)
 
     # Sidebar
     st.sidebar.title("Navigation")
+    st.sidebar.caption(warmup.describe())
     tab_option = st.sidebar.selectbox(
         "Choose a section:",
         ["📊 Survey Data Explorer", "🔍 NCO Occupation Search", "ℹ️ About"]
@@ -156,13 +138,22 @@ def main():
                 search_value = st.text_input("Enter search value:")
             
             if st.button("Search") and search_value.strip():
-                results = survey_df[survey_df[search_column].astype(str).str.contains(search_value, case=False, na=False)]
+                index = warmup.get("survey index")
+                if index is not None:
+                    results = index.search(search_column, search_value.strip())
+                else:
+                    results = scan(survey_df, search_column, search_value.strip())
                 st.success(f"Found {len(results)} records")
                 if not results.empty:
                     st.dataframe(results, use_container_width=True)
                 else:
                     st.info("No matching records found.")
 
+            # Income statistics
+            st.subheader("Income Statistics")
+            group_by = st.multiselect("Group by:", list(DIMENSIONS), default=["state"])
+            st.dataframe(load_stats_cube(survey_df, survey_key).summarize(group_by), use_container_width=True)
+
     elif tab_option == "🔍 NCO Occupation Search":
         st.header("🔍 NCO Occupation Search")
         st.markdown("### Multilingual Job Title Matching")
@@ -184,7 +175,7 @@ def main():
             
             if st.button("Search Occupations") and job_query.strip():
                 with st.spinner("Searching..."):
-                    results = search_occupation(job_query, top_k, nco_df, model)
+                    results = search_occupation(job_query, top_k, catalog)
                 
                 if not results.empty and results.iloc[0]['occupation_title'] != 'No matches found':
                     st.success(f"Found {len(results)} matches")
@@ -194,10 +185,10 @@ def main():
                     st.dataframe(results_display, use_container_width=True)
                     
                     # Show additional info
-                    if ML_AVAILABLE and model is not None:
+                    if catalog.semantic_ready:
                         st.info("🤖 Results generated using AI-powered semantic search + fuzzy matching")
                     else:
-                        st.info("🔍 Results generated using simple text matching (fallback mode)")
+                        st.info("🔍 Results ranked by keyword relevance (BM25) while the AI model is unavailable")
                 else:
                     st.warning("No matching occupations found. Try different keywords.")
 
@@ -229,13 +220,16 @@ def main():
                 st.metric("Total Survey Records", len(survey_df))
             with col2:
                 st.metric("Survey Data Columns", len(survey_df.columns))
+            st.markdown("**Records and income by state**")
+            st.dataframe(load_stats_cube(survey_df, survey_key).summarize(["state"]), use_container_width=True)
                 
         if not nco_df.empty:
             col1, col2 = st.columns(2)
             with col1:
                 st.metric("NCO Occupations", len(nco_df))
             with col2:
-                st.metric("ML Model Status", "✅ Active" if ML_AVAILABLE and model else "⚠️ Fallback")
+                st.metric("ML Model Status", "✅ Active" if catalog.semantic_ready
+                          else "⏳ Warming up" if not warmup.ready else "⚠️ Fallback")
 
         st.markdown("""
         ### 🚀 Deployment
@@ -0,0 +1,103 @@
+"""
+Inverted index over the survey DataFrame for the explorer's column search.
+
+Each column is factorised once at load: every distinct value gets a posting
+list (sorted row positions). A search matches the (case-insensitive)
+substring against the distinct values instead of every row, then unions
+their posting lists. Low-cardinality columns (state, district, gender, year)
+have few distinct values, so that scan is tiny; columns with many distinct
+values (occupation_title) also get a trigram index over those values.
+Multi-column AND queries intersect the posting lists.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns with at least this many distinct values get a trigram index
+TRIGRAM_MIN_VALUES = 1000
+
+
+def scan(df, column, value):
+    """Unindexed equivalent of SurveyIndex.search, used until the index is built."""
+    column = df[column]
+    needle = str(value).lower()
+    return df[column.notna() & column.astype(str).str.lower().str.contains(needle, regex=False)]
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ColumnIndex:
+    def __init__(self, series, trigram_min_values=TRIGRAM_MIN_VALUES):
+        codes, uniques = pd.factorize(series)  # NaN -> -1, never matches
+        valid = np.flatnonzero(codes >= 0)
+        codes = codes[valid]
+        self.rows = valid[np.argsort(codes, kind="stable")]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+        self.values = [str(u).lower() for u in uniques]
+        self.by_value = {}
+        for uid, value in enumerate(self.values):
+            self.by_value.setdefault(value, []).append(uid)
+
+        self.trigrams = None
+        if len(self.values) >= trigram_min_values:
+            grams = {}
+            for uid, value in enumerate(self.values):
+                for gram in _trigrams(value):
+                    grams.setdefault(gram, []).append(uid)
+            self.trigrams = {gram: np.asarray(ids, dtype=np.int64) for gram, ids in grams.items()}
+
+    def _postings(self, uids):
+        if not len(uids):
+            return np.empty(0, dtype=np.int64)
+        if len(uids) == 1:
+            return self.rows[self.offsets[uids[0]]:self.offsets[uids[0] + 1]]
+        return np.sort(np.concatenate([self.rows[self.offsets[u]:self.offsets[u + 1]] for u in uids]))
+
+    def _matching_values(self, needle):
+        if self.trigrams is not None and len(needle) >= 3:
+            candidates = None
+            for gram in sorted(_trigrams(needle), key=lambda g: len(self.trigrams.get(g, ()))):
+                ids = self.trigrams.get(gram)
+                if ids is None:
+                    return []
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    return []
+            return [uid for uid in candidates.tolist() if needle in self.values[uid]]
+        return [uid for uid, value in enumerate(self.values) if needle in value]
+
+    def equals(self, value):
+        return self._postings(self.by_value.get(str(value).lower(), []))
+
+    def contains(self, value):
+        return self._postings(self._matching_values(str(value).lower()))
+
+
+class SurveyIndex:
+    def __init__(self, df, trigram_min_values=TRIGRAM_MIN_VALUES):
+        self.df = df
+        self.columns = {col: ColumnIndex(df[col], trigram_min_values) for col in df.columns}
+
+    def lookup(self, column, value, exact=False):
+        """Sorted row positions where `column` contains (or equals) value, case-insensitively."""
+        index = self.columns[column]
+        return index.equals(value) if exact else index.contains(value)
+
+    def query(self, filters, exact=False):
+        """Row positions matching every {column: value} filter (AND)."""
+        postings = sorted((self.lookup(c, v, exact) for c, v in filters.items()), key=len)
+        if not postings:
+            return np.arange(len(self.df))
+        rows = postings[0]
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def search(self, column, value):
+        return self.df.iloc[self.lookup(column, value)]
+
+    def search_all(self, filters, exact=False):
+        return self.df.iloc[self.query(filters, exact)]
@@ -0,0 +1,257 @@
+"""
+SQL building for survey_data reads: column projection, equality filters and
+keyset pagination.
+
+Pages are ordered by (id, ROWID) and the next page starts after the last key
+seen, so every page is an index range scan no matter how deep the client has
+paged. ROWID breaks ties because ids are not unique in the loaded data. The
+cursor handed to clients is that key, base64-encoded. Queries use ROWNUM so
+they also run on Oracle 11g.
+
+A search with several values per column (states Kerala and Goa, genders Male
+and Female) is split into one equality query per combination. The async
+fan-out runs those partitions concurrently on separate connections and
+merges each one into the page as it arrives, in the same (id, ROWID) order,
+so pages and cursors are the same as for a single query.
+"""
+import asyncio
+import base64
+import heapq
+import itertools
+import json
+import os
+
+import metrics
+
+SURVEY_COLUMNS = ("id", "occupation", "state", "district", "gender", "income", "year", "nco_code")
+MAX_PAGE_SIZE = int(os.environ.get("SURVEYX_MAX_PAGE_SIZE", "1000"))
+MAX_PARTITIONS = int(os.environ.get("SURVEYX_SEARCH_MAX_PARTITIONS", "25"))
+FANOUT_CONCURRENCY = int(os.environ.get("SURVEYX_SEARCH_FANOUT", "4"))  # per request
+
+# Oracle orders ROWIDs by their base-64 digits in this order, not ASCII order
+_ROWID_DIGITS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_ROWID_ORDER = str.maketrans({c: chr(i) for i, c in enumerate(_ROWID_DIGITS)})
+
+
+class InvalidQuery(ValueError):
+    """Bad column name, filter or cursor supplied by the client."""
+
+
+def parse_columns(columns):
+    """'id,state' -> ['id', 'state']; None/empty means every column."""
+    if not columns:
+        return None
+    names = [c.strip().lower() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in names if c not in SURVEY_COLUMNS]
+    if unknown:
+        raise InvalidQuery(f"Unknown column(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def encode_cursor(row_id, rid):
+    raw = json.dumps([row_id, rid], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        row_id, rid = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return row_id, rid
+    except Exception:
+        raise InvalidQuery("Invalid cursor")
+
+
+def where_clause(filters):
+    """Equality filters on whitelisted columns -> (' AND col = :col ...', params)."""
+    sql = ""
+    params = {}
+    for column, value in filters.items():
+        if value is None or value == "":
+            continue
+        if column not in SURVEY_COLUMNS:
+            raise InvalidQuery(f"Unknown filter column: {column}")
+        sql += f" AND s.{column} = :{column}"
+        params[column] = value
+    return sql, params
+
+
+def export_query(columns=None, filters=None, ranges=None):
+    """SELECT of only `columns` (all when None) with the filters pushed into
+    the WHERE clause: {"state": ["Kerala", "Goa"]} -> s.state IN (...), and
+    {"year": (1990, None)} -> s.year >= ... (inclusive; None is open)."""
+    select = ", ".join(f"s.{c}" for c in columns) if columns else "s.*"
+    where, params = filter_clause(filters, ranges)
+    return f"SELECT {select} FROM survey_data s WHERE 1=1{where}", params
+
+
+def filter_clause(filters=None, ranges=None):
+    """IN-list filters and inclusive ranges (see export_query) -> (' AND ...', params)."""
+    where, params = "", {}
+    for column, values in (filters or {}).items():
+        if not values:
+            continue
+        if column not in SURVEY_COLUMNS:
+            raise InvalidQuery(f"Unknown filter column: {column}")
+        names = [f"{column}_{i}" for i in range(len(values))]
+        where += f" AND s.{column} IN ({', '.join(':' + n for n in names)})"
+        params.update(zip(names, values))
+    for column, (low, high) in (ranges or {}).items():
+        if column not in SURVEY_COLUMNS:
+            raise InvalidQuery(f"Unknown range column: {column}")
+        if low is not None:
+            where += f" AND s.{column} >= :{column}_from"
+            params[f"{column}_from"] = low
+        if high is not None:
+            where += f" AND s.{column} <= :{column}_to"
+            params[f"{column}_to"] = high
+    return where, params
+
+
+def scan_query(columns, filters=None, after=None, limit=10000, missing=None):
+    """One chunk of a scan over the whole table (or the rows matching
+    filter_clause filters) in (id, ROWID) order, starting after the key
+    `after` = (id, rowid). With `missing`, only rows where that column is NULL."""
+    where, params = filter_clause(filters)
+    if missing:
+        if missing not in SURVEY_COLUMNS:
+            raise InvalidQuery(f"Unknown column: {missing}")
+        where += f" AND s.{missing} IS NULL"
+    if after:
+        where += " AND (s.id > :after_id OR (s.id = :after_id AND s.ROWID > :after_rid))"
+        params["after_id"], params["after_rid"] = after
+    params["page_rows"] = limit
+    select = ", ".join(f"s.{c}" for c in columns)
+    sql = (
+        f"SELECT * FROM (SELECT s.id AS page_id, s.ROWID AS page_rid, {select} "
+        f"FROM survey_data s WHERE 1=1{where} ORDER BY s.id, s.ROWID) "
+        f"WHERE ROWNUM <= :page_rows"
+    )
+    return sql, params
+
+
+def page_query(filters=None, columns=None, cursor=None, limit=100):
+    """SQL and binds for one page; fetches limit + 1 rows to detect a next page."""
+    select = ", ".join(f"s.{c}" for c in columns) if columns else "s.*"
+    where, params = where_clause(filters or {})
+    if cursor:
+        after_id, after_rid = decode_cursor(cursor)
+        where += " AND (s.id > :after_id OR (s.id = :after_id AND s.ROWID > :after_rid))"
+        params["after_id"] = after_id
+        params["after_rid"] = after_rid
+    params["page_rows"] = limit + 1
+    sql = (
+        f"SELECT * FROM (SELECT s.id AS page_id, s.ROWID AS page_rid, {select} "
+        f"FROM survey_data s WHERE 1=1{where} ORDER BY s.id, s.ROWID) "
+        f"WHERE ROWNUM <= :page_rows"
+    )
+    return sql, params
+
+
+def split_values(values):
+    """Query values for one column (repeated and/or comma-separated) -> distinct list."""
+    found = []
+    for value in values or ():
+        found.extend(v.strip() for v in value.split(",") if v.strip())
+    return list(dict.fromkeys(found))
+
+
+def partitions(filters):
+    """{"state": ["Kerala", "Goa"], "gender": ["Male"]} -> one equality filter
+    dict per combination; columns without values are left unfiltered."""
+    columns = [c for c, values in filters.items() if values]
+    for column in columns:
+        if column not in SURVEY_COLUMNS:
+            raise InvalidQuery(f"Unknown filter column: {column}")
+    combos = [dict(zip(columns, combo)) for combo in itertools.product(*(filters[c] for c in columns))]
+    if len(combos) > MAX_PARTITIONS:
+        raise InvalidQuery(f"Too many filter combinations ({len(combos)} > {MAX_PARTITIONS})")
+    return combos
+
+
+def page_key(row):
+    """Sort key of a fetched row that matches the ORDER BY s.id, s.ROWID of page_query."""
+    rid = row[1]
+    return row[0], rid.translate(_ROWID_ORDER) if isinstance(rid, str) else rid
+
+
+def _page(cols, batch, limit):
+    next_cursor = None
+    if len(batch) > limit:
+        batch = batch[:limit]
+        last = batch[-1]
+        next_cursor = encode_cursor(last[0], last[1])
+    with metrics.timer("serialize"):
+        rows = [dict(zip(cols, r[2:])) for r in batch]
+    return {"data": rows, "next_cursor": next_cursor}
+
+
+def _prepare(conn, filters, columns, cursor, limit):
+    sql, params = page_query(filters, columns, cursor, limit)
+    cur = conn.cursor()
+    cur.arraysize = limit + 1
+    cur.prefetchrows = limit + 2
+    return cur, sql, params
+
+
+def fetch_page(conn, filters=None, columns=None, cursor=None, limit=100):
+    """One page of rows as dicts plus the cursor for the next page (None at the end)."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    cur, sql, params = _prepare(conn, filters, columns, cursor, limit)
+    with metrics.timer("query_execute"):
+        cur.execute(sql, params)
+    cols = [d[0] for d in cur.description][2:]
+    with metrics.timer("row_fetch"):
+        batch = cur.fetchmany(limit + 1)
+    cur.close()
+    return _page(cols, batch, limit)
+
+
+async def _fetch_rows_async(conn, filters, columns, cursor, limit):
+    """(column names, raw rows with their page keys) for one page."""
+    cur, sql, params = _prepare(conn, filters, columns, cursor, limit)
+    try:
+        with metrics.timer("query_execute"):
+            await cur.execute(sql, params)
+        cols = [d[0] for d in cur.description][2:]
+        with metrics.timer("row_fetch"):
+            batch = await cur.fetchmany(limit + 1)
+    finally:
+        cur.close()
+    return cols, batch
+
+
+async def fetch_page_async(conn, filters=None, columns=None, cursor=None, limit=100):
+    """fetch_page on a connection with the asyncio cursor API."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    cols, batch = await _fetch_rows_async(conn, filters, columns, cursor, limit)
+    return _page(cols, batch, limit)
+
+
+async def fetch_page_fanout(connection, filter_partitions, columns=None, cursor=None, limit=100,
+                            concurrency=FANOUT_CONCURRENCY):
+    """One page over the union of disjoint filter partitions. `connection()` is
+    an async context manager giving a connection (db.async_connection); at most
+    `concurrency` partitions are queried at once. Each partition returns at most
+    limit + 1 rows after the cursor, so merging them and cutting at limit + 1
+    gives exactly the rows a single query over all of them would."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    filter_partitions = list(filter_partitions) or [{}]
+    gate = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(filters):
+        async with gate:
+            async with connection() as conn:
+                return await _fetch_rows_async(conn, filters, columns, cursor, limit)
+
+    tasks = [asyncio.ensure_future(fetch(f)) for f in filter_partitions]
+    cols, merged = None, []
+    try:
+        for done in asyncio.as_completed(tasks):
+            cols, batch = await done
+            merged = list(itertools.islice(heapq.merge(merged, batch, key=page_key), limit + 1))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return _page(cols, merged, limit)
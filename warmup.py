@@ -0,0 +1,90 @@
+"""
+Background warm-up for the Gradio and Streamlit apps.
+
+The apps serve straight away: occupation search uses the catalog's substring
+fallback and the survey explorer scans the DataFrame. A daemon thread runs the
+slow steps (importing the ML stack and loading the model, building the
+semantic catalog, indexing the survey data) one after another; each step's
+result replaces the fallback as soon as it is ready. status() and describe()
+report which step is running and how far along the warm-up is.
+"""
+import threading
+import time
+
+
+class Warmup:
+    def __init__(self, steps):
+        """`steps` is a list of (name, fn); fn() runs on the warm-up thread and
+        its return value is available as get(name) once it finishes. A step
+        that raises is recorded in errors and the next step still runs."""
+        self.steps = list(steps)
+        self.results = {}
+        self.errors = {}
+        self.timings = {}
+        self.current = None
+        self.started = None
+        self.finished = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self.started = time.monotonic()
+                self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        for name, fn in self.steps:
+            self.current = name
+            step_start = time.monotonic()
+            try:
+                self.results[name] = fn()
+            except Exception as e:
+                print(f"Warm-up step '{name}' failed: {e}")
+                self.errors[name] = str(e)
+            self.timings[name] = round(time.monotonic() - step_start, 3)
+        self.current = None
+        self.finished = time.monotonic()
+
+    def get(self, name, default=None):
+        return self.results.get(name, default)
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    @property
+    def ready(self):
+        return self.finished is not None
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def status(self):
+        done = len(self.timings)
+        return {
+            "ready": self.ready,
+            "step": self.current,
+            "completed": done,
+            "total": len(self.steps),
+            "progress": round(done / len(self.steps), 3) if self.steps else 1.0,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "timings": dict(self.timings),
+            "errors": dict(self.errors),
+        }
+
+    def describe(self):
+        """One-line status for the UI."""
+        if self.ready:
+            if self.errors:
+                failed = ", ".join(self.errors)
+                return f"⚠️ Warm-up finished in {self.elapsed():.1f} s; running in fallback mode for: {failed}"
+            return f"✅ Ready (warm-up took {self.elapsed():.1f} s)"
+        done = len(self.timings)
+        return (f"⏳ Warming up: {self.current or 'starting'} ({done}/{len(self.steps)}, "
+                f"{self.elapsed():.1f} s) - simple text matching until then")